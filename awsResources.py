@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+
+# --- Configuration ---
+DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "Reminders")
+BOT_TOKEN_PARAMETER = os.environ.get("BOT_TOKEN_PARAMETER", "/telegram/bot_token")
+BOT_TOKEN_TTL_SECONDS = float(os.environ.get("BOT_TOKEN_TTL_SECONDS", "900"))
+
+# --- Lazy AWS Clients ---
+# Nothing is created (or even imported) at import time; each client is built on first
+# use and then reused for the lifetime of the warm Lambda container.
+_lock = threading.Lock()
+_dynamo = None
+_ssm = None
+_streams = None
+_tables = {}
+
+def get_dynamo():
+    global _dynamo
+    if _dynamo is None:
+        with _lock:
+            if _dynamo is None:
+                import boto3
+                _dynamo = boto3.resource('dynamodb')
+    return _dynamo
+
+def get_ssm():
+    global _ssm
+    if _ssm is None:
+        with _lock:
+            if _ssm is None:
+                import boto3
+                _ssm = boto3.client('ssm')
+    return _ssm
+
+def get_streams():
+    global _streams
+    if _streams is None:
+        with _lock:
+            if _streams is None:
+                import boto3
+                _streams = boto3.client('dynamodbstreams')
+    return _streams
+
+def get_table(name=None):
+    """Returns the (cached) DynamoDB table handle, DYNAMODB_TABLE by default."""
+    name = name or DYNAMODB_TABLE
+    table = _tables.get(name)
+    if table is None:
+        table = _tables[name] = get_dynamo().Table(name)
+    return table
+
+# --- Bot Token ---
+class BotTokenProvider:
+    """
+    Serves the bot token from the BOT_TOKEN environment variable or from SSM.
+    The SSM value is cached for `ttl` seconds; once stale, the cached value keeps being
+    served while a background thread refreshes it, so only the very first call waits on SSM.
+    """
+
+    def __init__(self, parameter=BOT_TOKEN_PARAMETER, ttl=BOT_TOKEN_TTL_SECONDS, background_refresh=True):
+        self.parameter = parameter
+        self.ttl = ttl
+        self.background_refresh = background_refresh
+        self.value = os.environ.get("BOT_TOKEN")
+        self.static = bool(self.value)
+        self.fetched_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def _fetch(self):
+        try:
+            value = get_ssm().get_parameter(Name=self.parameter, WithDecryption=True)["Parameter"]["Value"]
+        except Exception as e:
+            print("❌ Failed to fetch BOT_TOKEN from SSM:", e)
+            return self.value
+        with self.lock:
+            self.value = value
+            self.fetched_at = time.monotonic()
+        return value
+
+    def _refresh_in_background(self):
+        try:
+            self._fetch()
+        finally:
+            self.refreshing = False
+
+    def get(self):
+        """Returns the bot token, or None if it could not be loaded."""
+        if self.static:
+            return self.value
+        if self.value is None:
+            return self._fetch()
+        if time.monotonic() - self.fetched_at > self.ttl:
+            if not self.background_refresh:
+                return self._fetch()
+            with self.lock:
+                start = not self.refreshing
+                self.refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return self.value
+
+bot_token = BotTokenProvider()
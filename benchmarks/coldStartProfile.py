@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Measures what each piece of Lambda initialisation costs in a brand-new interpreter,
+# so cold-start regressions in either handler show up as a number rather than a hunch.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (component, setup code that is not timed, timed code)
+COMPONENTS = [
+    ("import boto3", "", "import boto3"),
+    ("boto3.resource('dynamodb')", "import boto3", "boto3.resource('dynamodb')"),
+    ("boto3.client('ssm')", "import boto3", "boto3.client('ssm')"),
+    ("Table handle", "import boto3; r = boto3.resource('dynamodb')", "r.Table('Reminders')"),
+    ("import reminderParser", "", "import reminderParser"),
+    ("import telegramClient", "", "import telegramClient"),
+    ("import telegramWebhookHandler", "", "import telegramWebhookHandler"),
+    ("import reminderSender", "", "import reminderSender"),
+]
+# Only profiled with --with-ssm, because it needs credentials and the real parameter.
+SSM_COMPONENT = (
+    "ssm.get_parameter (bot token)",
+    "import boto3; ssm = boto3.client('ssm')",
+    "ssm.get_parameter(Name='/telegram/bot_token', WithDecryption=True)",
+)
+
+_RUNNER = """
+import sys, time
+sys.path.insert(0, {root!r})
+{setup}
+start = time.perf_counter()
+{timed}
+print(time.perf_counter() - start)
+"""
+
+
+def time_component(setup, timed, env):
+    code = _RUNNER.format(root=REPO_ROOT, setup=setup, timed=timed)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+def profile(components, runs):
+    env = dict(os.environ)
+    env.setdefault("AWS_DEFAULT_REGION", "ap-south-1")
+    report = []
+    for name, setup, timed in components:
+        try:
+            samples = [time_component(setup, timed, env) for _ in range(runs)]
+        except RuntimeError as e:
+            report.append({"component": name, "error": str(e)})
+            continue
+        report.append({
+            "component": name,
+            "median_ms": round(statistics.median(samples) * 1000, 2),
+            "max_ms": round(max(samples) * 1000, 2),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile cold-start cost per initialisation component.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per component.")
+    parser.add_argument("--with-ssm", action="store_true", help="Also time the SSM round trip for the bot token.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON (for tracking over time).")
+    args = parser.parse_args()
+
+    components = COMPONENTS + ([SSM_COMPONENT] if args.with_ssm else [])
+    report = profile(components, args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'component':<34} {'median (ms)':>12} {'max (ms)':>10}")
+    for row in report:
+        if "error" in row:
+            print(f"{row['component']:<34} {'error: ' + row['error']}")
+        else:
+            print(f"{row['component']:<34} {row['median_ms']:>12.2f} {row['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,611 @@
+import re
+import math
+import bisect
+import random
+import threading
+from decimal import Decimal
+from collections import Counter
+from types import SimpleNamespace
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from botocore.exceptions import ClientError
+
+# An in-process stand-in for the Reminders table and its GSIs, so the load tests can run the
+# real dynamoStore.py code without AWS. It implements the part of the boto3 Table API the store
+# uses, with DynamoDB's expression, paging and conditional-write semantics.
+
+# The key schema from the README's setup guide.
+TABLE_KEYS = ('user_id', 'reminder_time')
+INDEXES = {
+    'StatusAndTimeIndex': ('status', 'reminder_time'),
+    'EarlyStatusAndTimeIndex': ('early_status', 'early_reminder_time'),
+}
+# A query page stops after 1 MB of items read; capacity is billed in 4 KB reads and 1 KB writes.
+PAGE_BYTES = 1024 * 1024
+READ_UNIT_BYTES = 4096
+WRITE_UNIT_BYTES = 1024
+
+_MISSING = object()
+
+
+def item_size(item):
+    """DynamoDB's item size: attribute name lengths plus values (numbers as ~1 byte per 2 digits + 1)."""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode("utf-8"))
+        if isinstance(value, str):
+            size += len(value.encode("utf-8"))
+        else:
+            size += len(str(value).lstrip("-")) // 2 + 1
+    return size
+
+def _client_error(code, operation, message=""):
+    return ClientError({'Error': {'Code': code, 'Message': message or code}}, operation)
+
+def _serialize(item, operation):
+    """Stores numbers as Decimal like boto3 does, and rejects floats like boto3 does."""
+    stored = {}
+    for name, value in item.items():
+        if isinstance(value, float):
+            raise TypeError("Float types are not supported. Use Decimal types instead.")
+        if isinstance(value, int) and not isinstance(value, bool):
+            value = Decimal(value)
+        stored[name] = value
+    for name in TABLE_KEYS:
+        if not isinstance(stored.get(name), str) or not stored[name]:
+            raise _client_error('ValidationException', operation, f"Missing or invalid key attribute {name}")
+    for keys in INDEXES.values():
+        for name in keys:
+            if name in stored and not isinstance(stored[name], str):
+                raise _client_error('ValidationException', operation, f"Index key {name} must be a string")
+    return stored
+
+# --- Expressions ---
+_TOKEN = re.compile(r"\s*(?:(<=|>=|<>|[=<>(),+\-])|([#:]?[A-Za-z_][A-Za-z0-9_]*))")
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Cannot parse expression at {text[pos:]!r}")
+        tokens.append(match.group(1) or match.group(2))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Compiles condition and update expressions into functions of (item, names, values).
+    Compiled expressions are cached by their text, since the store reuses a handful of them.
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, word):
+        return (self.peek() or "").upper() == word
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValueError(f"Expected {expected or 'a token'}, got {token!r}")
+        self.pos += 1
+        return token
+
+    def done(self):
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.peek()!r}")
+
+    # --- Operands ---
+    def path(self):
+        token = self.take()
+        if token.startswith('#'):
+            return lambda item, names, values: item.get(names[token], _MISSING)
+        return lambda item, names, values: item.get(token, _MISSING)
+
+    def path_name(self):
+        token = self.take()
+        return (lambda names: names[token]) if token.startswith('#') else (lambda names: token)
+
+    def operand(self):
+        token = self.peek()
+        if token.startswith(':'):
+            self.take()
+            return lambda item, names, values: values[token]
+        return self.path()
+
+    # --- Conditions ---
+    def condition(self):
+        left = self.conjunction()
+        while self.keyword('OR'):
+            self.take()
+            right = self.conjunction()
+            left = (lambda a, b: lambda *ctx: a(*ctx) or b(*ctx))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.keyword('AND'):
+            self.take()
+            right = self.negation()
+            left = (lambda a, b: lambda *ctx: a(*ctx) and b(*ctx))(left, right)
+        return left
+
+    def negation(self):
+        if self.keyword('NOT'):
+            self.take()
+            inner = self.negation()
+            return lambda *ctx: not inner(*ctx)
+        return self.comparison()
+
+    def comparison(self):
+        if self.peek() == '(':
+            self.take()
+            inner = self.condition()
+            self.take(')')
+            return inner
+        function = (self.peek() or "").lower()
+        if self.peek(1) == '(' and function in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains'):
+            self.take()
+            self.take('(')
+            target = self.path()
+            argument = None
+            if self.peek() == ',':
+                self.take(',')
+                argument = self.operand()
+            self.take(')')
+            return _function(function, target, argument)
+        left = self.operand()
+        operator = self.take().upper()
+        if operator == 'BETWEEN':
+            low = self.operand()
+            self.take('AND')
+            high = self.operand()
+            return lambda *ctx: _compare('BETWEEN', left(*ctx), (low(*ctx), high(*ctx)))
+        if operator == 'IN':
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                options.append(self.operand())
+            self.take(')')
+            return lambda *ctx: left(*ctx) in [option(*ctx) for option in options]
+        right = self.operand()
+        return lambda *ctx: _compare(operator, left(*ctx), right(*ctx))
+
+    # --- Updates ---
+    def update(self):
+        """Compiles SET/REMOVE clauses into a function that applies them to an item in place."""
+        actions = []
+        while self.peek() is not None:
+            clause = self.take().upper()
+            while True:
+                if clause == 'SET':
+                    actions.append(self.set_action())
+                elif clause == 'REMOVE':
+                    name = self.path_name()
+                    actions.append(lambda item, names, values, name=name: item.pop(name(names), None))
+                else:
+                    raise NotImplementedError(f"{clause} clauses are not supported")
+                if self.peek() != ',':
+                    break
+                self.take(',')
+
+        def apply(item, names, values):
+            for action in actions:
+                action(item, names, values)
+        return apply
+
+    def set_action(self):
+        name = self.path_name()
+        self.take('=')
+        value = self.operand()
+        if self.peek() in ('+', '-'):
+            sign = 1 if self.take() == '+' else -1
+            left, right = value, self.operand()
+            value = lambda *ctx: left(*ctx) + sign * right(*ctx)
+
+        def action(item, names, values):
+            result = value(item, names, values)
+            if result is _MISSING:
+                raise _client_error('ValidationException', 'UpdateItem', "An operand refers to a missing attribute")
+            item[name(names)] = Decimal(result) if isinstance(result, int) and not isinstance(result, bool) else result
+        return action
+
+def _function(name, target, argument):
+    if name == 'attribute_exists':
+        return lambda *ctx: target(*ctx) is not _MISSING
+    if name == 'attribute_not_exists':
+        return lambda *ctx: target(*ctx) is _MISSING
+
+    def check(*ctx):
+        value, prefix = target(*ctx), argument(*ctx)
+        if not isinstance(value, str) or not isinstance(prefix, str):
+            return False
+        return value.startswith(prefix) if name == 'begins_with' else prefix in value
+    return check
+
+def _compare(operator, left, right):
+    if left is _MISSING or right is _MISSING:
+        return operator == '<>'
+    try:
+        if operator == '=':
+            return left == right
+        if operator == '<>':
+            return left != right
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        if operator == '>=':
+            return left >= right
+        if operator == 'BETWEEN':
+            return right[0] <= left <= right[1]
+    except TypeError:
+        # Comparing different types is simply false in DynamoDB.
+        return False
+    raise ValueError(f"Unknown comparator {operator}")
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+def _compile(text, kind):
+    key = (kind, text)
+    function = _compiled.get(key)
+    if function is None:
+        parser = _Parser(text)
+        function = parser.condition() if kind == 'condition' else parser.update()
+        parser.done()
+        with _compiled_lock:
+            _compiled[key] = function
+    return function
+
+def _expression(expression, names, values, is_key_condition=False):
+    """(text, names, values) for a boto3 condition object or an expression string."""
+    names, values = dict(names or {}), dict(values or {})
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(expression, is_key_condition=is_key_condition)
+        names.update(built.attribute_name_placeholders)
+        values.update(built.attribute_value_placeholders)
+        expression = built.condition_expression
+    return expression, names, values
+
+def _condition_holds(item, expression, names, values):
+    if expression is None:
+        return True
+    text, names, values = _expression(expression, names, values)
+    return _compile(text, 'condition')(item, names, values)
+
+def _projection(item, projection, names):
+    if not projection:
+        return dict(item)
+    projected = {}
+    for name in projection.split(','):
+        name = name.strip()
+        name = (names or {}).get(name, name)
+        if name in item:
+            projected[name] = item[name]
+    return projected
+
+# --- Key Conditions ---
+def _key_parts(condition):
+    """Splits a Key(...) condition into (partition key name, value, sort condition or None)."""
+    expression = condition.get_expression()
+    parts = expression['values'] if expression['operator'] == 'AND' else (condition,)
+    partition = parts[0].get_expression()
+    sort = parts[1].get_expression() if len(parts) > 1 else None
+    return partition['values'][0].name, partition['values'][1], sort
+
+def _sort_range(entries, sort, key=None):
+    """The [low, high) slice of the sorted `entries` that a sort-key condition selects."""
+    if sort is None:
+        return 0, len(entries)
+    operator, values = sort['operator'], sort['values'][1:]
+    left = lambda value: bisect.bisect_left(entries, value, key=key)
+    right = lambda value: bisect.bisect_right(entries, value, key=key)
+    if operator == '=':
+        return left(values[0]), right(values[0])
+    if operator == '<':
+        return 0, left(values[0])
+    if operator == '<=':
+        return 0, right(values[0])
+    if operator == '>':
+        return right(values[0]), len(entries)
+    if operator == '>=':
+        return left(values[0]), len(entries)
+    if operator == 'BETWEEN':
+        return left(values[0]), right(values[1])
+    if operator == 'begins_with':
+        return left(values[0]), left(values[0] + "\U0010ffff")
+    raise NotImplementedError(f"Sort key condition {operator} is not supported")
+
+
+class _SortedEntries:
+    """
+    The entries of one table or index partition in sort-key order. Removals are only marked and
+    compacted away in bulk: the sender claims and deletes items from the front of partitions
+    holding up to millions of entries, where deleting from the list each time is quadratic.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.removed = set()
+
+    def add(self, entry):
+        if entry in self.removed:
+            self.removed.discard(entry)
+        else:
+            bisect.insort(self.entries, entry)
+
+    def remove(self, entry):
+        self.removed.add(entry)
+        if len(self.removed) > 1024 and len(self.removed) * 2 > len(self.entries):
+            self.entries = [e for e in self.entries if e not in self.removed]
+            self.removed.clear()
+
+    def scan(self, low, high, start=None, forward=True):
+        """Yields the live entries in [low, high), after the entry `start` if given."""
+        if forward:
+            if start is not None:
+                low = max(low, bisect.bisect_right(self.entries, start))
+            positions = range(low, high)
+        else:
+            if start is not None:
+                high = min(high, bisect.bisect_left(self.entries, start))
+            positions = range(high - 1, low - 1, -1)
+        for position in positions:
+            entry = self.entries[position]
+            if entry not in self.removed:
+                yield entry
+
+
+_EMPTY = _SortedEntries()
+
+
+class FakeTable:
+    """
+    The Reminders table resource and its two GSIs, in memory. Every operation is counted in
+    `ops`, along with the read and write capacity units DynamoDB would bill for it.
+    `unprocessed_rate` leaves that fraction of BatchWriteItem requests unprocessed, like throttling does.
+    """
+
+    def __init__(self, name="Reminders", unprocessed_rate=0.0, seed=None):
+        self.name = name
+        self.items = {}
+        self.partitions = {}
+        self.indexes = {index: {} for index in INDEXES}
+        self.lock = threading.RLock()
+        self.ops = Counter()
+        self.read_units = 0.0
+        self.write_units = 0
+        self.unprocessed_rate = unprocessed_rate
+        self.rng = random.Random(seed)
+        self.latest_stream_arn = None
+        self.meta = SimpleNamespace(client=FakeClient(self))
+
+    # --- Storage ---
+    def _index_entries(self, item):
+        for index, (partition_key, sort_key) in INDEXES.items():
+            if partition_key in item and sort_key in item:
+                yield index, item[partition_key], (item[sort_key], item['user_id'], item['reminder_time'])
+
+    def _put(self, item):
+        key = (item['user_id'], item['reminder_time'])
+        old = self.items.get(key)
+        if old is not None:
+            self._unindex(old)
+        else:
+            self.partitions.setdefault(key[0], _SortedEntries()).add(key[1])
+        self.items[key] = item
+        for index, partition, entry in self._index_entries(item):
+            self.indexes[index].setdefault(partition, _SortedEntries()).add(entry)
+
+    def _unindex(self, item):
+        for index, partition, entry in self._index_entries(item):
+            self.indexes[index][partition].remove(entry)
+
+    def _delete(self, key):
+        old = self.items.pop(key, None)
+        if old is not None:
+            self._unindex(old)
+            self.partitions[key[0]].remove(key[1])
+        return old
+
+    def _charge_write(self, *items):
+        size = max((item_size(item) for item in items if item), default=1)
+        units = max(1, math.ceil(size / WRITE_UNIT_BYTES))
+        self.write_units += units
+        return units
+
+    def _check(self, operation, old, condition, names, values):
+        if not _condition_holds(old or {}, condition, names, values):
+            self.ops['ConditionalCheckFailed'] += 1
+            raise _client_error('ConditionalCheckFailedException', operation, "The conditional request failed")
+
+    # --- Table API ---
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValues=None):
+        item = _serialize(Item, 'PutItem')
+        with self.lock:
+            self.ops['PutItem'] += 1
+            old = self.items.get((item['user_id'], item['reminder_time']))
+            self._charge_write(old, item)
+            self._check('PutItem', old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            self._put(item)
+        return {'Attributes': dict(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def get_item(self, Key, ConsistentRead=False, ProjectionExpression=None, ExpressionAttributeNames=None):
+        with self.lock:
+            self.ops['GetItem'] += 1
+            item = self.items.get((Key['user_id'], Key['reminder_time']))
+            read_bytes = item_size(item) if item else 0
+            self.read_units += max(1, math.ceil(read_bytes / READ_UNIT_BYTES)) * (1 if ConsistentRead else 0.5)
+            if item is None:
+                return {}
+            return {'Item': _projection(item, ProjectionExpression, ExpressionAttributeNames)}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None):
+        key = (Key['user_id'], Key['reminder_time'])
+        with self.lock:
+            self.ops['DeleteItem'] += 1
+            old = self.items.get(key)
+            self._charge_write(old)
+            self._check('DeleteItem', old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            self._delete(key)
+        return {'Attributes': dict(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None):
+        key = (Key['user_id'], Key['reminder_time'])
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        with self.lock:
+            self.ops['UpdateItem'] += 1
+            old = self.items.get(key)
+            item = dict(old) if old else dict(Key)
+            _compile(UpdateExpression, 'update')(item, names, values)
+            self._charge_write(old, item)
+            self._check('UpdateItem', old, ConditionExpression, names, values)
+            self._put(_serialize(item, 'UpdateItem'))
+        return {'Attributes': dict(item)} if ReturnValues == 'ALL_NEW' else {}
+
+    def query(self, KeyConditionExpression, IndexName=None, FilterExpression=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, ExpressionAttributeValues=None, Limit=None,
+              ExclusiveStartKey=None, ScanIndexForward=True):
+        partition_key, partition, sort = _key_parts(KeyConditionExpression)
+        with self.lock:
+            self.ops['Query'] += 1
+            if IndexName:
+                if INDEXES[IndexName][0] != partition_key:
+                    raise _client_error('ValidationException', 'Query', f"{partition_key} is not the key of {IndexName}")
+                sort_key = INDEXES[IndexName][1]
+                partition_entries = self.indexes[IndexName].get(partition, _EMPTY)
+                low, high = _sort_range(partition_entries.entries, sort, key=lambda entry: entry[0])
+                start = ExclusiveStartKey and (
+                    ExclusiveStartKey[sort_key], ExclusiveStartKey['user_id'], ExclusiveStartKey['reminder_time']
+                )
+                to_key = lambda entry: (entry[1], entry[2])
+            else:
+                partition_entries = self.partitions.get(partition, _EMPTY)
+                low, high = _sort_range(partition_entries.entries, sort)
+                start = ExclusiveStartKey and ExclusiveStartKey['reminder_time']
+                to_key = lambda entry: (partition, entry)
+            page, read_bytes, last = [], 0, None
+            entries = partition_entries.scan(low, high, start or None, ScanIndexForward)
+            for entry in entries:
+                if last is not None:
+                    # Another item follows the full page, so the caller has to ask for the next one.
+                    break
+                item = self.items[to_key(entry)]
+                page.append(item)
+                read_bytes += item_size(item)
+                if (Limit and len(page) >= Limit) or read_bytes >= PAGE_BYTES:
+                    last = item
+            else:
+                last = None
+            self.read_units += max(1, math.ceil(read_bytes / READ_UNIT_BYTES)) * 0.5
+            items = [
+                _projection(item, ProjectionExpression, ExpressionAttributeNames)
+                for item in page
+                if _condition_holds(item, FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            ]
+        response = {'Items': items, 'Count': len(items), 'ScannedCount': len(page)}
+        if last is not None:
+            response['LastEvaluatedKey'] = {name: last[name] for name in TABLE_KEYS}
+            if IndexName:
+                response['LastEvaluatedKey'].update({name: last[name] for name in INDEXES[IndexName]})
+        return response
+
+    def stats(self):
+        with self.lock:
+            return {
+                "items": len(self.items),
+                "ops": dict(self.ops),
+                "read_units": self.read_units,
+                "write_units": self.write_units,
+            }
+
+    def reset_stats(self):
+        with self.lock:
+            self.ops.clear()
+            self.read_units = 0.0
+            self.write_units = 0
+
+
+class FakeClient:
+    """The client-level calls the store makes through `table.meta.client`."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def batch_write_item(self, RequestItems):
+        table = self.table
+        requests = RequestItems.get(table.name, [])
+        if len(requests) > 25:
+            raise _client_error('ValidationException', 'BatchWriteItem', "Too many items requested")
+        unprocessed = []
+        with table.lock:
+            table.ops['BatchWriteItem'] += 1
+            for request in requests:
+                if table.unprocessed_rate and table.rng.random() < table.unprocessed_rate:
+                    unprocessed.append(request)
+                    continue
+                table.ops['BatchWriteItem.items'] += 1
+                if 'PutRequest' in request:
+                    item = _serialize(request['PutRequest']['Item'], 'BatchWriteItem')
+                    table._charge_write(table.items.get((item['user_id'], item['reminder_time'])), item)
+                    table._put(item)
+                else:
+                    key = request['DeleteRequest']['Key']
+                    key = (key['user_id'], key['reminder_time'])
+                    table._charge_write(table.items.get(key))
+                    table._delete(key)
+        return {'UnprocessedItems': {table.name: unprocessed} if unprocessed else {}}
+
+    def transact_write_items(self, TransactItems):
+        table = self.table
+        with table.lock:
+            table.ops['TransactWriteItems'] += 1
+            reasons, actions = [], []
+            for action in TransactItems:
+                (kind, request), = action.items()
+                if kind == 'Put':
+                    item = _serialize(request['Item'], 'TransactWriteItems')
+                    key = (item['user_id'], item['reminder_time'])
+                else:
+                    item, key = None, (request['Key']['user_id'], request['Key']['reminder_time'])
+                old = table.items.get(key)
+                holds = _condition_holds(
+                    old or {}, request.get('ConditionExpression'),
+                    request.get('ExpressionAttributeNames'), request.get('ExpressionAttributeValues'),
+                )
+                reasons.append({'Code': 'None' if holds else 'ConditionalCheckFailed'})
+                actions.append((kind, key, item, request, old))
+            # Transactions cost two write units per item, whether or not they succeed.
+            for _, _, item, _, old in actions:
+                table.write_units += table._charge_write(old, item)
+            if any(reason['Code'] != 'None' for reason in reasons):
+                table.ops['TransactionCanceled'] += 1
+                error = _client_error('TransactionCanceledException', 'TransactWriteItems', "Transaction cancelled")
+                error.response['CancellationReasons'] = reasons
+                raise error
+            for kind, key, item, request, old in actions:
+                if kind == 'Put':
+                    table._put(item)
+                elif kind == 'Delete':
+                    table._delete(key)
+                elif kind == 'Update':
+                    updated = dict(old) if old else {'user_id': key[0], 'reminder_time': key[1]}
+                    _compile(request['UpdateExpression'], 'update')(
+                        updated, request.get('ExpressionAttributeNames') or {}, request.get('ExpressionAttributeValues') or {}
+                    )
+                    table._put(_serialize(updated, 'TransactWriteItems'))
+        return {}
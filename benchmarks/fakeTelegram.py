@@ -0,0 +1,148 @@
+import json
+import math
+import time
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the Bot API, so the load tests can drive the real TelegramClient over
+# keep-alive HTTP. It answers every method with ok=True after a simulated network latency, and
+# answers with 429 + retry_after at random or once the configured rate limits are exceeded.
+
+
+class _Limit:
+    """Telegram's side of a rate limit: `rate` messages per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Server(ThreadingHTTPServer):
+    # The sender opens a whole connection pool at once.
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class FakeTelegram:
+    """
+    Serves /bot<token>/<method> on localhost. `latency_ms` (plus exponential jitter averaging
+    `jitter_ms`) is slept before every answer; `error_rate` is the chance of a random 429.
+    `global_rate` / `per_chat_rate` (messages per second) make it rate limit like Telegram does.
+    """
+
+    def __init__(self, latency_ms=40, jitter_ms=20, error_rate=0.0, retry_after=1,
+                 global_rate=None, per_chat_rate=None, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.global_bucket = _Limit(global_rate) if global_rate else None
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.message_ids = 0
+        self.server = None
+        self.thread = None
+
+    # --- Behaviour ---
+    def _delay(self):
+        with self.lock:
+            jitter = self.rng.expovariate(1 / self.jitter_ms) if self.jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000
+
+    def _limited(self, payload):
+        """retry_after seconds if this call is rate limited, else None."""
+        now = time.monotonic()
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return self.retry_after
+            buckets = [self.global_bucket] if self.global_bucket else []
+            if self.per_chat_rate and 'chat_id' in payload:
+                bucket = self.chat_buckets.get(payload['chat_id'])
+                if bucket is None:
+                    bucket = self.chat_buckets[payload['chat_id']] = _Limit(self.per_chat_rate, burst=1)
+                buckets.append(bucket)
+            wait = max((bucket.wait(now) for bucket in buckets), default=0)
+            if wait > 0:
+                return max(1, math.ceil(wait))
+            for bucket in buckets:
+                bucket.take()
+            return None
+
+    def answer(self, method, payload):
+        """The JSON response to one Bot API call."""
+        time.sleep(self._delay())
+        retry_after = self._limited(payload)
+        with self.lock:
+            self.calls[method] += 1
+            if retry_after is not None:
+                self.rate_limited[method] += 1
+                return {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                }
+            self.message_ids += 1
+            message_id = self.message_ids
+        return {"ok": True, "result": {"message_id": message_id, "chat": {"id": payload.get("chat_id")}}}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "rate_limited": dict(self.rate_limited),
+                "messages": self.message_ids,
+            }
+
+    # --- Server ---
+    def start(self, port=0):
+        """Starts serving on a background thread and returns the host:port to point TELEGRAM_API_HOST at."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                method = self.path.rsplit("/", 1)[-1]
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    payload = {}
+                raw = json.dumps(fake.answer(method, payload)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _Server(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-telegram", daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        return f"{host}:{port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,108 @@
+import os
+import random
+import argparse
+
+# Builds remind_corpus.txt: /remind commands shaped like the ones users actually send,
+# including sloppy spacing, mixed case, early heads-ups and inputs the parser rejects.
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "remind_corpus.txt")
+
+TASKS = [
+    "Call mom", "Pay electricity bill", "Take medicine", "Team standup", "Submit assignment",
+    "Buy groceries", "Water the plants", "Gym", "Dentist appointment", "Book train tickets",
+    "Renew passport", "Send invoice to client", "Pick up kids from school", "Check oven",
+    "Project deadline", "Meeting with Rahul", "Drink water", "Call the bank about card",
+    "Birthday party at Priya's", "Stand up and stretch", "Read 20 pages", "Backup laptop",
+    "Pay rent", "Doctor follow up", "Order cake for anniversary", "Join zoom call",
+    "Feed the cat", "Recharge phone", "Wish dad happy birthday", "Review PR #42",
+    "Laundry", "Meditate", "Prepare slides for Monday", "Car service", "Return library books",
+    "Check in for flight 6E 512", "Buy milk, eggs & bread", "Call Aunt at 5 (her time)",
+    "Submit tax form 16", "Go for a run", "Cancel Netflix trial", "Renew insurance policy",
+]
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July", "August", "September",
+    "October", "November", "December", "Jan", "Feb", "Mar", "Apr", "Jun", "Jul", "Aug", "Sep",
+    "Oct", "Nov", "Dec", "jan", "AUG", "dec",
+]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def random_time(rng):
+    hour12 = rng.randint(1, 12)
+    hour24 = rng.randint(0, 23)
+    minute = rng.choice(["00", "15", "30", "45", f"{rng.randint(0, 59):02d}"])
+    ampm = rng.choice(["am", "pm", "AM", "PM", "Pm"])
+    space = rng.choice(["", "", " "])
+    return rng.choice([
+        f"{hour12}{space}{ampm}",
+        f"{hour12}:{minute}{space}{ampm}",
+        f"{hour24}:{minute}",
+        f"{hour24:02d}:{minute}",
+    ])
+
+def random_when(rng):
+    kind = rng.randrange(9)
+    at_time = f" at {random_time(rng)}" if rng.random() < 0.7 else ""
+    if kind == 0:
+        value = rng.choice([1, 2, 5, 10, 15, 20, 30, 45, 90, 120])
+        unit = rng.choice(["minute", "minutes", "min", "mins", "hour", "hours", "hr", "hrs"])
+        return f"in {value} {unit}"
+    if kind == 1:
+        day = rng.randint(1, 31)
+        suffix = rng.choice(["", "", "st", "th"])
+        year = f" {rng.choice([2026, 2027, 2030])}" if rng.random() < 0.3 else ""
+        on = rng.choice(["", "on "])
+        return f"{on}{day}{suffix} {rng.choice(MONTHS)}{year}{at_time}"
+    if kind == 2:
+        year, month, day = rng.choice([2026, 2027]), rng.randint(1, 13), rng.randint(1, 31)
+        sep = rng.choice(["-", "/"])
+        date = rng.choice([f"{year}{sep}{month:02d}{sep}{day:02d}", f"{day:02d}{sep}{month:02d}{sep}{year}"])
+        return f"{rng.choice(['', 'on '])}{date}{at_time}"
+    if kind in (3, 4):
+        day = rng.choice(WEEKDAYS + ["tomorrow", "tomorrow", "today", "day after tomorrow"])
+        prefix = rng.choice(["", "", "on ", "next ", "at "])
+        if rng.random() < 0.2:
+            day = day.capitalize()
+        return f"{prefix}{day}{at_time}"
+    if kind in (5, 6):
+        return f"{rng.choice(['', 'at '])}{random_time(rng)}"
+    if kind == 7:
+        # Inputs the parser is expected to reject.
+        return rng.choice(["someday", "next week", "in 2 days", "at noon", "whenever", "25:00", "asap"])
+    return rng.choice(["tonight", "soon", "later today"])
+
+def random_command(rng):
+    task = rng.choice(TASKS)
+    if rng.random() < 0.1:
+        task = task.lower()
+    command = f"/remind {task} {random_when(rng)}"
+    if rng.random() < 0.2:
+        command += rng.choice([
+            f" early {rng.choice([5, 10, 15, 30])}",
+            f" early {rng.choice([5, 10, 15, 30])} minutes",
+            f" early reminder {rng.choice([10, 20])}",
+            f" early {rng.choice([5, 10])} mins",
+        ])
+    if rng.random() < 0.05:
+        command = command.replace(" ", "  ", 1)
+    if rng.random() < 0.03:
+        command = "/remind " + random_when(rng)
+    return command
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the /remind benchmark corpus.")
+    parser.add_argument("--count", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=20250812)
+    parser.add_argument("--output", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for _ in range(args.count):
+            f.write(random_command(rng) + "\n")
+    print(f"✅ Wrote {args.count} commands to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reminderStore
+from reminderParser import IST, parse_reminder_command
+from reminderStore import compact_item, expand_item, key_datetime, key_epoch
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "remind_corpus.txt")
+# A query reads (and bills) its result in 4 KB read units.
+READ_UNIT_BYTES = 4096
+
+
+def load_items(path, now):
+    """A version 1 item for every command in the corpus that parses."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            try:
+                text, when, early, recurrence = parse_reminder_command(line.strip(), now=now)
+            except ValueError:
+                continue
+            items.append(reminderStore.build_reminder_item(str(100000000 + i), text, when, early, recurrence))
+    return items
+
+def item_size(item):
+    """DynamoDB's item size: attribute name lengths plus values (numbers as ~1 byte per 2 digits + 1)."""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode("utf-8"))
+        if isinstance(value, str):
+            size += len(value.encode("utf-8"))
+        else:
+            size += len(str(value).lstrip("-")) // 2 + 1
+    return size
+
+def rate(items, rounds, decode):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            decode(item)
+    return len(items) * rounds / (time.perf_counter() - start)
+
+def due_epoch(item):
+    """What coalescing, dispatch lag and the scheduler's timer heap do with every due item."""
+    return key_epoch(item['reminder_time'])
+
+def render(item):
+    """What the sender and /list do before showing an item."""
+    r = expand_item(dict(item))
+    return key_datetime(r['reminder_time'], IST).strftime('%I:%M %p')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the size and decode cost of version 1 and compact items.")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime(2026, 3, 2, 10, 17, 42, tzinfo=IST)
+    reminderStore.ITEM_VERSION = 1
+    legacy = load_items(args.corpus, now)
+    versions = {"v1 (ISO)": legacy, "v2 (compact)": [compact_item(item) for item in legacy]}
+
+    print(f"Items: {len(legacy)} from {args.corpus}")
+    print(f"\n{'encoding':<14} {'avg bytes':>10} {'items/4KB':>10} {'epochs/sec':>12} {'renders/sec':>12}")
+    for name, items in versions.items():
+        avg = sum(item_size(item) for item in items) / len(items)
+        epochs = rate(items, args.rounds, due_epoch)
+        renders = rate(items, args.rounds, render)
+        print(f"{name:<14} {avg:>10.1f} {READ_UNIT_BYTES / avg:>10.1f} {epochs:>12,.0f} {renders:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
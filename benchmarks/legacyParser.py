@@ -0,0 +1,157 @@
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# The regex-cascade parser as it shipped before reminderParser.py, kept verbatim
+# (apart from the injectable `now`) as the baseline for parserBenchmark.py.
+IST = ZoneInfo("Asia/Kolkata")
+
+def parse_reminder_command(command_text, now=None):
+    """
+    Parses reminder commands using specific, efficient regular expressions.
+    This final version fixes a bug in the return statement.
+    """
+    command_body = command_text[len("/remind"):].strip()
+
+    # Use the more flexible 'early' regex from the previous version
+    early_minutes = 0
+    p_early = r'\b(early(\s+reminder)?)\s+(?P<value>\d+)(\s+(min|mins|minute|minutes))?\b'
+    early_match = re.search(p_early, command_body, re.IGNORECASE)
+    if early_match:
+        early_minutes = int(early_match.group('value'))
+        command_body = command_body.replace(early_match.group(0), "").strip()
+
+    if not command_body:
+        raise ValueError("Cannot set a reminder with no text or time.")
+
+    now = now or datetime.now(IST)
+    task_text = command_body
+    target_dt = None
+    
+    # A single, robust regex for parsing time
+    time_regex_str = r'(?P<time>\d{1,2}:\d{2}\s*[ap]m|\d{1,2}:\d{2}|\d{1,2}\s*[ap]m)'
+
+    # --- Parsing Logic ---
+    # Pattern 1: "in X minutes/hours"
+    p_in_x = r'(?P<matched_text>in\s+(?P<value>\d+)\s+(?P<unit>minute|min|hour|hr)s?)\s*$'
+    match = re.search(p_in_x, command_body, re.IGNORECASE)
+    if match:
+        value = int(match.group('value'))
+        unit = match.group('unit').lower()
+        if unit.startswith("min"):
+            target_dt = now + timedelta(minutes=value)
+        else: # hour
+            target_dt = now + timedelta(hours=value)
+        task_text = command_body[:match.start()].strip()
+
+    # Pattern 2: Absolute Date with Month Name
+    if not target_dt:
+        months_regex = r'January|February|March|April|May|June|July|August|September|October|November|December|Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+        p_month_date = (
+            r'(?P<matched_text>(on\s+)?(?P<day>\d{1,2})(st|nd|rd|th)?\s+(?P<month>' + months_regex + r')(\s+(?P<year>\d{4}))?'
+            r'(\s+at\s+' + time_regex_str + r')?)\s*$'
+        )
+        match = re.search(p_month_date, command_body, re.IGNORECASE)
+        if match:
+            task_text = command_body[:match.start()].strip()
+            day = int(match.group('day'))
+            month_str = match.group('month')[:3].capitalize()
+            year = int(match.group('year')) if match.group('year') else now.year
+            month_num = datetime.strptime(month_str, '%b').month
+            target_date = datetime(year, month_num, day).date()
+            hour, minute = 0, 0
+            time_str_match = match.group('time')
+            if time_str_match:
+                time_str = time_str_match.lower()
+                is_pm = "pm" in time_str; is_am = "am" in time_str
+                time_str = re.sub(r'\s*(am|pm)', '', time_str)
+                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
+                else: hour, minute = int(time_str), 0
+                if is_pm and hour < 12: hour += 12
+                if is_am and hour == 12: hour = 0
+            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
+
+    # Pattern 3: Absolute Numeric Date
+    if not target_dt:
+        p_abs_date = r'(?P<matched_text>(on\s+)?(?P<date>\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/]\d{4})(\s+at\s+' + time_regex_str + r')?)\s*$'
+        match = re.search(p_abs_date, command_body, re.IGNORECASE)
+        if match:
+            task_text = command_body[:match.start()].strip()
+            date_str = match.group('date').replace('/', '-')
+            try: target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError: target_date = datetime.strptime(date_str, '%d-%m-%Y').date()
+            hour, minute = 0, 0
+            time_str_match = match.group('time')
+            if time_str_match:
+                time_str = time_str_match.lower()
+                is_pm = "pm" in time_str; is_am = "am" in time_str
+                time_str = re.sub(r'\s*(am|pm)', '', time_str)
+                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
+                else: hour, minute = int(time_str), 0
+                if is_pm and hour < 12: hour += 12
+                if is_am and hour == 12: hour = 0
+            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
+
+    # Pattern 4: Relative Day and Time
+    if not target_dt:
+        p_day_time = (
+            r'(?P<matched_text>(on|next|at)\s+)?(?P<day>monday|tuesday|wednesday|thursday|friday|saturday|sunday|'
+            r'tomorrow|today|day\s+after\s+tomorrow)'
+            r'(\s+at\s+' + time_regex_str + r')?\s*$'
+        )
+        match = re.search(p_day_time, command_body, re.IGNORECASE)
+        if match:
+            task_text = command_body[:match.start()].strip()
+            day_str = match.group('day').lower()
+            target_date = now.date()
+            if day_str == "tomorrow": target_date += timedelta(days=1)
+            elif day_str == "day after tomorrow": target_date += timedelta(days=2)
+            elif day_str != "today":
+                days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+                day_offset = (days.index(day_str) - now.weekday() + 7) % 7
+                if day_offset == 0: # If the matched day is today
+                  # If the user said "next" or "on", they mean a week from now.
+                  # If they just said the day (e.g., "Monday"), they mean today.
+                  if 'next' in match.group(0).lower() or 'on' in match.group(0).lower():
+                      day_offset = 7
+                target_date += timedelta(days=day_offset)
+            hour, minute = 0, 0
+            time_str_match = match.group('time')
+            if time_str_match:
+                time_str = time_str_match.lower()
+                is_pm = "pm" in time_str; is_am = "am" in time_str
+                time_str = re.sub(r'\s*(am|pm)', '', time_str)
+                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
+                else: hour, minute = int(time_str), 0
+                if is_pm and hour < 12: hour += 12
+                if is_am and hour == 12: hour = 0
+            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
+
+    # Pattern 5: Time only
+    if not target_dt:
+        p_time_only = r'(?P<matched_text>(at\s+)?' + time_regex_str + r')\s*$'
+        match = re.search(p_time_only, command_body, re.IGNORECASE)
+        if match:
+            task_text = command_body[:match.start()].strip()
+            time_str = match.group('time').lower()
+            is_pm = "pm" in time_str; is_am = "am" in time_str
+            time_str = re.sub(r'\s*(am|pm)', '', time_str)
+            if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
+            else: hour, minute = int(time_str), 0
+            if is_pm and hour < 12: hour += 12
+            if is_am and hour == 12: hour = 0
+            potential_dt = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if potential_dt <= now:
+                potential_dt += timedelta(days=1)
+            target_dt = potential_dt
+
+    if not target_dt:
+        raise ValueError("I couldn't figure out the time. Try being more specific, like 'tomorrow at 5pm' or 'in 2 hours'.")
+
+    # --- FINAL PROCESSING ---
+    target_dt = target_dt.replace(second=0, microsecond=0)
+    if target_dt <= now.replace(second=0, microsecond=0):
+        raise ValueError("Oops! That time is in the past. Please set a reminder for the future.")
+
+    # **BUG FIX**: Added 'early_minutes' back to the return statement.
+    return task_text or "Reminder", target_dt, early_minutes
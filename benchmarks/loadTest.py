@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import itertools
+import threading
+import contextlib
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fakeDynamo import FakeTable
+from fakeTelegram import FakeTelegram
+from generateRemindCorpus import TASKS, random_command, random_when
+
+# Runs both Lambda handlers end to end without AWS or Telegram: the real DynamoReminderStore
+# over an in-process stand-in for the table and its GSIs, and the real TelegramClient against a
+# local Bot API stand-in with network latency and 429s. Everything runs in this one process,
+# so absolute numbers are a lower bound; compare runs on the same machine.
+
+FIRST_CHAT_ID = 100000000
+FIRST_UPDATE_ID = 500000000
+
+
+def percentiles(values, scale=1):
+    values = sorted(values)
+    if not values:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    pick = lambda pct: values[min(len(values) - 1, int(len(values) * pct))] * scale
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": values[-1] * scale}
+
+def chat_picker(rng, chats):
+    """Chat ids with a Zipf-like skew: a few busy chats and a long tail of quiet ones."""
+    ids = [str(FIRST_CHAT_ID + i) for i in range(chats)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(chats)))
+    return lambda k=1: rng.choices(ids, cum_weights=weights, k=k)
+
+
+class EmfCapture:
+    """
+    Stands in for stdout while the handlers run: collects the values of every EMF metric line
+    and drops the rest of the log (which at these volumes costs more than the code under test).
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+        self.buffer = ""
+
+    def write(self, text):
+        with self.lock:
+            self.buffer += text
+            *lines, self.buffer = self.buffer.split("\n")
+            for line in lines:
+                if line.startswith('{"_aws"'):
+                    self._collect(json.loads(line))
+        return len(text)
+
+    def _collect(self, document):
+        for definition in document["_aws"]["CloudWatchMetrics"]:
+            for metric in definition["Metrics"]:
+                value = document[metric["Name"]]
+                self.values.setdefault(metric["Name"], []).extend(value if isinstance(value, list) else [value])
+
+    def flush(self):
+        pass
+
+    def total(self, name):
+        return sum(self.values.get(name, []))
+
+
+class LambdaContext:
+    def __init__(self, timeout_seconds):
+        self.deadline = time.monotonic() + timeout_seconds
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+# --- Environment ---
+def configure(args, telegram_host):
+    """Points the handlers at the stand-ins. Must run before they are imported (they read it at import)."""
+    os.environ.update({
+        "REMINDER_STORE": "dynamodb",
+        "BOT_TOKEN": "load-test",
+        "TELEGRAM_API_HOST": telegram_host,
+        "TELEGRAM_API_SCHEME": "http",
+        "TELEGRAM_GLOBAL_RATE": str(args.global_rate),
+        "TELEGRAM_PER_CHAT_RATE": str(args.per_chat_rate),
+        "WEBHOOK_METRICS_SAMPLE_RATE": "0",
+        "METRICS_SAMPLE_RATE": "1",
+    })
+    os.environ.setdefault("SENDER_RETRY_BASE_SECONDS", "1")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+def use_table(table):
+    from dynamoStore import DynamoReminderStore
+    from reminderStore import set_store
+    set_store(DynamoReminderStore(table=table))
+
+# --- Webhook Traffic ---
+def build_updates(args, rng):
+    """Webhook updates: mostly /remind, some bulk /remind, /list and /delete, plus redeliveries."""
+    pick_chats = chat_picker(rng, args.chats)
+    updates = []
+    for i, chat_id in enumerate(pick_chats(args.webhook_updates)):
+        roll = rng.random()
+        if roll < 0.7:
+            text = random_command(rng)
+        elif roll < 0.8:
+            text = "/remind\n" + "\n".join(f"{rng.choice(TASKS)} {random_when(rng)}" for _ in range(rng.randint(2, 10)))
+        elif roll < 0.93:
+            text = "/list"
+        else:
+            text = f"/delete {rng.randint(1, 5)}"
+        update = {
+            "update_id": FIRST_UPDATE_ID + i,
+            "message": {"message_id": i, "chat": {"id": int(chat_id)}, "date": int(time.time()), "text": text},
+        }
+        updates.append(update)
+        if updates and rng.random() < args.redelivery_rate:
+            # Telegram redelivers an update whose webhook call timed out.
+            updates.append(rng.choice(updates))
+    return updates
+
+def run_webhook_phase(args, rng, telegram):
+    import telegramWebhookHandler
+
+    table = FakeTable(seed=args.seed)
+    use_table(table)
+    events = [{"body": json.dumps(update)} for update in build_updates(args, rng)]
+    telegram_before = sum(telegram.stats()["calls"].values())
+
+    def invoke(event):
+        start = time.perf_counter()
+        response = telegramWebhookHandler.lambda_handler(event, None)
+        return time.perf_counter() - start, response["statusCode"]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(EmfCapture()), ThreadPoolExecutor(max_workers=args.webhook_workers) as pool:
+        results = list(pool.map(invoke, events))
+    elapsed = time.perf_counter() - start
+    return {
+        "updates": len(events),
+        "errors": sum(1 for _, status in results if status != 200),
+        "seconds": elapsed,
+        "updates_per_second": len(events) / elapsed,
+        "latency_ms": percentiles([latency for latency, _ in results], 1000),
+        "telegram_calls": sum(telegram.stats()["calls"].values()) - telegram_before,
+        "db": table.stats(),
+    }
+
+# --- Due-Reminder Burst ---
+def seed_due_reminders(args, rng):
+    """
+    Writes `--reminders` reminders with exactly one delivery each due within the last
+    `--due-window` seconds: the final reminder, or for `--early-share` of them the heads-up
+    (their final reminder comes later). Returns the epoch the burst ends at.
+    """
+    from reminderStore import build_reminder_item, get_store
+
+    if args.reminders > args.chats * args.due_window / 2:
+        raise SystemExit("Too many reminders for the chats and due window; raise --chats or --due-window.")
+    now = datetime.now(timezone.utc)
+    pick_chat = chat_picker(rng, args.chats)
+    items, keys = [], set()
+    for offset in sorted((rng.uniform(0, args.due_window) for _ in range(args.reminders)), reverse=True):
+        early = rng.choice([5, 10, 15]) if rng.random() < args.early_share else None
+        when = now - timedelta(seconds=offset) + timedelta(minutes=early or 0)
+        # reminder_time (the sort key) has one-second resolution, so a chat gets one per second.
+        chat_id = pick_chat()[0]
+        while (chat_id, int(when.timestamp())) in keys:
+            chat_id = pick_chat()[0]
+        keys.add((chat_id, int(when.timestamp())))
+        items.append(build_reminder_item(chat_id, rng.choice(TASKS), when, early, None))
+    get_store().put_many(items)
+    return now.timestamp()
+
+def due_left(table, burst_end):
+    """Deliveries of the burst not sent yet: pending heads-ups and final reminders due by `burst_end`."""
+    from reminderStore import expand_item, key_epoch
+
+    with table.lock:
+        items = [expand_item(dict(item)) for item in table.items.values() if not item['user_id'].startswith("update#")]
+    return sum(1 for item in items if 'early_status' in item or key_epoch(item['reminder_time']) <= burst_end)
+
+def run_sender_phase(args, rng, telegram):
+    import reminderSender
+
+    table = FakeTable(seed=args.seed)
+    use_table(table)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(EmfCapture()):
+        burst_end = seed_due_reminders(args, rng)
+    seed_seconds = time.perf_counter() - start
+    seed_db = table.stats()
+    table.reset_stats()
+    # Throttling only applies to the run under test, not to seeding.
+    table.unprocessed_rate = args.unprocessed_rate
+    telegram_before = telegram.stats()
+
+    capture = EmfCapture()
+    ticks = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(capture):
+        while due_left(table, burst_end) and ticks < args.max_ticks:
+            if ticks:
+                # Parked retries become due after Telegram's retry_after; the real schedule is once a minute.
+                time.sleep(args.tick_interval)
+            reminderSender.lambda_handler({}, LambdaContext(args.sender_timeout))
+            ticks += 1
+    elapsed = time.perf_counter() - start
+    telegram_after = telegram.stats()
+    sent = int(capture.total("Sent"))
+    left = due_left(table, burst_end)
+    return {
+        "reminders": args.reminders,
+        "seed_seconds": seed_seconds,
+        "seed_db": seed_db,
+        "ticks": ticks,
+        "left_over": left,
+        "seconds": elapsed,
+        "messages_sent": sent,
+        "messages_per_second": sent / elapsed if elapsed else 0.0,
+        "reminders_per_second": (args.reminders - left) / elapsed if elapsed else 0.0,
+        "failed": int(capture.total("Failed")),
+        "deferred": int(capture.total("Deferred")),
+        "tick_ms": capture.values.get("TickMs", []),
+        "dispatch_lag_s": percentiles(capture.values.get("DispatchLag", [])),
+        "telegram_call_ms": percentiles(capture.values.get("TelegramCallMs", [])),
+        "telegram_429": sum(telegram_after["rate_limited"].values()) - sum(telegram_before["rate_limited"].values()),
+        "db": table.stats(),
+    }
+
+# --- Report ---
+def format_percentiles(p, unit):
+    return f"p50 {p['p50']:.1f}{unit}  p90 {p['p90']:.1f}{unit}  p99 {p['p99']:.1f}{unit}  max {p['max']:.1f}{unit}"
+
+def format_db(db):
+    ops = ", ".join(f"{name} {count:,}" for name, count in sorted(db["ops"].items()))
+    return f"{ops or 'none'}\n    {db['read_units']:,.1f} RCU, {db['write_units']:,} WCU, {db['items']:,} items left"
+
+def print_report(webhook, sender):
+    if webhook:
+        print(f"\nWebhook: {webhook['updates']:,} updates in {webhook['seconds']:.1f}s "
+              f"({webhook['updates_per_second']:,.0f}/s), {webhook['errors']} errors, "
+              f"{webhook['telegram_calls']:,} outbound Telegram calls")
+        print(f"  latency   {format_percentiles(webhook['latency_ms'], 'ms')}")
+        print(f"  DynamoDB  {format_db(webhook['db'])}")
+    if sender:
+        print(f"\nSender: {sender['reminders']:,} due reminders, seeded in {sender['seed_seconds']:.1f}s")
+        print(f"  {sender['ticks']} ticks in {sender['seconds']:.1f}s: {sender['reminders_per_second']:,.0f} reminders/s, "
+              f"{sender['messages_sent']:,} messages ({sender['messages_per_second']:,.0f}/s), "
+              f"{sender['failed']} failed, {sender['deferred']} deferred, {sender['left_over']:,} left over")
+        print(f"  lag       {format_percentiles(sender['dispatch_lag_s'], 's')}")
+        print(f"  Telegram  {format_percentiles(sender['telegram_call_ms'], 'ms')}, {sender['telegram_429']:,} answered 429")
+        print(f"  seeding   {format_db(sender['seed_db'])}")
+        print(f"  DynamoDB  {format_db(sender['db'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the webhook and sender handlers against local Telegram and DynamoDB stand-ins.")
+    parser.add_argument("--webhook-updates", type=int, default=5000, help="Webhook updates to send (0 skips the phase).")
+    parser.add_argument("--webhook-workers", type=int, default=8, help="Concurrent webhook invocations.")
+    parser.add_argument("--redelivery-rate", type=float, default=0.02, help="Share of updates Telegram delivers twice.")
+    parser.add_argument("--reminders", type=int, default=10000, help="Due reminders in the sender burst (0 skips the phase).")
+    parser.add_argument("--chats", type=int, default=2000, help="Distinct chats the traffic is spread over.")
+    parser.add_argument("--early-share", type=float, default=0.2, help="Share of reminders with an early heads-up.")
+    parser.add_argument("--due-window", type=float, default=60, help="Seconds over which the burst fell due.")
+    parser.add_argument("--latency-ms", type=float, default=40, help="Simulated Bot API latency.")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Mean extra latency (exponential).")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Share of Bot API calls answered with a random 429.")
+    parser.add_argument("--telegram-global-limit", type=float, default=None, help="Messages/s the stand-in accepts before answering 429.")
+    parser.add_argument("--telegram-chat-limit", type=float, default=None, help="Messages/s per chat the stand-in accepts.")
+    parser.add_argument("--global-rate", type=float, default=1000, help="TELEGRAM_GLOBAL_RATE for the sender.")
+    parser.add_argument("--per-chat-rate", type=float, default=20, help="TELEGRAM_PER_CHAT_RATE for the sender.")
+    parser.add_argument("--unprocessed-rate", type=float, default=0.0, help="Share of BatchWriteItem requests left unprocessed.")
+    parser.add_argument("--sender-timeout", type=float, default=900, help="Lambda timeout of each sender tick, in seconds.")
+    parser.add_argument("--max-ticks", type=int, default=20)
+    parser.add_argument("--tick-interval", type=float, default=1.5, help="Seconds between sender ticks.")
+    parser.add_argument("--seed", type=int, default=20250812)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    telegram = FakeTelegram(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        global_rate=args.telegram_global_limit, per_chat_rate=args.telegram_chat_limit, seed=args.seed,
+    )
+    configure(args, telegram.start())
+    try:
+        webhook = run_webhook_phase(args, rng, telegram) if args.webhook_updates else None
+        sender = run_sender_phase(args, rng, telegram) if args.reminders else None
+    finally:
+        telegram.stop()
+
+    if args.json:
+        print(json.dumps({"webhook": webhook, "sender": sender, "telegram": telegram.stats()}, indent=2))
+    else:
+        print_report(webhook, sender)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import legacyParser
+import reminderParser
+from reminderParser import IST
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "remind_corpus.txt")
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+def outcome(parse, command, now):
+    """The parse result, or the error type and message, so failures can be compared too."""
+    try:
+        return parse(command, now=now)
+    except Exception as e:
+        return (type(e).__name__, str(e))
+
+def engine_parse(command, now=None):
+    """reminderParser's result without the recurrence field, which the legacy parser does not have."""
+    task_text, when, early_minutes, _ = reminderParser.parse_reminder_command(command, now=now)
+    return task_text, when, early_minutes
+
+def check_equivalence(corpus, base_now):
+    """Compares both parsers on every command, once for each weekday so the 'same day' rules are covered."""
+    mismatches = []
+    for offset in range(7):
+        now = base_now + timedelta(days=offset)
+        for command in corpus:
+            expected = outcome(legacyParser.parse_reminder_command, command, now)
+            actual = outcome(engine_parse, command, now)
+            if expected != actual:
+                mismatches.append((now, command, expected, actual))
+    return mismatches
+
+def measure(parse, corpus, now, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for command in corpus:
+            start = time.perf_counter()
+            try:
+                parse(command, now=now)
+            except Exception:
+                pass
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "parses_per_second": len(latencies) / total,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reminderParser against the legacy regex cascade.")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    now = datetime(2026, 3, 2, 10, 17, 42, tzinfo=IST)
+
+    mismatches = check_equivalence(corpus, now)
+    print(f"Corpus: {len(corpus)} commands, {len(mismatches)} mismatches over 7 reference days.")
+    for mismatch_now, command, expected, actual in mismatches[:10]:
+        print(f"  ❌ {mismatch_now:%a} {command!r}\n     legacy: {expected}\n     engine: {actual}")
+
+    results = {
+        "legacy": measure(legacyParser.parse_reminder_command, corpus, now, args.rounds),
+        "engine": measure(reminderParser.parse_reminder_command, corpus, now, args.rounds),
+    }
+    print(f"\n{'parser':<8} {'parses/sec':>12} {'p50 (us)':>10} {'p99 (us)':>10}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['parses_per_second']:>12,.0f} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f}")
+    speedup = results["engine"]["parses_per_second"] / results["legacy"]["parses_per_second"]
+    print(f"\nSpeed-up: {speedup:.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,374 @@
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from awsResources import get_table
+from instrumentation import timer
+from reminderStore import (
+    BATCH_WRITE_SIZE, EARLY, EXPIRES_AT, FINAL, INFLIGHT, KIND_ATTRIBUTES, LEASE_SECONDS, PENDING, RETRY,
+    UPDATE_IN_PROGRESS, UPDATE_KEY_PREFIX, UPDATE_RESPONSE, UPDATE_SORT_KEY, UPDATE_STATE, ReminderStore, SlotTaken, expand_item, iter_merged, pending_partitions, pending_status,
+    time_ranges, update_marker_item, update_marker_state,
+)
+
+# How often a batch's UnprocessedItems are resent before falling back to single writes.
+BATCH_WRITE_RETRIES = int(os.environ.get("DYNAMO_BATCH_WRITE_RETRIES", "5"))
+
+# Processed webhook updates share the table (see update_marker_item), carry no status attributes
+# so they stay out of both GSIs, and expire through DynamoDB TTL.
+
+# --- Index Definitions ---
+FINAL_INDEX = 'StatusAndTimeIndex'
+EARLY_INDEX = 'EarlyStatusAndTimeIndex'
+
+# Only the attributes the sender needs to render and acknowledge a reminder, under both their
+# full and compact names (see COMPACT_NAMES). Recurring reminders also need their rule and
+# early offset to write the next occurrence.
+FINAL_PROJECTION = (
+    "user_id, reminder_time, reminder_text, tx, retry_count, recurrence, rc, early_reminder_minutes, em"
+)
+EARLY_PROJECTION = (
+    "user_id, reminder_time, reminder_text, tx, early_reminder_time, early_reminder_minutes, em, early_retry_count"
+)
+# What the lease reaper needs to hand an expired claim back.
+LEASE_PROJECTION = "user_id, reminder_time, lease_expires, early_lease_expires"
+# What /list renders; reminder_time is the table sort key, so queries come back in order.
+LIST_PROJECTION = "reminder_time, reminder_text, tx, recurrence, rc"
+
+# --- Timed Calls ---
+def _query(table, **kwargs):
+    with timer("DbQuery"):
+        return table.query(**kwargs)
+
+def _write(operation, **kwargs):
+    with timer("DbWrite"):
+        return operation(**kwargs)
+
+# --- Paginated Query Pipeline ---
+def iter_query_pages(table, should_continue=None, **query_kwargs):
+    """
+    Yields the Items of every page of a DynamoDB query, following LastEvaluatedKey.
+    The next page is fetched in the background while the caller works on the current one.
+    Stops before requesting another page once `should_continue()` returns False.
+    """
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="query") as prefetcher:
+        future = prefetcher.submit(_query, table, **query_kwargs)
+        while future is not None:
+            page = future.result()
+            last_key = page.get('LastEvaluatedKey')
+            future = None
+            if last_key and (should_continue is None or should_continue()):
+                future = prefetcher.submit(_query, table, ExclusiveStartKey=last_key, **query_kwargs)
+            elif last_key:
+                print("⏱️ Time budget nearly used up; leaving remaining pages for the next run.")
+            yield page.get('Items', [])
+
+def _iter_due_final(table, now_utc_iso, should_continue=None, since_iso=None):
+    """
+    Streams final reminders due before `now_utc_iso` from every status shard (and time encoding)
+    in parallel. With `since_iso` only the window [since_iso, now_utc_iso] is read.
+    """
+    items = iter_merged([
+        iter_query_pages(
+            table,
+            should_continue,
+            IndexName=FINAL_INDEX,
+            KeyConditionExpression=Key('status').eq(partition) & Key('reminder_time').between(low, high),
+            ProjectionExpression=FINAL_PROJECTION,
+        )
+        for partition in pending_partitions()
+        for low, high in time_ranges(now_utc_iso, since_iso)
+    ])
+    return (expand_item(item) for item in items)
+
+def _iter_due_early(table, now_utc_iso, should_continue=None, since_iso=None):
+    """
+    Streams early heads-ups due before `now_utc_iso` from every status shard (and time encoding)
+    in parallel. With `since_iso` only the window [since_iso, now_utc_iso] is read.
+    """
+    items = iter_merged([
+        iter_query_pages(
+            table,
+            should_continue,
+            IndexName=EARLY_INDEX,
+            KeyConditionExpression=Key('early_status').eq(partition) & Key('early_reminder_time').between(low, high),
+            ProjectionExpression=EARLY_PROJECTION,
+        )
+        for partition in pending_partitions()
+        for low, high in time_ranges(now_utc_iso, since_iso)
+    ])
+    return (expand_item(item) for item in items)
+
+def _iter_expired_leases(table, kind, now_epoch):
+    """Yields in-flight items of `kind` whose lease expired before `now_epoch`."""
+    attrs = KIND_ATTRIBUTES[kind]
+    for items in iter_query_pages(
+        table,
+        IndexName=FINAL_INDEX if kind == FINAL else EARLY_INDEX,
+        KeyConditionExpression=Key(attrs.status).eq(INFLIGHT),
+        FilterExpression=Attr(attrs.lease_expires).lt(now_epoch),
+        ProjectionExpression=LEASE_PROJECTION,
+    ):
+        yield from items
+
+def _iter_due_retries(table, kind, now_epoch, should_continue=None):
+    """Yields items of `kind` parked in RETRY whose retry_at has passed."""
+    attrs = KIND_ATTRIBUTES[kind]
+    for items in iter_query_pages(
+        table,
+        should_continue,
+        IndexName=FINAL_INDEX if kind == FINAL else EARLY_INDEX,
+        KeyConditionExpression=Key(attrs.status).eq(RETRY),
+        FilterExpression=Attr(attrs.retry_at).lte(now_epoch),
+        ProjectionExpression=FINAL_PROJECTION if kind == FINAL else EARLY_PROJECTION,
+    ):
+        for item in items:
+            yield expand_item(item)
+
+def _conditional(operation, **kwargs):
+    """Runs a conditional write; returns its response, or None if the condition did not hold."""
+    try:
+        return _write(operation, **kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return None
+
+# --- Batched Writes ---
+def _batch_write(table, requests):
+    """
+    Sends Put/DeleteRequests with BatchWriteItem, BATCH_WRITE_SIZE at a time, resending
+    UnprocessedItems with jittered exponential backoff. Returns the requests still unprocessed
+    after BATCH_WRITE_RETRIES resends, for the caller to write one by one.
+    """
+    client = table.meta.client
+    leftover = []
+    for i in range(0, len(requests), BATCH_WRITE_SIZE):
+        pending = {table.name: requests[i:i + BATCH_WRITE_SIZE]}
+        for attempt in range(BATCH_WRITE_RETRIES + 1):
+            if attempt:
+                time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+            pending = _write(client.batch_write_item, RequestItems=pending).get('UnprocessedItems') or {}
+            if not pending:
+                break
+        leftover.extend(pending.get(table.name, []))
+    if leftover:
+        print(f"⚠️ {len(leftover)} batched writes stayed unprocessed; writing them one by one.")
+    return leftover
+
+# --- Per-User Listing ---
+def _query_user_page(table, user_id, limit, after=None, before=None):
+    """
+    Reads one page of a user's reminders in reminder_time order.
+    `after` continues forward past that reminder_time, `before` walks backwards from it.
+    Returns (items in ascending order, whether more items exist in the direction read).
+    """
+    kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(user_id),
+        'ProjectionExpression': LIST_PROJECTION,
+        # One extra item tells us whether another page exists.
+        'Limit': limit + 1,
+    }
+    cursor = after or before
+    if cursor:
+        kwargs['ExclusiveStartKey'] = {'user_id': user_id, 'reminder_time': cursor}
+    if before:
+        kwargs['ScanIndexForward'] = False
+    items = [expand_item(item) for item in _query(table, **kwargs).get('Items', [])]
+    has_more = len(items) > limit
+    items = items[:limit]
+    if before:
+        items.reverse()
+    return items, has_more
+
+def _get_user_reminder_at(table, user_id, index):
+    """Returns the user's `index`-th (1-based) upcoming reminder, reading only the first `index` keys."""
+    kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(user_id),
+        'ProjectionExpression': LIST_PROJECTION,
+        'Limit': index,
+    }
+    seen = 0
+    while True:
+        page = _query(table, **kwargs)
+        items = page.get('Items', [])
+        if seen + len(items) >= index:
+            return expand_item(items[index - seen - 1])
+        seen += len(items)
+        if 'LastEvaluatedKey' not in page:
+            return None
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+        kwargs['Limit'] = index - seen
+
+# --- DynamoDB Store ---
+class DynamoReminderStore(ReminderStore):
+    """The production backend: the Reminders table and its two status GSIs."""
+
+    def __init__(self, table=None):
+        self._table = table
+
+    @property
+    def table(self):
+        return self._table or get_table()
+
+    def put(self, item):
+        _write(self.table.put_item, Item=item)
+
+    def delete(self, user_id, reminder_time, owner=None):
+        kwargs = {'Key': {'user_id': user_id, 'reminder_time': reminder_time}, 'ReturnValues': 'ALL_OLD'}
+        if owner is not None:
+            kwargs['ConditionExpression'] = Attr('lease_owner').eq(owner)
+        resp = _conditional(self.table.delete_item, **kwargs)
+        return expand_item(resp['Attributes']) if resp and 'Attributes' in resp else None
+
+    def complete_early(self, user_id, reminder_time, owner=None):
+        # Remove the early status (and its lease) so it's not sent again
+        kwargs = {
+            'Key': {'user_id': user_id, 'reminder_time': reminder_time},
+            'UpdateExpression': (
+                "REMOVE early_status, early_reminder_time, early_lease_owner, early_lease_expires,"
+                " early_retry_at, early_retry_count, early_last_error"
+            ),
+        }
+        if owner is not None:
+            kwargs['ConditionExpression'] = Attr('early_lease_owner').eq(owner)
+        _conditional(self.table.update_item, **kwargs)
+
+    def claim(self, kind, user_id, reminder_time, owner, lease_seconds=LEASE_SECONDS):
+        attrs = KIND_ATTRIBUTES[kind]
+        now = int(time.time())
+        resp = _conditional(
+            self.table.update_item,
+            Key={'user_id': user_id, 'reminder_time': reminder_time},
+            UpdateExpression=f"SET #s = :inflight, {attrs.lease_owner} = :owner, {attrs.lease_expires} = :expires",
+            ConditionExpression=f"begins_with(#s, :pending) OR (#s = :retry AND {attrs.retry_at} <= :now)",
+            ExpressionAttributeNames={'#s': attrs.status},
+            ExpressionAttributeValues={
+                ':inflight': INFLIGHT,
+                ':owner': owner,
+                ':expires': now + lease_seconds,
+                ':pending': PENDING,
+                ':retry': RETRY,
+                ':now': now,
+            },
+        )
+        return resp is not None
+
+    def schedule_retry(self, kind, user_id, reminder_time, owner, retry_at, retry_count, error):
+        attrs = KIND_ATTRIBUTES[kind]
+        resp = _conditional(
+            self.table.update_item,
+            Key={'user_id': user_id, 'reminder_time': reminder_time},
+            UpdateExpression=(
+                f"SET #s = :retry, {attrs.retry_at} = :at, {attrs.retry_count} = :count, {attrs.last_error} = :error"
+                f" REMOVE {attrs.lease_owner}, {attrs.lease_expires}"
+            ),
+            ConditionExpression=f"{attrs.lease_owner} = :owner",
+            ExpressionAttributeNames={'#s': attrs.status},
+            ExpressionAttributeValues={
+                ':retry': RETRY,
+                ':at': int(retry_at),
+                ':count': retry_count,
+                ':error': error,
+                ':owner': owner,
+            },
+        )
+        return resp is not None
+
+    def iter_due_retries(self, kind, now_epoch, should_continue=None):
+        return _iter_due_retries(self.table, kind, now_epoch, should_continue)
+
+    def put_many(self, items):
+        # Later items win on duplicate keys, like consecutive put_item calls would.
+        unique = {(item['user_id'], item['reminder_time']): item for item in items}
+        for request in _batch_write(self.table, [{'PutRequest': {'Item': item}} for item in unique.values()]):
+            _write(self.table.put_item, Item=request['PutRequest']['Item'])
+
+    def delete_many(self, keys):
+        requests = [
+            {'DeleteRequest': {'Key': {'user_id': user_id, 'reminder_time': reminder_time}}}
+            for user_id, reminder_time in dict.fromkeys(keys)
+        ]
+        for request in _batch_write(self.table, requests):
+            _write(self.table.delete_item, Key=request['DeleteRequest']['Key'])
+
+    def advance_recurring(self, user_id, reminder_time, next_item, owner=None):
+        delete = {'TableName': self.table.name, 'Key': {'user_id': user_id, 'reminder_time': reminder_time}}
+        if owner is not None:
+            delete['ConditionExpression'] = "lease_owner = :owner"
+            delete['ExpressionAttributeValues'] = {':owner': owner}
+        put = {'TableName': self.table.name, 'Item': next_item, 'ConditionExpression': "attribute_not_exists(user_id)"}
+        try:
+            _write(self.table.meta.client.transact_write_items, TransactItems=[{'Put': put}, {'Delete': delete}])
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            put_failed, delete_failed = [
+                reason.get('Code') == 'ConditionalCheckFailed' for reason in e.response.get('CancellationReasons') or [{}, {}]
+            ]
+            if put_failed and not delete_failed:
+                raise SlotTaken(next_item['reminder_time'])
+            return False
+        return True
+
+    def claim_update(self, update_id, ttl_seconds):
+        now = int(time.time())
+        key = {'user_id': f"{UPDATE_KEY_PREFIX}{update_id}", 'reminder_time': UPDATE_SORT_KEY}
+        resp = _conditional(
+            self.table.put_item,
+            Item={**key, UPDATE_STATE: UPDATE_IN_PROGRESS, EXPIRES_AT: now + ttl_seconds},
+            # TTL deletes lazily, so an expired marker counts as absent.
+            ConditionExpression=Attr('user_id').not_exists() | Attr(EXPIRES_AT).lt(now),
+        )
+        if resp is not None:
+            return None
+        with timer("DbQuery"):
+            marker = self.table.get_item(Key=key, ConsistentRead=True).get('Item')
+        if not marker:
+            # Released since our write failed: let the caller ask for a redelivery.
+            return {'done': False, 'response': None}
+        state = update_marker_state(marker.get(UPDATE_STATE), marker.get(UPDATE_RESPONSE), marker[EXPIRES_AT], now)
+        return state or {'done': False, 'response': None}
+
+    def complete_update(self, update_id, response, ttl_seconds):
+        _write(self.table.put_item, Item=update_marker_item(update_id, response, ttl_seconds))
+
+    def release_update(self, update_id):
+        _write(self.table.delete_item, Key={'user_id': f"{UPDATE_KEY_PREFIX}{update_id}", 'reminder_time': UPDATE_SORT_KEY})
+
+    def reclaim_expired(self, now_epoch):
+        reclaimed = 0
+        for kind in (EARLY, FINAL):
+            attrs = KIND_ATTRIBUTES[kind]
+            for item in _iter_expired_leases(self.table, kind, now_epoch):
+                # Only hand it back if nobody re-claimed or acknowledged it since we read it.
+                resp = _conditional(
+                    self.table.update_item,
+                    Key={'user_id': item['user_id'], 'reminder_time': item['reminder_time']},
+                    UpdateExpression=f"SET #s = :pending REMOVE {attrs.lease_owner}, {attrs.lease_expires}",
+                    ConditionExpression=f"#s = :inflight AND {attrs.lease_expires} = :expires",
+                    ExpressionAttributeNames={'#s': attrs.status},
+                    ExpressionAttributeValues={
+                        ':pending': pending_status(item['user_id'], item['reminder_time']),
+                        ':inflight': INFLIGHT,
+                        ':expires': item[attrs.lease_expires],
+                    },
+                )
+                reclaimed += resp is not None
+        return reclaimed
+
+    def list_user_page(self, user_id, limit, after=None, before=None):
+        return _query_user_page(self.table, user_id, limit, after, before)
+
+    def get_user_reminder_at(self, user_id, index):
+        return _get_user_reminder_at(self.table, user_id, index)
+
+    def iter_due_final(self, now_utc_iso, should_continue=None, since_iso=None):
+        return _iter_due_final(self.table, now_utc_iso, should_continue, since_iso)
+
+    def iter_due_early(self, now_utc_iso, should_continue=None, since_iso=None):
+        return _iter_due_early(self.table, now_utc_iso, should_continue, since_iso)
+
+    def stream_arn(self):
+        return getattr(self.table, 'latest_stream_arn', None)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+# --- Configuration ---
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "ReminderBot")
+# Fraction of invocations whose metrics are recorded and emitted (1 = every invocation).
+METRICS_SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE", "1"))
+# CloudWatch accepts at most 100 values per metric in one EMF document.
+EMF_MAX_VALUES = 100
+
+MILLISECONDS, SECONDS, COUNT = "Milliseconds", "Seconds", "Count"
+
+# --- Metrics ---
+class Metrics:
+    """
+    Collects the stage timings and values of one invocation (or one scheduler report window)
+    and writes them to the log as CloudWatch Embedded Metric Format (EMF) JSON, which
+    CloudWatch turns into metrics with p50/p99 statistics without any log parsing.
+    Unsampled instances record nothing, so instrumented code costs almost nothing then.
+    """
+
+    def __init__(self, service, sample_rate=METRICS_SAMPLE_RATE, namespace=METRICS_NAMESPACE):
+        self.service = service
+        self.namespace = namespace
+        self.sampled = sample_rate >= 1 or random.random() < sample_rate
+        self.values = {}
+        self.units = {}
+        self.properties = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, value, unit=MILLISECONDS):
+        if not self.sampled:
+            return
+        with self.lock:
+            self.values.setdefault(name, []).append(value)
+            self.units[name] = unit
+
+    def count(self, name, n=1):
+        """Adds `n` to a counter that is emitted as a single value."""
+        if not self.sampled:
+            return
+        with self.lock:
+            values = self.values.setdefault(name, [0])
+            values[0] += n
+            self.units[name] = COUNT
+
+    def set_property(self, key, value):
+        """Attaches a searchable, non-metric field to the emitted log line."""
+        if self.sampled:
+            self.properties[key] = value
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the body of a `with` block as `<stage>Ms`."""
+        if not self.sampled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(f"{stage}Ms", round((time.perf_counter() - start) * 1000, 3))
+
+    def documents(self):
+        """The EMF documents for everything recorded so far (several if a metric has over 100 values)."""
+        with self.lock:
+            values = {name: list(v) for name, v in self.values.items()}
+        chunks = max((len(v) + EMF_MAX_VALUES - 1) // EMF_MAX_VALUES for v in values.values()) if values else 0
+        timestamp = int(time.time() * 1000)
+        documents = []
+        for i in range(chunks):
+            part = {
+                name: v[i * EMF_MAX_VALUES:(i + 1) * EMF_MAX_VALUES]
+                for name, v in values.items()
+                if v[i * EMF_MAX_VALUES:(i + 1) * EMF_MAX_VALUES]
+            }
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [["Service"]],
+                        "Metrics": [{"Name": name, "Unit": self.units[name]} for name in part],
+                    }],
+                },
+                "Service": self.service,
+                **self.properties,
+            }
+            document.update({name: v[0] if len(v) == 1 else v for name, v in part.items()})
+            documents.append(document)
+        return documents
+
+    def emit(self):
+        """Prints the EMF documents (one JSON line each) and clears the recorded values."""
+        if not self.sampled:
+            return
+        for document in self.documents():
+            print(json.dumps(document, separators=(",", ":"), default=str))
+        with self.lock:
+            self.values.clear()
+
+# --- Current Invocation ---
+# One Lambda container handles one invocation at a time, so a process-wide "current"
+# instance is enough for the store and the Telegram client to report into.
+_current = Metrics("idle", sample_rate=0)
+
+def start_metrics(service, sample_rate=METRICS_SAMPLE_RATE):
+    """Starts a fresh Metrics for this invocation and makes it the current one."""
+    global _current
+    _current = Metrics(service, sample_rate)
+    return _current
+
+def get_metrics():
+    return _current
+
+def timer(stage):
+    """Times a block into the current invocation's metrics."""
+    return _current.timer(stage)
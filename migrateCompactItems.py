@@ -0,0 +1,88 @@
+import os
+import argparse
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from reminderStore import PENDING, compact_item, is_compact_time, is_pending, pending_status
+
+# --- Configuration ---
+DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "Reminders")
+
+
+def migrate_item(table, item, dry_run=False):
+    """
+    Replaces one version 1 (ISO-8601) item with its compact encoding. The reminder_time key
+    changes, so the new item is put and the old one deleted in one transaction; the delete is
+    conditional on the statuses read, so items a sender claimed meanwhile are skipped.
+    Returns True if the item was (or would be) migrated.
+    """
+    if is_compact_time(item['reminder_time']) or not is_pending(item.get('status')):
+        return False
+    if 'early_status' in item and not is_pending(item['early_status']):
+        return False
+    compact = compact_item(item)
+    # The shard is derived from the key, so it moves with the new reminder_time.
+    for attr in ('status', 'early_status'):
+        if attr in compact:
+            compact[attr] = pending_status(compact['user_id'], compact['reminder_time'])
+    if dry_run:
+        return True
+    names, values, conditions = {}, {}, []
+    for attr, alias in (('status', '#s'), ('early_status', '#es')):
+        names[alias] = attr
+        if attr in item:
+            values[f':{alias[1:]}'] = item[attr]
+            conditions.append(f"{alias} = :{alias[1:]}")
+        else:
+            conditions.append(f"attribute_not_exists({alias})")
+    try:
+        table.meta.client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': table.name,
+                'Item': compact,
+                'ConditionExpression': "attribute_not_exists(user_id)",
+            }},
+            {'Delete': {
+                'TableName': table.name,
+                'Key': {'user_id': item['user_id'], 'reminder_time': item['reminder_time']},
+                'ConditionExpression': " AND ".join(conditions),
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values,
+            }},
+        ])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        return False
+    return True
+
+def migrate(table, dry_run=False):
+    """Scans the table and re-encodes every pending version 1 reminder as a compact item."""
+    scanned = migrated = 0
+    kwargs = {'FilterExpression': Attr('status').begins_with(PENDING)}
+    while True:
+        page = table.scan(**kwargs)
+        for item in page.get('Items', []):
+            scanned += 1
+            if migrate_item(table, item, dry_run):
+                migrated += 1
+        if 'LastEvaluatedKey' not in page:
+            break
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    return scanned, migrated
+
+# --- Command Line ---
+def main():
+    parser = argparse.ArgumentParser(description="Re-encode pending reminders in the compact (version 2) item format.")
+    parser.add_argument("--table", default=DYNAMODB_TABLE, help="DynamoDB table name.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the items that would change.")
+    args = parser.parse_args()
+
+    table = boto3.resource('dynamodb').Table(args.table)
+    scanned, migrated = migrate(table, args.dry_run)
+    verb = "Would migrate" if args.dry_run else "Migrated"
+    print(f"✅ Scanned {scanned} pending reminders. {verb} {migrated} to the compact item format.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import argparse
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from reminderStore import PENDING, is_pending, pending_status
+
+# --- Configuration ---
+DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "Reminders")
+
+
+def rekey_item(table, item, shards, dry_run=False):
+    """
+    Moves one item's status/early_status to the shard it belongs to under `shards`.
+    The update is conditional on the old values, so items the sender touched meanwhile are skipped.
+    Returns True if the item was (or would be) re-keyed.
+    """
+    target = pending_status(item['user_id'], item['reminder_time'], shards)
+    names, values, sets, conditions = {}, {}, [], []
+    for attr, alias in (('status', '#s'), ('early_status', '#es')):
+        current = item.get(attr)
+        if not is_pending(current) or current == target:
+            continue
+        names[alias] = attr
+        values[f':old{alias[1:]}'] = current
+        values[f':new{alias[1:]}'] = target
+        sets.append(f"{alias} = :new{alias[1:]}")
+        conditions.append(f"{alias} = :old{alias[1:]}")
+    if not sets:
+        return False
+    if dry_run:
+        return True
+    try:
+        table.update_item(
+            Key={'user_id': item['user_id'], 'reminder_time': item['reminder_time']},
+            UpdateExpression="SET " + ", ".join(sets),
+            ConditionExpression=" AND ".join(conditions),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+def migrate(table, shards, dry_run=False):
+    """Scans the table and re-keys every pending item to the `shards`-way scheme."""
+    scanned = rekeyed = 0
+    kwargs = {
+        'FilterExpression': Attr('status').begins_with(PENDING) | Attr('early_status').begins_with(PENDING),
+        'ProjectionExpression': "user_id, reminder_time, #s, early_status",
+        'ExpressionAttributeNames': {'#s': 'status'},
+    }
+    while True:
+        page = table.scan(**kwargs)
+        for item in page.get('Items', []):
+            scanned += 1
+            if rekey_item(table, item, shards, dry_run):
+                rekeyed += 1
+        if 'LastEvaluatedKey' not in page:
+            break
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    return scanned, rekeyed
+
+# --- Command Line ---
+def main():
+    parser = argparse.ArgumentParser(description="Re-key pending reminders onto the sharded status GSI partitions.")
+    parser.add_argument("--shards", type=int, required=True, help="Target shard count (must match STATUS_SHARDS).")
+    parser.add_argument("--table", default=DYNAMODB_TABLE, help="DynamoDB table name.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the items that would change.")
+    args = parser.parse_args()
+
+    table = boto3.resource('dynamodb').Table(args.table)
+    scanned, rekeyed = migrate(table, args.shards, args.dry_run)
+    verb = "Would re-key" if args.dry_run else "Re-keyed"
+    print(f"✅ Scanned {scanned} pending reminders. {verb} {rekeyed} onto {args.shards} shard(s).")
+
+
+if __name__ == "__main__":
+    main()
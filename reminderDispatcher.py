@@ -0,0 +1,241 @@
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import SECONDS, get_metrics
+
+# --- Configuration ---
+# Telegram allows roughly 30 messages/second overall and 1 message/second per chat.
+GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30"))
+PER_CHAT_RATE = float(os.environ.get("TELEGRAM_PER_CHAT_RATE", "1"))
+DISPATCH_WORKERS = int(os.environ.get("DISPATCH_WORKERS", "16"))
+# Stop fetching and sending once less than this much Lambda time is left.
+TIME_RESERVE_MS = int(os.environ.get("SENDER_TIME_RESERVE_MS", "10000"))
+# How often a long-running limiter drops the buckets of chats it has not sent to lately.
+CHAT_BUCKET_PRUNE_SECONDS = 60
+
+# --- Time Budget ---
+class TimeBudget:
+    """Tracks the Lambda deadline via context.get_remaining_time_in_millis()."""
+
+    def __init__(self, context=None, reserve_ms=TIME_RESERVE_MS):
+        self.context = context
+        self.reserve_ms = reserve_ms
+
+    def remaining_ms(self):
+        if self.context is None:
+            return float("inf")
+        return self.context.get_remaining_time_in_millis()
+
+    def exhausted(self):
+        return self.remaining_ms() <= self.reserve_ms
+
+    def has_time(self):
+        return not self.exhausted()
+
+# --- Rate Limiting ---
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now):
+        """True once the bucket has refilled to capacity, i.e. it behaves like a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class TelegramRateLimiter:
+    """
+    Combines the global bucket with one small bucket per chat. The buckets live in this process
+    only: two senders running at once each get the full budget, so split GLOBAL_RATE between them.
+    """
+
+    def __init__(self, global_rate=GLOBAL_RATE, per_chat_rate=PER_CHAT_RATE, clock=time.monotonic):
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.next_prune = clock() + CHAT_BUCKET_PRUNE_SECONDS
+
+    def _prune(self, now):
+        """Drops the buckets that have refilled; a missing bucket is recreated full, so nothing changes."""
+        self.chat_buckets = {
+            chat_id: bucket for chat_id, bucket in self.chat_buckets.items() if not bucket.is_full(now)
+        }
+        self.next_prune = now + CHAT_BUCKET_PRUNE_SECONDS
+
+    def acquire(self, chat_id):
+        """Blocks until a message may be sent to `chat_id`."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                if now >= self.next_prune:
+                    self._prune(now)
+                chat_bucket = self.chat_buckets.get(chat_id)
+                if chat_bucket is None:
+                    chat_bucket = self.chat_buckets[chat_id] = TokenBucket(
+                        self.per_chat_rate, capacity=1, clock=self.clock
+                    )
+                # Wait on the chat first so a slow chat never holds a global token.
+                wait = chat_bucket.wait_time(now) or self.global_bucket.wait_time(now)
+                if not wait:
+                    chat_bucket.take(now)
+                    self.global_bucket.take(now)
+                    return
+            time.sleep(wait)
+
+# --- Dispatch Statistics ---
+def _due_epoch(due_time):
+    if isinstance(due_time, (int, float)):
+        return due_time
+    if isinstance(due_time, datetime):
+        return due_time.timestamp()
+    return datetime.fromisoformat(due_time).timestamp()
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class DispatchStats:
+    """Per-tick throughput and dispatch lag (send time minus due time)."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.sent = 0
+        self.failed = 0
+        self.deferred = 0
+        self.skipped = 0
+        self.queue_peak = 0
+        self.lags = []
+        self.lock = threading.Lock()
+
+    def record(self, ok, lag_seconds):
+        with self.lock:
+            if ok:
+                self.sent += 1
+                self.lags.append(lag_seconds)
+            else:
+                self.failed += 1
+
+    def record_deferred(self):
+        with self.lock:
+            self.deferred += 1
+
+    def record_skipped(self):
+        with self.lock:
+            self.skipped += 1
+
+    def summary(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        lags = sorted(self.lags)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "skipped": self.skipped,
+            "queue_peak": self.queue_peak,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(self.sent / elapsed, 2) if elapsed > 0 else 0.0,
+            "lag_p50_seconds": round(_percentile(lags, 50), 3),
+            "lag_p99_seconds": round(_percentile(lags, 99), 3),
+            "lag_max_seconds": round(lags[-1], 3) if lags else 0.0,
+        }
+
+# --- Dispatcher ---
+class Dispatcher:
+    """
+    Fans reminder jobs out over a bounded worker pool while respecting Telegram's limits.
+    Jobs are submitted as they are discovered and run as soon as a worker and a token are free.
+    Jobs that have not started when the time budget runs out are deferred to the next run.
+    A job submitted with a `claim` callable only runs if the claim succeeds; claims lost to
+    another worker are counted as skipped and never use a rate-limit token.
+    """
+
+    def __init__(self, max_workers=DISPATCH_WORKERS, rate_limiter=None, budget=None):
+        self.rate_limiter = rate_limiter or TelegramRateLimiter()
+        self.budget = budget or TimeBudget()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+        self.stats = DispatchStats()
+        # Jobs submitted but not finished yet; its peak per tick is the queue depth.
+        self.queued = 0
+        self.queued_lock = threading.Lock()
+
+    def submit(self, chat_id, due_time, job, *args, claim=None):
+        """
+        Schedules `job(*args)`; the job returns a truthy value when the reminder was delivered.
+        `due_time` (epoch seconds, a datetime or an ISO-8601 string) is only used for the lag stats.
+        """
+        with self.queued_lock:
+            self.queued += 1
+            self.stats.queue_peak = max(self.stats.queue_peak, self.queued)
+        self.executor.submit(self._run, chat_id, due_time, job, args, claim)
+
+    def _run(self, chat_id, due_time, job, args, claim=None):
+        try:
+            self._dispatch(chat_id, due_time, job, args, claim)
+        finally:
+            with self.queued_lock:
+                self.queued -= 1
+
+    def _dispatch(self, chat_id, due_time, job, args, claim):
+        if self.budget.exhausted():
+            self.stats.record_deferred()
+            return
+        if claim is not None:
+            try:
+                claimed = claim(*args)
+            except Exception as e:
+                print(f"❌ Claim for chat_id {chat_id} failed: {e}")
+                claimed = False
+            if not claimed:
+                self.stats.record_skipped()
+                return
+        self.rate_limiter.acquire(chat_id)
+        try:
+            ok = job(*args)
+        except Exception as e:
+            print(f"❌ Dispatch job for chat_id {chat_id} failed: {e}")
+            ok = False
+        # Dispatch lag: when the message actually went out minus when it was due.
+        lag = time.time() - _due_epoch(due_time)
+        self.stats.record(bool(ok), lag)
+        if ok:
+            get_metrics().record("DispatchLag", lag, SECONDS)
+
+    def flush_stats(self):
+        """Returns the summary since the last flush and starts a new window (for long-running workers)."""
+        stats, self.stats = self.stats, DispatchStats()
+        stats.finished = time.monotonic()
+        return stats.summary()
+
+    def close(self):
+        """Waits for all submitted jobs and returns the tick summary."""
+        self.executor.shutdown(wait=True)
+        self.stats.finished = time.monotonic()
+        return self.stats.summary()
@@ -0,0 +1,245 @@
+import re
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# --- Configuration ---
+TIMEZONE = "Asia/Kolkata"
+IST = ZoneInfo(TIMEZONE)
+
+# --- Grammar ---
+# Every supported time expression sits at the end of the command, so all of them are
+# compiled once into a single end-anchored alternation. One scan finds the leftmost
+# position where any rule matches and `lastgroup` names the rule that did. The leading
+# lookahead lets the scan skip positions that cannot start any rule.
+_MONTHS = (
+    r'January|February|March|April|May|June|July|August|September|October|November|December|'
+    r'Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+)
+_MONTH_NUMBERS = {name: i for i, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+_WEEKDAYS = {name: i for i, name in enumerate(
+    ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday'))}
+
+def _time(name):
+    return r'(?P<' + name + r'>\d{1,2}:\d{2}\s*[ap]m|\d{1,2}:\d{2}|\d{1,2}\s*[ap]m)'
+
+_EARLY = re.compile(r'\b(early(\s+reminder)?)\s+(?P<value>\d+)(\s+(min|mins|minute|minutes))?\b', re.IGNORECASE)
+_EVERY = re.compile(
+    r'\bevery\s+(?:(?P<weekday>weekday)|(?P<day>day)|(?P<hours>\d+\s*)?(?:hours?|hrs?))\b', re.IGNORECASE
+)
+
+_GRAMMAR = re.compile(
+    r'(?=[\dadfimnostw])(?:'
+    # Rule 1: "in X minutes/hours"
+    r'(?P<in_x>in\s+(?P<in_value>\d+)\s+(?P<in_unit>minute|min|hour|hr)s?)'
+    # Rule 2: absolute date with a month name
+    r'|(?P<month_date>(on\s+)?(?P<md_day>\d{1,2})(st|nd|rd|th)?\s+(?P<md_month>' + _MONTHS + r')'
+    r'(\s+(?P<md_year>\d{4}))?(\s+at\s+' + _time('md_time') + r')?)'
+    # Rule 3: absolute numeric date
+    r'|(?P<numeric_date>(on\s+)?(?P<nd_date>\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/]\d{4})'
+    r'(\s+at\s+' + _time('nd_time') + r')?)'
+    # Rule 4: relative day and time
+    r'|(?P<day_time>((on|next|at)\s+)?(?P<dt_day>monday|tuesday|wednesday|thursday|friday|saturday|sunday|'
+    r'tomorrow|today|day\s+after\s+tomorrow)(\s+at\s+' + _time('dt_time') + r')?)'
+    # Rule 5: time only
+    r'|(?P<time_only>(at\s+)?' + _time('t_time') + r')'
+    r')\s*$',
+    re.IGNORECASE,
+)
+
+# --- Rule Handlers ---
+def _clock(time_str):
+    """Turns '5pm', '5:30 PM' or '17:30' into (hour, minute)."""
+    if not time_str:
+        return 0, 0
+    time_str = time_str.lower()
+    is_pm = time_str.endswith("pm")
+    is_am = time_str.endswith("am")
+    if is_pm or is_am:
+        time_str = time_str[:-2]
+    hour, _, minute = time_str.partition(":")
+    hour, minute = int(hour), int(minute) if minute else 0
+    if is_pm and hour < 12: hour += 12
+    if is_am and hour == 12: hour = 0
+    return hour, minute
+
+def _at(target_date, time_str):
+    hour, minute = _clock(time_str)
+    return datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
+
+def _in_x(match, now):
+    value = int(match.group('in_value'))
+    if match.group('in_unit').lower().startswith("min"):
+        return now + timedelta(minutes=value)
+    return now + timedelta(hours=value)
+
+def _month_date(match, now):
+    day = int(match.group('md_day'))
+    month_num = _MONTH_NUMBERS[match.group('md_month')[:3].lower()]
+    year = int(match.group('md_year')) if match.group('md_year') else now.year
+    return _at(datetime(year, month_num, day).date(), match.group('md_time'))
+
+def _numeric_date(match, now):
+    date_str = match.group('nd_date').replace('/', '-')
+    try: target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError: target_date = datetime.strptime(date_str, '%d-%m-%Y').date()
+    return _at(target_date, match.group('nd_time'))
+
+def _day_time(match, now):
+    day_str = match.group('dt_day').lower()
+    target_date = now.date()
+    if day_str == "tomorrow": target_date += timedelta(days=1)
+    elif day_str.startswith("day"): target_date += timedelta(days=2)
+    elif day_str != "today":
+        day_offset = (_WEEKDAYS[day_str] - now.weekday() + 7) % 7
+        if day_offset == 0: # If the matched day is today
+            # If the user said "next" or "on", they mean a week from now.
+            # If they just said the day (e.g., "Monday"), they mean today.
+            matched = match.group('day_time').lower()
+            if 'next' in matched or 'on' in matched:
+                day_offset = 7
+        target_date += timedelta(days=day_offset)
+    return _at(target_date, match.group('dt_time'))
+
+def _time_only(match, now):
+    hour, minute = _clock(match.group('t_time'))
+    potential_dt = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if potential_dt <= now:
+        potential_dt += timedelta(days=1)
+    return potential_dt
+
+_RULES = {
+    'in_x': _in_x,
+    'month_date': _month_date,
+    'numeric_date': _numeric_date,
+    'day_time': _day_time,
+    'time_only': _time_only,
+}
+
+# --- Recurrence ---
+# A recurring reminder is stored as one rule item whose reminder_time is its next occurrence.
+# Rules are kept as short strings: 'day', 'weekday' or '<N>h'.
+DAY, WEEKDAY = 'day', 'weekday'
+
+def _recurrence(match):
+    if match.group('weekday'):
+        return WEEKDAY
+    if match.group('day'):
+        return DAY
+    hours = int(match.group('hours') or 1)
+    if hours < 1:
+        raise ValueError("Repeating reminders need at least 1 hour between them.")
+    return f"{hours}h"
+
+def _skip_weekend(dt):
+    while dt.weekday() >= 5:
+        dt += timedelta(days=1)
+    return dt
+
+def next_occurrence(recurrence, occurrence, now=None):
+    """
+    The first occurrence of `recurrence` after `occurrence` (and after `now`, so a rule that
+    fell behind during an outage skips the missed slots instead of firing for each one).
+    Days are counted on the IST wall clock, so '9am every day' stays at 9am.
+    """
+    occurrence = occurrence.astimezone(IST)
+    now = now or occurrence
+    while True:
+        if recurrence == DAY:
+            occurrence += timedelta(days=1)
+        elif recurrence == WEEKDAY:
+            occurrence = _skip_weekend(occurrence + timedelta(days=1))
+        else:
+            occurrence += timedelta(hours=int(recurrence[:-1]))
+        if occurrence > now:
+            return occurrence
+
+def describe_recurrence(recurrence):
+    if recurrence == DAY:
+        return "every day"
+    if recurrence == WEEKDAY:
+        return "every weekday"
+    hours = int(recurrence[:-1])
+    return "every hour" if hours == 1 else f"every {hours} hours"
+
+def _find_every(command_body):
+    """
+    The "every ..." phrase that sets the recurrence, or None. It only counts at the end of the
+    command or right before the time expression, so "every hour counts" in the task text stays text.
+    """
+    for match in reversed(list(_EVERY.finditer(command_body))):
+        tail = command_body[match.end():]
+        if not tail.strip() or (tail[0].isspace() and _GRAMMAR.match(tail.lstrip())):
+            return match
+    return None
+
+# --- Reminder Parser ---
+def parse_reminder_command(command_text, now=None):
+    """
+    Parses a /remind command into (task text, IST datetime, early minutes, recurrence).
+    The time expression is recognised in a single pass over the precompiled grammar.
+    `recurrence` is None for one-shot reminders, otherwise a rule for next_occurrence().
+    """
+    command_body = command_text[len("/remind"):].strip()
+
+    early_minutes = 0
+    early_match = _EARLY.search(command_body)
+    if early_match:
+        early_minutes = int(early_match.group('value'))
+        command_body = command_body.replace(early_match.group(0), "").strip()
+
+    recurrence = None
+    every_match = _find_every(command_body)
+    if every_match:
+        recurrence = _recurrence(every_match)
+        command_body = (command_body[:every_match.start()] + " " + command_body[every_match.end():]).strip()
+        command_body = re.sub(r'\s+', ' ', command_body)
+
+    if not command_body:
+        raise ValueError("Cannot set a reminder with no text or time.")
+
+    now = now or datetime.now(IST)
+    match = _GRAMMAR.search(command_body)
+    if match:
+        task_text = command_body[:match.start()].strip()
+        target_dt = _RULES[match.lastgroup](match, now)
+    elif recurrence and recurrence.endswith("h"):
+        # "every 2 hours" on its own starts one interval from now.
+        task_text = command_body
+        target_dt = next_occurrence(recurrence, now)
+    elif recurrence:
+        raise ValueError("What time should it repeat at? Try something like 'every weekday at 9am'.")
+    else:
+        raise ValueError("I couldn't figure out the time. Try being more specific, like 'tomorrow at 5pm' or 'in 2 hours'.")
+    if recurrence == WEEKDAY:
+        target_dt = _skip_weekend(target_dt)
+
+    # --- FINAL PROCESSING ---
+    target_dt = target_dt.replace(second=0, microsecond=0)
+    if target_dt <= now.replace(second=0, microsecond=0):
+        raise ValueError("Oops! That time is in the past. Please set a reminder for the future.")
+
+    return task_text or "Reminder", target_dt, early_minutes, recurrence
+
+def split_bulk_command(command_text):
+    """
+    Returns the reminder lines of a multi-line /remind message (one reminder per line),
+    or None when the message holds a single reminder.
+    """
+    lines = [line.strip() for line in command_text[len("/remind"):].splitlines()]
+    lines = [line for line in lines if line]
+    return lines if len(lines) > 1 else None
+
+def parse_reminder_lines(lines, now=None):
+    """
+    Parses each line of a bulk /remind with one shared `now`.
+    Returns (line, parse_reminder_command() result or the ValueError) pairs in order.
+    """
+    now = now or datetime.now(IST)
+    results = []
+    for line in lines:
+        try:
+            results.append((line, parse_reminder_command("/remind " + line, now)))
+        except ValueError as e:
+            results.append((line, e))
+    return results
@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import uuid
+import heapq
+import signal
+import socket
+import threading
+from datetime import datetime, timezone
+from awsResources import get_streams
+from instrumentation import COUNT, start_metrics
+from reminderDispatcher import Dispatcher, TelegramRateLimiter
+from reminderStore import EARLY, FINAL, LEASE_SECONDS, AckBatcher, expand_item, get_store, is_pending, key_epoch
+from reminderSender import (
+    process_retries, reclaim_expired_leases, record_dispatch_stats, submit_by_chat,
+)
+
+# --- Configuration ---
+# How far ahead reminders are preloaded into memory.
+HORIZON_SECONDS = int(os.environ.get("SCHEDULER_HORIZON_SECONDS", "600"))
+# How often the horizon is extended (only the newly uncovered slice is queried).
+REFRESH_SECONDS = int(os.environ.get("SCHEDULER_REFRESH_SECONDS", "60"))
+# Without a DynamoDB Stream, the already-covered window is re-read this often to catch new reminders.
+RESCAN_SECONDS = int(os.environ.get("SCHEDULER_RESCAN_SECONDS", "15"))
+# Each rescan also reaches this far back past the previous one, for writes that were still in flight.
+RESCAN_SLACK_SECONDS = int(os.environ.get("SCHEDULER_RESCAN_SLACK_SECONDS", "10"))
+STREAM_POLL_SECONDS = float(os.environ.get("SCHEDULER_STREAM_POLL_SECONDS", "1"))
+# After a failed pass (store or stream error), wait this long, doubling per failure up to the max.
+ERROR_BACKOFF_SECONDS = float(os.environ.get("SCHEDULER_ERROR_BACKOFF_SECONDS", "1"))
+ERROR_MAX_BACKOFF_SECONDS = float(os.environ.get("SCHEDULER_ERROR_MAX_BACKOFF_SECONDS", "60"))
+
+def _iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+class TimerHeap:
+    """A min-heap of (due time, reminder) with lazy cancellation, keyed by (kind, user_id, reminder_time)."""
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, kind, due_epoch, item):
+        key = (kind, item['user_id'], item['reminder_time'])
+        if key in self.entries:
+            return False
+        self.counter += 1
+        entry = [due_epoch, self.counter, kind, item, True]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        return True
+
+    def cancel(self, kind, user_id, reminder_time):
+        entry = self.entries.pop((kind, user_id, reminder_time), None)
+        if entry:
+            entry[4] = False
+
+    def next_due(self):
+        while self.heap and not self.heap[0][4]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now_epoch):
+        due = []
+        while self.next_due() is not None and self.heap[0][0] <= now_epoch:
+            due_epoch, _, kind, item, _ = heapq.heappop(self.heap)
+            self.entries.pop((kind, item['user_id'], item['reminder_time']), None)
+            due.append((kind, due_epoch, item))
+        return due
+
+
+class StreamFollower:
+    """
+    Follows the table's DynamoDB Stream so new, changed and deleted reminders reach the
+    scheduler incrementally. Requires a stream with NEW_IMAGE (or NEW_AND_OLD_IMAGES).
+    """
+
+    def __init__(self, stream_arn):
+        self.stream_arn = stream_arn
+        self.iterators = {}
+        self.known_shards = set()
+        from boto3.dynamodb.types import TypeDeserializer
+        self.deserializer = TypeDeserializer()
+        self.discover(initial=True)
+
+    def discover(self, initial=False):
+        """Starts reading any shard not seen before; shards present at start-up are read from LATEST."""
+        kwargs = {'StreamArn': self.stream_arn}
+        while True:
+            description = get_streams().describe_stream(**kwargs)['StreamDescription']
+            for shard in description.get('Shards', []):
+                shard_id = shard['ShardId']
+                if shard_id in self.known_shards:
+                    continue
+                if initial and 'EndingSequenceNumber' in shard.get('SequenceNumberRange', {}):
+                    self.known_shards.add(shard_id)
+                    continue
+                self.known_shards.add(shard_id)
+                self.iterators[shard_id] = get_streams().get_shard_iterator(
+                    StreamArn=self.stream_arn,
+                    ShardId=shard_id,
+                    ShardIteratorType='LATEST' if initial else 'TRIM_HORIZON',
+                )['ShardIterator']
+            if 'LastEvaluatedShardId' not in description:
+                break
+            kwargs['ExclusiveStartShardId'] = description['LastEvaluatedShardId']
+
+    def _image(self, raw):
+        return {k: self.deserializer.deserialize(v) for k, v in (raw or {}).items()}
+
+    def poll(self):
+        """Returns the (event name, keys, new image) of every record since the last poll."""
+        events = []
+        for shard_id, iterator in list(self.iterators.items()):
+            resp = get_streams().get_records(ShardIterator=iterator)
+            for record in resp.get('Records', []):
+                change = record['dynamodb']
+                events.append((record['eventName'], self._image(change.get('Keys')), expand_item(self._image(change.get('NewImage')))))
+            if resp.get('NextShardIterator'):
+                self.iterators[shard_id] = resp['NextShardIterator']
+            else:
+                del self.iterators[shard_id]
+        return events
+
+
+class ReminderScheduler:
+    """
+    Keeps the next HORIZON_SECONDS of due reminders in a timer heap and sleeps until the
+    earliest deadline, so reminders fire within a fraction of a second of their time.
+    """
+
+    def __init__(self, dispatcher=None):
+        self.heap = TimerHeap()
+        self.metrics = start_metrics("scheduler")
+        self.dispatcher = dispatcher or Dispatcher(rate_limiter=TelegramRateLimiter())
+        self.covered_until = None
+        self.next_refresh = 0.0
+        self.next_rescan = 0.0
+        self.next_stream_poll = 0.0
+        # When the last rescan started; the next one reads on from there.
+        self.rescanned_from = None
+        self.items_read = 0
+        # Lease owner for every claim this worker makes.
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.acks = AckBatcher(get_store(), self.owner)
+        # Keys fired recently; late stream records or rescans must not schedule them again.
+        self.fired = {}
+        self.stop_event = threading.Event()
+        stream_arn = get_store().stream_arn()
+        self.stream = StreamFollower(stream_arn) if stream_arn else None
+        if not self.stream:
+            print("⚠️ No change stream on the store; new reminders are picked up by rescanning the horizon.")
+
+    # --- Loading ---
+    def schedule(self, kind, item):
+        if (kind, item['user_id'], item['reminder_time']) in self.fired:
+            return False
+        if kind == FINAL:
+            return self.heap.push(FINAL, key_epoch(item['reminder_time']), item)
+        return self.heap.push(EARLY, key_epoch(item['early_reminder_time']), item)
+
+    def load_window(self, since_epoch, until_epoch):
+        """Reads the due reminders in [since, until] from both indexes into the heap."""
+        since_iso = _iso(since_epoch) if since_epoch is not None else None
+        until_iso = _iso(until_epoch)
+        store = get_store()
+        for item in store.iter_due_early(until_iso, since_iso=since_iso):
+            self.items_read += 1
+            self.schedule(EARLY, item)
+        for item in store.iter_due_final(until_iso, since_iso=since_iso):
+            self.items_read += 1
+            self.schedule(FINAL, item)
+
+    def refresh(self, now):
+        """
+        Extends the covered window to now + HORIZON_SECONDS, reading only the new slice.
+        The first refresh also loads anything that became due while the worker was down, and
+        reminders whose lease expired are read again wherever they are due.
+        Failed sends waiting in the RETRY queue are drained at the same cadence.
+        """
+        until = now + HORIZON_SECONDS
+        first = self.covered_until is None
+        if reclaim_expired_leases() and not first:
+            # Reclaimed reminders are already due, behind every window read so far. Whatever
+            # this worker fired before the lease ran out must be allowed to fire again.
+            self.fired = {key: at for key, at in self.fired.items() if at > now - LEASE_SECONDS}
+            self.load_window(None, now)
+        self.load_window(self.covered_until, until)
+        self.covered_until = until
+        if first:
+            self.rescanned_from = now
+        elif not self.stream:
+            self.rescan(now)
+        process_retries(self.dispatcher, self.owner, self.acks)
+        if self.stream:
+            self.stream.discover()
+
+    def rescan(self, now):
+        """
+        Without a stream, reads the reminders created since the last rescan that fall due before
+        the next one: from the last rescan's start (less RESCAN_SLACK_SECONDS) to one rescan
+        interval ahead. Later reminders are read by the rescans that come closer to them.
+        """
+        since = (self.rescanned_from if self.rescanned_from is not None else now) - RESCAN_SLACK_SECONDS
+        self.load_window(since, min(self.covered_until, now + RESCAN_SECONDS + RESCAN_SLACK_SECONDS))
+        self.rescanned_from = now
+
+    def apply_stream_events(self):
+        for event_name, keys, image in self.stream.poll():
+            user_id, reminder_time = keys.get('user_id'), keys.get('reminder_time')
+            if event_name == 'REMOVE':
+                self.heap.cancel(FINAL, user_id, reminder_time)
+                self.heap.cancel(EARLY, user_id, reminder_time)
+                continue
+            # INSERT or MODIFY: (re)schedule whatever is still pending inside the covered window.
+            if is_pending(image.get('status')) and key_epoch(reminder_time) <= self.covered_until:
+                self.schedule(FINAL, image)
+            elif not is_pending(image.get('status')):
+                self.heap.cancel(FINAL, user_id, reminder_time)
+            early_time = image.get('early_reminder_time')
+            if is_pending(image.get('early_status')) and early_time and key_epoch(early_time) <= self.covered_until:
+                self.schedule(EARLY, image)
+            elif not is_pending(image.get('early_status')):
+                self.heap.cancel(EARLY, user_id, reminder_time)
+
+    # --- Firing ---
+    def fire_due(self, now):
+        entries = []
+        for kind, _, item in self.heap.pop_due(now):
+            self.fired[(kind, item['user_id'], item['reminder_time'])] = now
+            entries.append((kind, item))
+        # Reminders of one chat that fall due together go out as one message.
+        submit_by_chat(self.dispatcher, entries, self.owner, self.acks)
+
+    def report(self):
+        stats = self.dispatcher.flush_stats()
+        stats.update({"scheduled": len(self.heap), "items_read": self.items_read})
+        record_dispatch_stats(self.metrics, stats)
+        self.metrics.record("Scheduled", stats["scheduled"], COUNT)
+        self.metrics.record("ItemsRead", stats["items_read"], COUNT)
+        self.metrics.emit()
+        self.metrics = start_metrics("scheduler")
+        self.items_read = 0
+        cutoff = time.time() - 2 * HORIZON_SECONDS
+        self.fired = {key: at for key, at in self.fired.items() if at > cutoff}
+        print(f"📊 Scheduler stats: {json.dumps(stats)}")
+
+    def run_once(self):
+        """One pass of the loop; returns when the next pass is due."""
+        now = time.time()
+        if now >= self.next_refresh:
+            self.refresh(now)
+            self.report()
+            self.next_refresh = now + REFRESH_SECONDS
+            self.next_rescan = now + RESCAN_SECONDS
+        elif self.stream and now >= self.next_stream_poll:
+            self.apply_stream_events()
+            self.next_stream_poll = now + STREAM_POLL_SECONDS
+        elif not self.stream and now >= self.next_rescan:
+            self.rescan(now)
+            self.next_rescan = now + RESCAN_SECONDS
+
+        self.fire_due(time.time())
+        # Write whatever acknowledgements the last round of sends left, without waiting on them.
+        self.acks.flush(wait=False)
+
+        wakeups = [self.next_refresh, self.next_stream_poll if self.stream else self.next_rescan]
+        next_due = self.heap.next_due()
+        if next_due is not None:
+            wakeups.append(next_due)
+        return min(wakeups)
+
+    def run(self):
+        print(f"⏰ Precision scheduler started (horizon {HORIZON_SECONDS}s).")
+        failures = 0
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    wake_at = self.run_once()
+                    failures = 0
+                except Exception as e:
+                    # Nothing is advanced on failure, so the next pass retries the same refresh or poll.
+                    failures += 1
+                    backoff = min(ERROR_MAX_BACKOFF_SECONDS, ERROR_BACKOFF_SECONDS * 2 ** (failures - 1))
+                    print(f"❌ Scheduler pass failed ({failures} in a row), retrying in {backoff:g}s: {e}")
+                    wake_at = time.time() + backoff
+                self.stop_event.wait(max(0.0, wake_at - time.time()))
+        finally:
+            self.dispatcher.close()
+            self.acks.close()
+            print("👋 Precision scheduler stopped.")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def main():
+    scheduler = ReminderScheduler()
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run()
+
+
+if __name__ == "__main__":
+    main()
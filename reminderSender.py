@@ -1,20 +1,31 @@
 import os
 import json
-import urllib.request
-from datetime import datetime, timezone
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-import boto3
 import random
-from boto3.dynamodb.conditions import Key
-
-# --- AWS Clients ---
-dynamo = boto3.resource('dynamodb')
-ssm = boto3.client('ssm')
+from awsResources import bot_token
+from instrumentation import COUNT, get_metrics, start_metrics, timer
+from reminderDispatcher import Dispatcher, TimeBudget
+from reminderParser import next_occurrence
+from reminderStore import (
+    EARLY, FINAL, KIND_ATTRIBUTES, AckBatcher, SlotTaken, build_reminder_item, get_store, iter_merged, key_datetime, key_epoch,
+)
+from telegramClient import SendResult, get_client
 
 # --- Configuration ---
 TIMEZONE = "Asia/Kolkata"
-DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "Reminders")
 IST = ZoneInfo(TIMEZONE)
+# Failed sends (429, 5xx, network errors) are retried with exponential backoff, at most this often.
+SENDER_MAX_RETRIES = int(os.environ.get("SENDER_MAX_RETRIES", "8"))
+RETRY_BASE_SECONDS = float(os.environ.get("SENDER_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.environ.get("SENDER_RETRY_MAX_SECONDS", "3600"))
+# Due reminders are handed from the index readers to the chat grouping this many at a time.
+DUE_CHUNK_SIZE = 100
+# Seconds past its minute a recurring occurrence may move to when the chat has a reminder at that minute.
+RECURRING_SLOT_ATTEMPTS = 60
 
 # --- UI/UX Enhancements ---
 FINAL_REMINDER_INTROS = [
@@ -22,104 +33,339 @@ FINAL_REMINDER_INTROS = [
     "✅ Time for your reminder!", "🗓️ Here's that reminder you set:",
 ]
 
-# --- Load BOT_TOKEN ---
-BOT_TOKEN = ssm.get_parameter(Name='/telegram/bot_token', WithDecryption=True)['Parameter']['Value']
-
-# --- DynamoDB Table ---
-table = dynamo.Table(DYNAMODB_TABLE)
-
 # --- Telegram Helper ---
 def send_telegram_message(chat_id, text, parse_mode=None):
-    """Sends a simple text message without buttons."""
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    data = {"chat_id": chat_id, "text": text}
-    if parse_mode:
-        data["parse_mode"] = parse_mode
-    
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(data).encode("utf-8"),
-        headers={"Content-Type": "application/json"}
-    )
+    """Sends a simple text message without buttons. Returns a SendResult (truthy on success)."""
+    token = bot_token.get()
+    if not token:
+        print("❌ BOT_TOKEN is not set — cannot send message")
+        return SendResult(False, description="BOT_TOKEN is not set", retryable=True)
     try:
-        with urllib.request.urlopen(req) as resp:
-            print(f"✅ Sent message to {chat_id}. Response: {resp.read().decode()}")
+        result = SendResult.from_response(get_client(token).send_message(chat_id, text, parse_mode=parse_mode))
     except Exception as e:
-        print(f"❌ Telegram API error for chat_id {chat_id}: {e}")
+        result = SendResult.from_exception(e)
+    if not result:
+        print(f"❌ Telegram API error for chat_id {chat_id}: {result.description}")
+        return result
+    print(f"✅ Sent message to {chat_id}.")
+    return result
+
+# --- Claims ---
+# A reminder is claimed (PENDING -> INFLIGHT, leased to `owner`) before it is sent, so any
+# number of senders can read the same partitions and each reminder still goes out once.
+def claim_reminder(kind, r, owner):
+    return get_store().claim(kind, r['user_id'], r['reminder_time'], owner)
 
-def process_early_reminders(now_utc_iso):
-    """Queries for and sends due early reminders."""
-    print(f"Querying for early reminders due before {now_utc_iso}...")
+def claim_chat_reminders(user_id, entries, owner, acks=None):
+    """Claims a chat's (kind, reminder) entries, dropping those another sender took. True if any are left."""
+    drop_covered_heads_ups(entries)
+    entries[:] = [(kind, r) for kind, r in entries if claim_reminder(kind, r, owner)]
+    return bool(entries)
+
+def drop_covered_heads_ups(entries):
+    """
+    Drops heads-ups whose final reminder is in the same batch: the final reminder says it all,
+    and acknowledging it removes the heads-up along with the item.
+    """
+    finals = {r['reminder_time'] for kind, r in entries if kind == FINAL}
+    entries[:] = [(kind, r) for kind, r in entries if kind == FINAL or r['reminder_time'] not in finals]
+
+def reclaim_expired_leases():
+    """Hands reminders whose sender died mid-flight back to pending."""
     try:
-        early_reminders = table.query(
-            IndexName='EarlyStatusAndTimeIndex',
-            KeyConditionExpression=Key('early_status').eq('PENDING') & Key('early_reminder_time').lt(now_utc_iso)
-        ).get('Items', [])
+        reclaimed = get_store().reclaim_expired(int(time.time()))
     except Exception as e:
-        print(f"❌ Error querying EarlyStatusAndTimeIndex: {e}")
-        return
+        print(f"❌ Error reclaiming expired leases: {e}")
+        return 0
+    if reclaimed:
+        print(f"♻️ Reclaimed {reclaimed} reminders with expired leases.")
+    return reclaimed
 
-    print(f"Found {len(early_reminders)} early reminders to send.")
-    for r in early_reminders:
-        user_id = r['user_id']
-        reminder_time = r['reminder_time']
-        minutes = int(r['early_reminder_minutes'])
+# --- Message Rendering ---
+def _local_time_str(reminder_time):
+    return key_datetime(reminder_time, IST).strftime('%I:%M %p').lstrip('0')
 
-        final_time_utc = datetime.fromisoformat(reminder_time)
-        final_time_local_str = final_time_utc.astimezone(IST).strftime('%I:%M %p').lstrip('0')
+def render_early_message(r):
+    # --- **IMPROVED** UI/UX for the early reminder message ---
+    return (
+        f"⏳ *Heads-up! Your reminder is in {int(r['early_reminder_minutes'])} minutes.*\n\n"
+        f"📝 *Task:* {r['reminder_text']}\n"
+        f"⏰ *Time:* {_local_time_str(r['reminder_time'])}"
+    )
+
+def render_final_message(r):
+    intro = random.choice(FINAL_REMINDER_INTROS)
+    return f"{intro}\n\n📝 *{r['reminder_text']}*"
+
+def render_chat_message(entries):
+    """Renders every reminder due for one chat in this tick as a single message."""
+    if len(entries) == 1:
+        kind, r = entries[0]
+        return render_final_message(r) if kind == FINAL else render_early_message(r)
+    finals = [r for kind, r in entries if kind == FINAL]
+    earlies = [r for kind, r in entries if kind == EARLY]
+    sections = []
+    if finals:
+        header = f"🔔 *You have {len(finals)} reminders:*" if len(finals) > 1 else random.choice(FINAL_REMINDER_INTROS)
+        sections.append(header + "\n" + "\n".join(f"📝 *{r['reminder_text']}*" for r in finals))
+    if earlies:
+        sections.append("⏳ *Heads-up, coming up soon:*\n" + "\n".join(
+            f"• *{r['reminder_text']}* at {_local_time_str(r['reminder_time'])} (in {int(r['early_reminder_minutes'])} minutes)"
+            for r in earlies
+        ))
+    return "\n\n".join(sections)
+
+# --- Retries ---
+def retry_delay(result, attempt):
+    """Exponential backoff with jitter, never sooner than Telegram's retry_after."""
+    backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    backoff *= random.uniform(0.5, 1.0)
+    return max(backoff, result.retry_after or 0)
 
-        # --- **IMPROVED** UI/UX for the early reminder message ---
-        message = (
-            f"⏳ *Heads-up! Your reminder is in {minutes} minutes.*\n\n"
-            f"📝 *Task:* {r['reminder_text']}\n"
-            f"⏰ *Time:* {final_time_local_str}"
+def park_for_retry(kind, r, owner, result):
+    """
+    Moves a reminder whose send failed with a retryable error to the RETRY queue.
+    Returns False if it should be given up on instead (permanent error or out of attempts).
+    """
+    attempt = int(r.get(KIND_ATTRIBUTES[kind].retry_count) or 0) + 1
+    if not result.retryable or attempt > SENDER_MAX_RETRIES:
+        return False
+    delay = retry_delay(result, attempt)
+    error = f"{result.error_code}: {result.description}" if result.error_code else str(result.description)
+    if get_store().schedule_retry(kind, r['user_id'], r['reminder_time'], owner, time.time() + delay, attempt, error):
+        print(f"  > Will retry {kind} reminder for user {r['user_id']} in {delay:.0f}s (attempt {attempt}).")
+    else:
+        print(f"  > Lost the claim on {kind} reminder for user {r['user_id']}; not scheduling a retry.")
+    return True
+
+# --- Recurring Reminders ---
+def advance_recurring_reminder(r, owner):
+    """
+    Replaces a sent recurring reminder with its next occurrence, in the write that acknowledges it.
+    If the chat already has a reminder at that minute, the occurrence moves a second later
+    (keys are to the second, reminders to the minute) instead of overwriting it.
+    """
+    next_local = next_occurrence(r['recurrence'], key_datetime(r['reminder_time'], IST), datetime.now(IST))
+    next_local = next_local.replace(second=0)
+    for offset in range(RECURRING_SLOT_ATTEMPTS):
+        next_item = build_reminder_item(
+            r['user_id'], r['reminder_text'], next_local + timedelta(seconds=offset),
+            int(r.get('early_reminder_minutes') or 0), r['recurrence'],
         )
-        
-        send_telegram_message(user_id, message, parse_mode="Markdown")
-        
-        # Update the item to remove the early status so it's not sent again
-        table.update_item(
-            Key={'user_id': user_id, 'reminder_time': reminder_time},
-            UpdateExpression="REMOVE early_status, early_reminder_time"
+        try:
+            advanced = get_store().advance_recurring(r['user_id'], r['reminder_time'], next_item, owner)
+        except SlotTaken:
+            continue
+        if advanced:
+            print(f"  > Advanced recurring reminder for user {r['user_id']} to {next_item['reminder_time']}.")
+        else:
+            print(f"  > Lost the claim on recurring reminder for user {r['user_id']}; not advancing it.")
+        return
+    # The claim's lease runs out and the occurrence is sent again, then advanced once a slot frees up.
+    print(f"❌ No free slot to advance recurring reminder for user {r['user_id']} to {next_local.isoformat()}.")
+
+# --- Sending ---
+def is_markdown_error(result):
+    """True for Telegram's 400 "can't parse entities", the only 400 a plain-text resend can fix."""
+    return not result and result.error_code == 400 and "can't parse entities" in (result.description or "").lower()
+
+def send_chat_reminders(user_id, entries, owner=None, acks=None):
+    """
+    Sends a chat's claimed (kind, reminder) entries as one message, then acknowledges them:
+    final reminders are deleted and early heads-ups cleared, through the tick's AckBatcher
+    `acks` when given. Entries that failed with a retryable error are parked for a retry instead.
+    """
+    with timer("Render"):
+        message = render_chat_message(entries)
+    result = send_telegram_message(user_id, message, parse_mode="Markdown")
+    if is_markdown_error(result):
+        # Unbalanced Markdown in a reminder's text: the same message as plain text still gets there.
+        print(f"  > Telegram could not parse the Markdown for user {user_id}; resending it as plain text.")
+        result = send_telegram_message(user_id, message)
+    settle_chat_reminders(user_id, [(entry, result) for entry in entries], owner, acks)
+    return result
+
+def settle_chat_reminders(user_id, outcomes, owner=None, acks=None):
+    """Acknowledges, parks for a retry or advances each ((kind, reminder), SendResult) of a chat."""
+    done, advanced = [], set()
+    for (kind, r), result in outcomes:
+        if not result and park_for_retry(kind, r, owner, result):
+            continue
+        if kind == FINAL and r.get('recurrence'):
+            # Even an occurrence that was given up on keeps its series going.
+            advance_recurring_reminder(r, owner)
+            advanced.add(r['reminder_time'])
+        else:
+            done.append((kind, user_id, r['reminder_time']))
+    # The advance replaced the whole item, so a heads-up for the same occurrence needs no ack.
+    done = [ack for ack in done if ack[2] not in advanced]
+    if done:
+        if acks is not None:
+            acks.add(done)
+        else:
+            get_store().acknowledge(done, owner)
+        sent = sum(1 for _, result in outcomes if result)
+        print(f"  > Sent {sent} and acknowledged {len(done)} reminders for user {user_id}.")
+
+def submit_by_chat(dispatcher, entries, owner, acks=None):
+    """
+    Groups (kind, reminder) entries by chat and submits one job per chat, so reminders that
+    fall due in the same tick use one unit of the chat's rate limit. Returns the number of chats.
+    """
+    chats = {}
+    for kind, r in entries:
+        chats.setdefault(r['user_id'], []).append((kind, r))
+    for user_id, chat_entries in chats.items():
+        chat_entries.sort(key=lambda entry: key_epoch(entry[1][KIND_ATTRIBUTES[entry[0]].time]))
+        kind, first = chat_entries[0]
+        dispatcher.submit(
+            user_id, key_epoch(first[KIND_ATTRIBUTES[kind].time]), send_chat_reminders, user_id, chat_entries, owner, acks,
+            claim=claim_chat_reminders,
         )
-        print(f"  > Sent and updated early reminder for user {user_id}.")
+    return len(chats)
+
+class ChatBatches:
+    """
+    Groups (kind, reminder) entries by chat while the due indexes are still being read. New
+    chats are submitted DUE_CHUNK_SIZE entries at a time (and by flush()), and entries that
+    arrive before a chat's job starts join its message; a chat's entries read after its job
+    started go out in a job of their own.
+    """
 
-def process_final_reminders(now_utc_iso):
-    """Queries for and sends due final reminders."""
-    print(f"Querying for final reminders due before {now_utc_iso}...")
+    def __init__(self, dispatcher, owner, acks=None):
+        self.dispatcher = dispatcher
+        self.owner = owner
+        self.acks = acks
+        self.waiting = {}
+        self.unsubmitted = []
+        self.lock = threading.Lock()
+        self.entries = 0
+        self.jobs = 0
+
+    def add(self, kind, r):
+        user_id = r['user_id']
+        with self.lock:
+            self.entries += 1
+            batch = self.waiting.get(user_id)
+            if batch is not None:
+                batch.append((kind, r))
+            else:
+                self.waiting[user_id] = [(kind, r)]
+                self.unsubmitted.append(user_id)
+        if self.entries % DUE_CHUNK_SIZE == 0:
+            self.flush()
+
+    def flush(self):
+        """Submits the jobs of the chats seen since the last flush."""
+        with self.lock:
+            jobs = [(user_id, self.waiting[user_id]) for user_id in self.unsubmitted]
+            self.unsubmitted = []
+            self.jobs += len(jobs)
+        for user_id, batch in jobs:
+            kind, first = batch[0]
+            self.dispatcher.submit(
+                user_id, key_epoch(first[KIND_ATTRIBUTES[kind].time]), send_chat_reminders, user_id, batch, self.owner,
+                self.acks, claim=self.start,
+            )
+
+    def start(self, user_id, entries, owner, acks=None):
+        """Closes the chat's batch to new entries, then claims it like submit_by_chat's jobs."""
+        with self.lock:
+            if self.waiting.get(user_id) is entries:
+                del self.waiting[user_id]
+        entries.sort(key=lambda entry: key_epoch(entry[1][KIND_ATTRIBUTES[entry[0]].time]))
+        return claim_chat_reminders(user_id, entries, owner, acks)
+
+def _due_chunks(kind, reminders, index_name):
+    """Tags one index's due reminders with `kind`, DUE_CHUNK_SIZE at a time. A failed query only ends its own stream."""
+    chunk = []
     try:
-        final_reminders = table.query(
-            IndexName='StatusAndTimeIndex',
-            KeyConditionExpression=Key('status').eq('PENDING') & Key('reminder_time').lt(now_utc_iso)
-        ).get('Items', [])
+        for r in reminders:
+            chunk.append((kind, r))
+            if len(chunk) >= DUE_CHUNK_SIZE:
+                yield chunk
+                chunk = []
     except Exception as e:
-        print(f"❌ Error querying StatusAndTimeIndex: {e}")
-        return
+        print(f"❌ Error querying {index_name}: {e}")
+    if chunk:
+        yield chunk
 
-    print(f"Found {len(final_reminders)} final reminders to send.")
-    for r in final_reminders:
-        user_id = r['user_id']
-        reminder_time = r['reminder_time']
-        
-        intro = random.choice(FINAL_REMINDER_INTROS)
-        message = f"{intro}\n\n📝 *{r['reminder_text']}*"
-        send_telegram_message(user_id, message, parse_mode="Markdown")
-        
-        # Delete the reminder after sending
-        table.delete_item(
-            Key={'user_id': user_id, 'reminder_time': reminder_time}
-        )
-        print(f"  > Sent and deleted final reminder for user {user_id}.")
+def process_due_reminders(now_utc_iso, dispatcher, owner, acks=None):
+    """
+    Reads the early and final indexes in parallel and submits each chat's reminders as they
+    arrive, coalesced into one message per chat wherever they arrive before its job starts.
+    """
+    print(f"Querying for reminders due before {now_utc_iso}...")
+    store = get_store()
+    streams = [
+        _due_chunks(EARLY, store.iter_due_early(now_utc_iso, should_continue=dispatcher.budget.has_time), "EarlyStatusAndTimeIndex"),
+        _due_chunks(FINAL, store.iter_due_final(now_utc_iso, should_continue=dispatcher.budget.has_time), "StatusAndTimeIndex"),
+    ]
+    batches = ChatBatches(dispatcher, owner, acks)
+    due_by = datetime.fromisoformat(now_utc_iso).timestamp()
+    for kind, r in iter_merged(streams):
+        if kind == EARLY and key_epoch(r['reminder_time']) <= due_by:
+            # The reminder itself is due too; acknowledging it removes the heads-up as well.
+            continue
+        batches.add(kind, r)
+    batches.flush()
+    get_metrics().record("DueReminders", batches.entries, COUNT)
+    get_metrics().record("ChatMessages", batches.jobs, COUNT)
+    print(f"Found {batches.entries} due reminders and submitted them as {batches.jobs} messages.")
+
+def process_retries(dispatcher, owner, acks=None):
+    """
+    Drains the RETRY queue of both kinds. It runs after the fresh pass, so retries queue
+    behind newly due reminders in the dispatcher instead of delaying them.
+    """
+    now_epoch = int(time.time())
+    entries = []
+    for kind in (EARLY, FINAL):
+        try:
+            for r in get_store().iter_due_retries(kind, now_epoch, should_continue=dispatcher.budget.has_time):
+                entries.append((kind, r))
+        except Exception as e:
+            print(f"❌ Error querying {kind} retries: {e}")
+    get_metrics().record("RetryQueueDepth", len(entries), COUNT)
+    if entries:
+        print(f"Found {len(entries)} reminders to retry.")
+        submit_by_chat(dispatcher, entries, owner, acks)
+
+def record_dispatch_stats(metrics, stats):
+    """Adds a dispatch summary's counters to the invocation metrics."""
+    for key, name in (("sent", "Sent"), ("failed", "Failed"), ("deferred", "Deferred"), ("skipped", "Skipped")):
+        metrics.count(name, stats[key])
+    metrics.record("DispatchQueuePeak", stats["queue_peak"], COUNT)
 
 # --- Main Lambda Handler for the Sender ---
 def lambda_handler(event, context):
     print("🚀 Reminder sender function triggered.")
+    metrics = start_metrics("sender")
+    try:
+        with metrics.timer("Tick"):
+            return run_tick(context)
+    finally:
+        metrics.emit()
+
+def run_tick(context):
+    """One sender run: reclaim expired leases, send everything due, then drain due retries."""
     now_utc_iso = datetime.now(timezone.utc).isoformat()
-    
+    dispatcher = Dispatcher(budget=TimeBudget(context))
+    # Leases are owned per invocation, so a retried or overlapping run never acks another's claim.
+    owner = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+    acks = AckBatcher(get_store(), owner)
+
     try:
-        process_early_reminders(now_utc_iso)
-        process_final_reminders(now_utc_iso)
-        
+        try:
+            reclaim_expired_leases()
+            process_due_reminders(now_utc_iso, dispatcher, owner, acks)
+            process_retries(dispatcher, owner, acks)
+        finally:
+            stats = dispatcher.close()
+            acks.close()
+        record_dispatch_stats(get_metrics(), stats)
+        print(f"📊 Dispatch stats: {json.dumps(stats)}")
+
         print("✅ Sender function finished successfully.")
         return {"statusCode": 200, "body": json.dumps("Reminders processed successfully.")}
     except Exception as e:
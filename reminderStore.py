@@ -0,0 +1,482 @@
+import os
+import json
+import time
+import zlib
+import queue
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+# Which backend get_store() returns: "dynamodb" (default) or "sqlite" (local profiling and load tests).
+REMINDER_STORE = os.environ.get("REMINDER_STORE", "dynamodb").lower()
+# Number of write shards for the status GSI partition keys ('PENDING#0'..'PENDING#N-1').
+# With a single shard the original unsharded 'PENDING' key is used.
+STATUS_SHARDS = int(os.environ.get("STATUS_SHARDS", "1"))
+# Also read the unsharded 'PENDING' partition until migrateStatusShards.py has re-keyed old items.
+LEGACY_STATUS_READS = os.environ.get("STATUS_SHARD_LEGACY_READS", "true").lower() == "true"
+# Optionally split the shards between several sender workers (worker i reads shards i, i+N, ...).
+# Claims keep overlapping workers safe, so by default every worker reads every shard.
+SENDER_WORKER_COUNT = int(os.environ.get("SENDER_WORKER_COUNT", "1"))
+SENDER_WORKER_INDEX = int(os.environ.get("SENDER_WORKER_INDEX", "0"))
+# How long a claimed reminder stays leased to one sender before others may take it over.
+LEASE_SECONDS = int(os.environ.get("SENDER_LEASE_SECONDS", "120"))
+# Concurrent acknowledgement writes per sender (early-status removals and batch deletes).
+ACK_WORKERS = int(os.environ.get("SENDER_ACK_WORKERS", "8"))
+# DynamoDB's BatchWriteItem limit; the other backends batch the same way.
+BATCH_WRITE_SIZE = 25
+# TTL attribute (epoch seconds) for items that should expire on their own.
+EXPIRES_AT = 'expires_at'
+# Which item encoding new reminders are written in: 2 (compact, default) or 1 (ISO-8601 times).
+ITEM_VERSION = int(os.environ.get("REMINDER_ITEM_VERSION", "2"))
+# Also read ISO-8601 time ranges until migrateCompactItems.py has re-encoded old items.
+LEGACY_TIME_READS = os.environ.get("REMINDER_LEGACY_TIME_READS", "true").lower() == "true"
+# Compact items expire this long after they were due, so an orphaned item cannot linger (0 = never).
+ORPHAN_TTL_SECONDS = int(os.environ.get("REMINDER_ORPHAN_TTL_SECONDS", str(30 * 86400)))
+
+PENDING = 'PENDING'
+INFLIGHT = 'INFLIGHT'
+# Failed sends wait here (one GSI partition per kind) until their retry_at has passed.
+RETRY = 'RETRY'
+# States of a processed-update marker: claimed by a running invocation, or answered.
+UPDATE_IN_PROGRESS = 'IN_PROGRESS'
+UPDATE_DONE = 'DONE'
+# Markers are stored like reminders, under their own partition keys (chat ids are numeric).
+UPDATE_KEY_PREFIX = 'update#'
+UPDATE_SORT_KEY = '-'
+# A marker is in progress until the invocation that claimed it stores its response (as JSON).
+UPDATE_STATE = 'update_state'
+UPDATE_RESPONSE = 'update_response'
+
+# --- Reminder Kinds ---
+FINAL, EARLY = 'final', 'early'
+KindAttributes = namedtuple(
+    'KindAttributes', 'status time lease_owner lease_expires retry_at retry_count last_error'
+)
+# The attribute names each kind of send keeps its state in, so both can be in flight at once.
+KIND_ATTRIBUTES = {
+    FINAL: KindAttributes(
+        'status', 'reminder_time', 'lease_owner', 'lease_expires',
+        'retry_at', 'retry_count', 'last_error',
+    ),
+    EARLY: KindAttributes(
+        'early_status', 'early_reminder_time', 'early_lease_owner', 'early_lease_expires',
+        'early_retry_at', 'early_retry_count', 'early_last_error',
+    ),
+}
+
+def collapse_acks(acks):
+    """
+    Drops duplicate acknowledgements and the EARLY ack of any item whose FINAL ack is also
+    present (the delete already removes the heads-up), so a batch touches each item once.
+    """
+    finals = {(user_id, reminder_time) for kind, user_id, reminder_time in acks if kind == FINAL}
+    seen, collapsed = set(), []
+    for ack in acks:
+        if ack in seen or (ack[0] == EARLY and ack[1:] in finals):
+            continue
+        seen.add(ack)
+        collapsed.append(ack)
+    return collapsed
+
+# --- Item Encoding ---
+# Version 1 items store times as ISO-8601 strings. Version 2 (compact) items store them as
+# zero-padded epoch seconds, give the payload attributes short names and carry a TTL.
+# Key and GSI attributes keep their names and String type, so both versions share one table.
+TIME_KEY_DIGITS = 11
+# The padding keeps string order numeric, and the leading zero sorts every compact time before
+# every ISO-8601 one, so one sort-key range never mixes the two encodings.
+LEGACY_TIME_FLOOR = '1'
+COMPACT_NAMES = {'reminder_text': 'tx', 'early_reminder_minutes': 'em', 'recurrence': 'rc'}
+_FULL_NAMES = {short: name for name, short in COMPACT_NAMES.items()}
+
+def is_compact_time(value):
+    return value[:1] == '0'
+
+def time_key(epoch):
+    """The compact (version 2) time key for epoch seconds; fractions are dropped."""
+    return f"{int(epoch):0{TIME_KEY_DIGITS}d}"
+
+def key_epoch(value):
+    """Epoch seconds of a stored time in either encoding."""
+    if is_compact_time(value):
+        return int(value)
+    return datetime.fromisoformat(value).timestamp()
+
+def key_datetime(value, tz=timezone.utc):
+    """A stored time in either encoding as an aware datetime in `tz`."""
+    if is_compact_time(value):
+        return datetime.fromtimestamp(int(value), tz)
+    return datetime.fromisoformat(value).astimezone(tz)
+
+def time_ranges(before_iso, since_iso=None):
+    """
+    The inclusive (low, high) sort-key ranges holding the times in [since_iso, before_iso]:
+    the compact range, plus the ISO-8601 one while LEGACY_TIME_READS is on.
+    """
+    since = key_epoch(since_iso) if since_iso else 0
+    ranges = [(time_key(since), time_key(key_epoch(before_iso)))]
+    if LEGACY_TIME_READS:
+        ranges.append((since_iso or LEGACY_TIME_FLOOR, before_iso))
+    return ranges
+
+def compact_item(item):
+    """Re-encodes a version 1 item as a compact one; status attributes are left as they are."""
+    compact = {COMPACT_NAMES.get(name, name): value for name, value in item.items()}
+    for attr in ('reminder_time', 'early_reminder_time'):
+        if attr in compact and not is_compact_time(compact[attr]):
+            compact[attr] = time_key(key_epoch(compact[attr]))
+    if ORPHAN_TTL_SECONDS:
+        compact[EXPIRES_AT] = int(compact['reminder_time']) + ORPHAN_TTL_SECONDS
+    return compact
+
+def expand_item(item):
+    """Gives a stored item of either version the full attribute names the handlers use (in place)."""
+    for short, name in _FULL_NAMES.items():
+        if short in item:
+            item[name] = item.pop(short)
+    return item
+
+# --- Items ---
+def build_reminder_item(chat_id, reminder_text, reminder_time_local, early_minutes, recurrence=None):
+    """
+    Builds the stored item for a reminder in ITEM_VERSION encoding, with UTC times for the GSIs.
+    A recurring reminder is one rule item (with `recurrence`) whose reminder_time is its next occurrence.
+    """
+    reminder_time_utc = reminder_time_local.astimezone(timezone.utc)
+    encode = (lambda dt: time_key(dt.timestamp())) if ITEM_VERSION >= 2 else (lambda dt: dt.isoformat())
+    reminder_time = encode(reminder_time_utc)
+    # Spread writes over the sharded status GSI partitions
+    status = pending_status(chat_id, reminder_time)
+    item = {
+        'user_id': chat_id,
+        'reminder_time': reminder_time,
+        'reminder_text': reminder_text,
+        'status': status
+    }
+    if early_minutes:
+        item['early_reminder_minutes'] = early_minutes
+        # NEW: Calculate and store the early reminder time for the GSI
+        early_time_utc = reminder_time_utc - timedelta(minutes=early_minutes)
+        item['early_reminder_time'] = encode(early_time_utc)
+        item['early_status'] = status
+    if recurrence:
+        item['recurrence'] = recurrence
+    return compact_item(item) if ITEM_VERSION >= 2 else item
+
+# --- Processed Updates ---
+def update_marker_item(update_id, response, ttl_seconds):
+    """The done marker of an update as an item, so put_many() can store it with the reminders it created."""
+    return {
+        'user_id': f"{UPDATE_KEY_PREFIX}{update_id}",
+        'reminder_time': UPDATE_SORT_KEY,
+        UPDATE_STATE: UPDATE_DONE,
+        UPDATE_RESPONSE: json.dumps(response),
+        EXPIRES_AT: int(time.time()) + ttl_seconds,
+    }
+
+def is_update_marker(item):
+    return item['reminder_time'] == UPDATE_SORT_KEY and item['user_id'].startswith(UPDATE_KEY_PREFIX)
+
+def update_marker_state(state, response, expires_at, now):
+    """What claim_update() reports for a stored marker, or None if it has expired."""
+    if expires_at < now:
+        return None
+    # Markers written before in-progress markers existed were only written once done.
+    return {'done': (state or UPDATE_DONE) == UPDATE_DONE, 'response': json.loads(response) if response else None}
+
+# --- Status Sharding ---
+def shard_for(user_id, reminder_time, shards=None):
+    """Deterministically assigns a reminder to a shard, so re-keying is idempotent."""
+    shards = shards or STATUS_SHARDS
+    return zlib.crc32(f"{user_id}|{reminder_time}".encode("utf-8")) % shards
+
+def pending_status(user_id, reminder_time, shards=None):
+    """The status GSI partition key a new reminder is written with."""
+    shards = shards or STATUS_SHARDS
+    if shards == 1:
+        return PENDING
+    return f"{PENDING}#{shard_for(user_id, reminder_time, shards)}"
+
+def pending_partitions():
+    """Every status GSI partition key this sender worker has to read."""
+    if STATUS_SHARDS == 1:
+        partitions = [PENDING]
+    else:
+        partitions = [f"{PENDING}#{i}" for i in range(STATUS_SHARDS)]
+        if LEGACY_STATUS_READS:
+            partitions.append(PENDING)
+    if SENDER_WORKER_COUNT > 1:
+        partitions = partitions[SENDER_WORKER_INDEX::SENDER_WORKER_COUNT]
+    return partitions
+
+def is_pending(status):
+    """True for both the unsharded and the sharded pending status keys."""
+    return status == PENDING or (status or "").startswith(PENDING + "#")
+
+# --- Parallel Streams ---
+_STREAM_DONE = object()
+
+def iter_merged(streams, max_buffered_pages=8):
+    """
+    Drains several page streams in parallel and yields their items as pages arrive.
+    Exceptions raised by any stream are re-raised in the caller.
+    """
+    if len(streams) == 1:
+        for items in streams[0]:
+            yield from items
+        return
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stopped = threading.Event()
+
+    def put(page):
+        # Give up once the consumer has gone away, instead of blocking on a full queue.
+        while not stopped.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def pump(stream):
+        try:
+            for items in stream:
+                if stopped.is_set():
+                    break
+                put(items)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_STREAM_DONE)
+
+    with ThreadPoolExecutor(max_workers=len(streams), thread_name_prefix="shard") as pumps:
+        try:
+            for stream in streams:
+                pumps.submit(pump, stream)
+            remaining = len(streams)
+            while remaining:
+                page = pages.get()
+                if page is _STREAM_DONE:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stopped.set()
+
+# --- Storage Interface ---
+class SlotTaken(Exception):
+    """advance_recurring() found another reminder already stored under the next occurrence's key."""
+
+
+class ReminderStore:
+    """
+    The persistence operations the webhook handler and the sender use.
+    Items are plain dicts with the DynamoDB table's attribute names. Items read back always
+    have the full names (see expand_item); their times stay in the encoding they were stored in.
+    """
+
+    def put(self, item):
+        """Stores a new reminder."""
+        raise NotImplementedError
+
+    def delete(self, user_id, reminder_time, owner=None):
+        """
+        Deletes a reminder and returns the deleted item, or None if it did not exist.
+        With `owner`, only deletes while that sender still holds the final claim.
+        """
+        raise NotImplementedError
+
+    def complete_early(self, user_id, reminder_time, owner=None):
+        """Marks the early heads-up of a reminder as sent (only if `owner` still holds its claim)."""
+        raise NotImplementedError
+
+    def claim(self, kind, user_id, reminder_time, owner, lease_seconds=LEASE_SECONDS):
+        """
+        Atomically moves a pending (or due RETRY) reminder of `kind` (FINAL or EARLY) to INFLIGHT,
+        leased to `owner` until now + lease_seconds. Returns False if another sender got there first.
+        """
+        raise NotImplementedError
+
+    def schedule_retry(self, kind, user_id, reminder_time, owner, retry_at, retry_count, error):
+        """
+        Parks a claimed reminder of `kind` in RETRY until `retry_at` (epoch seconds), recording
+        the attempt count and last error. Only the lease `owner` may do this; returns whether it did.
+        """
+        raise NotImplementedError
+
+    def iter_due_retries(self, kind, now_epoch, should_continue=None):
+        """Streams reminders of `kind` waiting in RETRY whose retry_at is not after `now_epoch`."""
+        raise NotImplementedError
+
+    def reclaim_expired(self, now_epoch):
+        """Returns in-flight reminders whose lease has expired to pending. Returns how many."""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Writes several reminders in batches of BATCH_WRITE_SIZE."""
+        for item in items:
+            self.put(item)
+
+    def delete_many(self, keys):
+        """
+        Deletes several (user_id, reminder_time) keys in batches of BATCH_WRITE_SIZE.
+        Batch deletes are unconditional: only use them for reminders this sender has claimed.
+        """
+        for user_id, reminder_time in keys:
+            self.delete(user_id, reminder_time)
+
+    def acknowledge(self, acks, owner=None):
+        """
+        Acknowledges several sent reminders at once. `acks` holds (kind, user_id, reminder_time)
+        tuples: FINAL acks are batch-deleted, EARLY acks clear the heads-up (if `owner` still
+        holds the claim).
+        """
+        acks = collapse_acks(acks)
+        self.delete_many([(user_id, reminder_time) for kind, user_id, reminder_time in acks if kind == FINAL])
+        for kind, user_id, reminder_time in acks:
+            if kind == EARLY:
+                self.complete_early(user_id, reminder_time, owner)
+
+    def advance_recurring(self, user_id, reminder_time, next_item, owner=None):
+        """
+        Acknowledges the current occurrence of a recurring reminder by replacing its item with
+        `next_item` (the following occurrence) in one atomic write. With `owner`, only while
+        that sender still holds the final claim. Returns whether it did. Never overwrites an
+        existing item: raises SlotTaken if the next occurrence's key is already in use.
+        """
+        raise NotImplementedError
+
+    def claim_update(self, update_id, ttl_seconds):
+        """
+        Marks an update_id as in progress for `ttl_seconds` (about one invocation's timeout),
+        atomically across instances. Returns None if the caller now owns the update, otherwise
+        the live marker as {'done': bool, 'response': the stored response or None}.
+        An expired in-progress marker (its invocation crashed or timed out) is taken over.
+        """
+        raise NotImplementedError
+
+    def complete_update(self, update_id, response, ttl_seconds):
+        """Replaces the in-progress marker with a done marker that keeps `response` for `ttl_seconds`."""
+        raise NotImplementedError
+
+    def release_update(self, update_id):
+        """Forgets a claimed update_id, so a redelivery after a failed run is processed again."""
+        raise NotImplementedError
+
+    def list_user_page(self, user_id, limit, after=None, before=None):
+        """
+        Reads one page of a user's reminders in reminder_time order.
+        `after` continues forward past that reminder_time, `before` walks backwards from it.
+        Returns (items in ascending order, whether more items exist in the direction read).
+        """
+        raise NotImplementedError
+
+    def get_user_reminder_at(self, user_id, index):
+        """Returns the user's `index`-th (1-based) upcoming reminder, or None."""
+        raise NotImplementedError
+
+    def iter_due_final(self, now_utc_iso, should_continue=None, since_iso=None):
+        """
+        Streams pending final reminders due before `now_utc_iso`.
+        With `since_iso` only the window [since_iso, now_utc_iso] is read.
+        """
+        raise NotImplementedError
+
+    def iter_due_early(self, now_utc_iso, should_continue=None, since_iso=None):
+        """Like iter_due_final, for pending early heads-ups (by early_reminder_time)."""
+        raise NotImplementedError
+
+    def stream_arn(self):
+        """The change stream the precision scheduler can follow, if the backend has one."""
+        return None
+
+# --- Acknowledgement Batching ---
+class AckBatcher:
+    """
+    Collects the acknowledgements of a whole sender tick instead of writing them per message.
+    Final reminders are deleted BATCH_WRITE_SIZE at a time with delete_many, and early heads-ups
+    are cleared by conditional updates running concurrently, so neither waits on the other.
+    """
+
+    def __init__(self, store, owner, workers=ACK_WORKERS):
+        self.store = store
+        self.owner = owner
+        self.deletes = []
+        self.futures = []
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ack")
+
+    def _submit(self, fn, *args):
+        future = self.executor.submit(fn, *args)
+        with self.lock:
+            self.futures.append(future)
+
+    def _delete_batch(self, keys):
+        try:
+            self.store.delete_many(keys)
+        except Exception as e:
+            print(f"❌ Batch delete of {len(keys)} sent reminders failed: {e}")
+
+    def _complete_early(self, user_id, reminder_time):
+        try:
+            self.store.complete_early(user_id, reminder_time, self.owner)
+        except Exception as e:
+            print(f"❌ Clearing the early status for user {user_id} failed: {e}")
+
+    def add(self, acks):
+        """Queues (kind, user_id, reminder_time) acknowledgements; full delete batches are written right away."""
+        batches = []
+        acks = collapse_acks(acks)
+        for kind, user_id, reminder_time in acks:
+            if kind == EARLY:
+                self._submit(self._complete_early, user_id, reminder_time)
+        with self.lock:
+            self.deletes.extend((user_id, reminder_time) for kind, user_id, reminder_time in acks if kind == FINAL)
+            while len(self.deletes) >= BATCH_WRITE_SIZE:
+                batches.append(self.deletes[:BATCH_WRITE_SIZE])
+                del self.deletes[:BATCH_WRITE_SIZE]
+        for batch in batches:
+            self._submit(self._delete_batch, batch)
+
+    def flush(self, wait=True):
+        """Writes the partial delete batch; with `wait`, blocks until every queued write is done."""
+        with self.lock:
+            batch, self.deletes = self.deletes, []
+        if batch:
+            self._submit(self._delete_batch, batch)
+        with self.lock:
+            futures = self.futures
+            self.futures = [f for f in futures if not f.done()] if not wait else []
+        if wait:
+            for future in futures:
+                future.result()
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Returns the process-wide store selected by REMINDER_STORE, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if REMINDER_STORE == "sqlite":
+                    from sqliteStore import SqliteReminderStore
+                    _store = SqliteReminderStore()
+                else:
+                    from dynamoStore import DynamoReminderStore
+                    _store = DynamoReminderStore()
+    return _store
+
+def set_store(store):
+    """Makes `store` the process-wide store, e.g. a DynamoReminderStore over a stand-in table."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,301 @@
+import os
+import json
+import sqlite3
+import time
+import threading
+from decimal import Decimal
+from instrumentation import timer
+from reminderStore import (
+    EARLY, EXPIRES_AT, FINAL, INFLIGHT, KIND_ATTRIBUTES, LEASE_SECONDS, RETRY, UPDATE_IN_PROGRESS, UPDATE_KEY_PREFIX,
+    UPDATE_RESPONSE, UPDATE_STATE, ReminderStore, SlotTaken, expand_item, is_pending, is_update_marker, pending_partitions,
+    pending_status, time_ranges, update_marker_item, update_marker_state,
+)
+
+# --- Configuration ---
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "reminders.db")
+# Rows fetched per round trip while streaming due reminders.
+SQLITE_PAGE_SIZE = int(os.environ.get("SQLITE_PAGE_SIZE", "500"))
+
+# The key and GSI attributes live in indexed columns; the full item is kept as JSON,
+# so attributes added later need no schema change.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    user_id TEXT NOT NULL,
+    reminder_time TEXT NOT NULL,
+    status TEXT,
+    early_status TEXT,
+    early_reminder_time TEXT,
+    item TEXT NOT NULL,
+    PRIMARY KEY (user_id, reminder_time)
+);
+CREATE INDEX IF NOT EXISTS status_time ON reminders (status, reminder_time);
+CREATE INDEX IF NOT EXISTS early_status_time ON reminders (early_status, early_reminder_time);
+CREATE TABLE IF NOT EXISTS processed_updates (
+    update_id INTEGER PRIMARY KEY,
+    expires_at INTEGER NOT NULL,
+    state TEXT,
+    response TEXT
+);
+"""
+# Columns added to existing databases on open.
+_ADDED_COLUMNS = {"processed_updates": ("state TEXT", "response TEXT")}
+
+def _json_default(value):
+    # DynamoDB hands numbers back as Decimal; keep them round-trippable.
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+class SqliteReminderStore(ReminderStore):
+    """A local, indexed backend with the same behaviour as the DynamoDB table and GSIs."""
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        with self.lock:
+            if self.path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(_SCHEMA)
+            self._add_columns()
+
+    def _add_columns(self):
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column in columns:
+                if column.split()[0] not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    # --- Helpers ---
+    def _execute(self, sql, params=()):
+        with self.lock, timer("DbQuery"):
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, item):
+        with timer("DbWrite"):
+            self._upsert(item)
+
+    def _write_marker(self, item):
+        # Update markers live in their own table here, whichever write path they arrive through.
+        with timer("DbWrite"):
+            self.conn.execute(
+                "INSERT OR REPLACE INTO processed_updates (update_id, expires_at, state, response) VALUES (?, ?, ?, ?)",
+                (item['user_id'][len(UPDATE_KEY_PREFIX):], item[EXPIRES_AT], item[UPDATE_STATE], item[UPDATE_RESPONSE]),
+            )
+
+    def _upsert(self, item):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reminders (user_id, reminder_time, status, early_status, early_reminder_time, item)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (item['user_id'], item['reminder_time'], item.get('status'), item.get('early_status'),
+             item.get('early_reminder_time'), json.dumps(item, default=_json_default)),
+        )
+
+    def _in_transaction(self, fn, *args):
+        with self.lock:
+            if self.conn.in_transaction:
+                return fn(*args)
+            self.conn.execute("BEGIN")
+            try:
+                result = fn(*args)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def _get(self, user_id, reminder_time):
+        rows = self.conn.execute(
+            "SELECT item FROM reminders WHERE user_id = ? AND reminder_time = ?", (user_id, reminder_time)
+        ).fetchall()
+        return json.loads(rows[0]['item']) if rows else None
+
+    def _iter_due(self, status_column, time_column, now_utc_iso, should_continue, since_iso):
+        partitions = pending_partitions()
+        ranges = time_ranges(now_utc_iso, since_iso)
+        time_condition = " OR ".join(f"{time_column} BETWEEN ? AND ?" for _ in ranges)
+        params = [*partitions, *(bound for time_range in ranges for bound in time_range)]
+        # Keyset pagination over the (status, time) index, like LastEvaluatedKey on the GSI.
+        sql = (
+            f"SELECT item, {time_column} AS t, user_id FROM reminders"
+            f" WHERE {status_column} IN ({', '.join('?' * len(partitions))}) AND ({time_condition})"
+            f" AND ({time_column}, user_id) > (?, ?) ORDER BY {time_column}, user_id LIMIT ?"
+        )
+        cursor = ("", "")
+        while True:
+            rows = self._execute(sql, (*params, *cursor, SQLITE_PAGE_SIZE))
+            for row in rows:
+                yield expand_item(json.loads(row['item']))
+            if len(rows) < SQLITE_PAGE_SIZE:
+                return
+            if should_continue is not None and not should_continue():
+                print("⏱️ Time budget nearly used up; leaving remaining pages for the next run.")
+                return
+            cursor = (rows[-1]['t'], rows[-1]['user_id'])
+
+    # --- ReminderStore ---
+    def put(self, item):
+        with self.lock:
+            if is_update_marker(item):
+                self._write_marker(item)
+            else:
+                self._write(item)
+
+    def delete(self, user_id, reminder_time, owner=None):
+        with self.lock:
+            old = self._get(user_id, reminder_time)
+            if not old or (owner is not None and old.get('lease_owner') != owner):
+                return None
+            self.conn.execute(
+                "DELETE FROM reminders WHERE user_id = ? AND reminder_time = ?", (user_id, reminder_time)
+            )
+            return expand_item(old)
+
+    def complete_early(self, user_id, reminder_time, owner=None):
+        with self.lock:
+            item = self._get(user_id, reminder_time)
+            if not item or (owner is not None and item.get('early_lease_owner') != owner):
+                return
+            for attr in KIND_ATTRIBUTES[EARLY]:
+                item.pop(attr, None)
+            self._write(item)
+
+    def claim(self, kind, user_id, reminder_time, owner, lease_seconds=LEASE_SECONDS):
+        attrs = KIND_ATTRIBUTES[kind]
+        now = int(time.time())
+        with self.lock:
+            item = self._get(user_id, reminder_time)
+            if not item:
+                return False
+            status = item.get(attrs.status)
+            if not is_pending(status) and not (status == RETRY and item.get(attrs.retry_at, 0) <= now):
+                return False
+            item[attrs.status] = INFLIGHT
+            item[attrs.lease_owner] = owner
+            item[attrs.lease_expires] = now + lease_seconds
+            self._write(item)
+            return True
+
+    def schedule_retry(self, kind, user_id, reminder_time, owner, retry_at, retry_count, error):
+        attrs = KIND_ATTRIBUTES[kind]
+        with self.lock:
+            item = self._get(user_id, reminder_time)
+            if not item or item.get(attrs.lease_owner) != owner:
+                return False
+            item[attrs.status] = RETRY
+            item[attrs.retry_at] = int(retry_at)
+            item[attrs.retry_count] = retry_count
+            item[attrs.last_error] = error
+            item.pop(attrs.lease_owner, None)
+            item.pop(attrs.lease_expires, None)
+            self._write(item)
+            return True
+
+    def iter_due_retries(self, kind, now_epoch, should_continue=None):
+        attrs = KIND_ATTRIBUTES[kind]
+        # The RETRY partition is small; filtering on retry_at here mirrors the GSI FilterExpression.
+        for row in self._execute(f"SELECT item FROM reminders WHERE {attrs.status} = ?", (RETRY,)):
+            item = json.loads(row['item'])
+            if item.get(attrs.retry_at, 0) <= now_epoch:
+                yield expand_item(item)
+
+    def advance_recurring(self, user_id, reminder_time, next_item, owner=None):
+        with self.lock:
+            current = self._get(user_id, reminder_time)
+            if not current or (owner is not None and current.get('lease_owner') != owner):
+                return False
+            self._in_transaction(self._replace, user_id, reminder_time, next_item)
+            return True
+
+    def _replace(self, user_id, reminder_time, next_item):
+        if self._get(next_item['user_id'], next_item['reminder_time']):
+            raise SlotTaken(next_item['reminder_time'])
+        self.conn.execute("DELETE FROM reminders WHERE user_id = ? AND reminder_time = ?", (user_id, reminder_time))
+        self._write(next_item)
+
+    def claim_update(self, update_id, ttl_seconds):
+        now = int(time.time())
+        with self.lock, timer("DbWrite"):
+            # Insert, or take over an expired marker; a live marker leaves the row unchanged.
+            cursor = self.conn.execute(
+                "INSERT INTO processed_updates (update_id, expires_at, state, response) VALUES (?, ?, ?, NULL)"
+                " ON CONFLICT (update_id) DO UPDATE SET expires_at = excluded.expires_at,"
+                " state = excluded.state, response = NULL"
+                " WHERE processed_updates.expires_at < ?",
+                (update_id, now + ttl_seconds, UPDATE_IN_PROGRESS, now),
+            )
+            if cursor.rowcount == 1:
+                return None
+            row = self.conn.execute(
+                "SELECT state, response, expires_at FROM processed_updates WHERE update_id = ?", (update_id,)
+            ).fetchone()
+        return update_marker_state(row['state'], row['response'], row['expires_at'], now)
+
+    def complete_update(self, update_id, response, ttl_seconds):
+        self.put(update_marker_item(update_id, response, ttl_seconds))
+
+    def release_update(self, update_id):
+        with self.lock, timer("DbWrite"):
+            self.conn.execute("DELETE FROM processed_updates WHERE update_id = ?", (update_id,))
+
+    def reclaim_expired(self, now_epoch):
+        reclaimed = 0
+        for kind in (EARLY, FINAL):
+            attrs = KIND_ATTRIBUTES[kind]
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT item FROM reminders WHERE {attrs.status} = ?", (INFLIGHT,)
+                ).fetchall()
+                for row in rows:
+                    item = json.loads(row['item'])
+                    if item.get(attrs.lease_expires, 0) >= now_epoch:
+                        continue
+                    item[attrs.status] = pending_status(item['user_id'], item['reminder_time'])
+                    item.pop(attrs.lease_owner, None)
+                    item.pop(attrs.lease_expires, None)
+                    self._write(item)
+                    reclaimed += 1
+        return reclaimed
+
+    # Batches run as one transaction each, like a single BatchWriteItem round trip.
+    def put_many(self, items):
+        self._in_transaction(super().put_many, items)
+
+    def delete_many(self, keys):
+        self._in_transaction(super().delete_many, keys)
+
+    def acknowledge(self, acks, owner=None):
+        self._in_transaction(super().acknowledge, acks, owner)
+
+    def list_user_page(self, user_id, limit, after=None, before=None):
+        sql = "SELECT item FROM reminders WHERE user_id = ?"
+        params = [user_id]
+        if after:
+            sql += " AND reminder_time > ?"
+            params.append(after)
+        if before:
+            sql += " AND reminder_time < ?"
+            params.append(before)
+        sql += " ORDER BY reminder_time " + ("DESC" if before else "ASC") + " LIMIT ?"
+        params.append(limit + 1)
+        items = [expand_item(json.loads(row['item'])) for row in self._execute(sql, params)]
+        has_more = len(items) > limit
+        items = items[:limit]
+        if before:
+            items.reverse()
+        return items, has_more
+
+    def get_user_reminder_at(self, user_id, index):
+        rows = self._execute(
+            "SELECT item FROM reminders WHERE user_id = ? ORDER BY reminder_time LIMIT 1 OFFSET ?",
+            (user_id, index - 1),
+        )
+        return expand_item(json.loads(rows[0]['item'])) if rows else None
+
+    def iter_due_final(self, now_utc_iso, should_continue=None, since_iso=None):
+        return self._iter_due('status', 'reminder_time', now_utc_iso, should_continue, since_iso)
+
+    def iter_due_early(self, now_utc_iso, should_continue=None, since_iso=None):
+        return self._iter_due('early_status', 'early_reminder_time', now_utc_iso, should_continue, since_iso)
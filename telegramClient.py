@@ -0,0 +1,183 @@
+import os
+import json
+import queue
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import get_metrics
+
+# --- Configuration ---
+TELEGRAM_API_HOST = os.environ.get("TELEGRAM_API_HOST", "api.telegram.org")
+# "http" for a self-hosted Bot API server or the local stand-in the load tests use.
+TELEGRAM_API_SCHEME = os.environ.get("TELEGRAM_API_SCHEME", "https").lower()
+TELEGRAM_TIMEOUT = float(os.environ.get("TELEGRAM_TIMEOUT", "10"))
+TELEGRAM_POOL_SIZE = int(os.environ.get("TELEGRAM_POOL_SIZE", "16"))
+
+# Errors that mean a pooled keep-alive connection went stale and the request can be retried.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+# --- Send Results ---
+class SendResult:
+    """
+    The outcome of one Bot API call. Truthy when Telegram accepted it.
+    `retryable` is True for rate limiting (429), server errors and network failures, where
+    sending the same request again later can succeed; `retry_after` is Telegram's hint in seconds.
+    """
+
+    def __init__(self, ok, error_code=None, description=None, retry_after=None, retryable=False):
+        self.ok = ok
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        if self.ok:
+            return "SendResult(ok)"
+        return f"SendResult(error_code={self.error_code}, description={self.description!r}, retry_after={self.retry_after})"
+
+    @classmethod
+    def from_response(cls, resp):
+        if resp.get("ok"):
+            return cls(True)
+        code = resp.get("error_code")
+        retry_after = (resp.get("parameters") or {}).get("retry_after")
+        retryable = code == 429 or (isinstance(code, int) and code >= 500)
+        return cls(False, code, resp.get("description"), retry_after, retryable)
+
+    @classmethod
+    def from_exception(cls, error):
+        return cls(False, description=f"{type(error).__name__}: {error}", retryable=True)
+
+
+class TelegramClient:
+    """
+    A small Bot API client that keeps a pool of persistent HTTPS connections.
+    Instances are cached per token at module level, so the pool survives warm Lambda invocations.
+    """
+
+    def __init__(self, token, host=TELEGRAM_API_HOST, pool_size=TELEGRAM_POOL_SIZE, timeout=TELEGRAM_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._batch_executor = None
+        self._batch_lock = threading.Lock()
+        # Pre-encode everything that is identical for every request.
+        self._path_prefix = f"/bot{token}/"
+        self._headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+    # --- Connection Pool ---
+    def _new_connection(self):
+        if TELEGRAM_API_SCHEME == "http":
+            return http.client.HTTPConnection(self.host, timeout=self.timeout)
+        return http.client.HTTPSConnection(self.host, timeout=self.timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _request(self, conn, method, body):
+        conn.request("POST", self._path_prefix + method, body=body, headers=self._headers)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+
+    def _send(self, method, body):
+        """Posts `body` over a pooled connection and returns (HTTP status, raw body)."""
+        conn, reused = self._acquire()
+        try:
+            try:
+                status, raw = self._request(conn, method, body)
+            except _STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection; retry once on a fresh one.
+                conn.close()
+                conn = self._new_connection()
+                status, raw = self._request(conn, method, body)
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return status, raw
+
+    # --- Bot API ---
+    def call(self, method, payload):
+        """Calls a Bot API method and returns the decoded JSON response (which may have ok=False)."""
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        metrics = get_metrics()
+        try:
+            with metrics.timer("TelegramCall"):
+                status, raw = self._send(method, body)
+        except Exception:
+            metrics.count("TelegramErrors")
+            raise
+        try:
+            resp = json.loads(raw)
+        except ValueError:
+            resp = {"ok": False, "error_code": status, "description": raw.decode("utf-8", "replace")}
+        if not resp.get("ok"):
+            metrics.count("TelegramErrors")
+            if resp.get("error_code") == 429:
+                metrics.count("TelegramRateLimited")
+        return resp
+
+    def send_message(self, chat_id, text, parse_mode=None, **extra):
+        """Sends a message; extra keyword arguments are passed through (e.g. reply_markup)."""
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        payload.update(extra)
+        return self.call("sendMessage", payload)
+
+    def send_messages(self, messages):
+        """
+        Sends several messages concurrently over the pooled connections.
+        `messages` is a list of sendMessage payload dicts; results are returned in the same order.
+        Failed sends are returned as exceptions instead of being raised.
+        """
+        with self._batch_lock:
+            if self._batch_executor is None:
+                self._batch_executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size, thread_name_prefix="telegram"
+                )
+        futures = [self._batch_executor.submit(self.call, "sendMessage", m) for m in messages]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+# --- Shared Clients ---
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(token):
+    """Returns the process-wide client for `token`, creating it on first use."""
+    client = _clients.get(token)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(token)
+            if client is None:
+                client = _clients[token] = TelegramClient(token)
+    return client
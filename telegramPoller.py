@@ -0,0 +1,207 @@
+import os
+import signal
+import argparse
+import threading
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from awsResources import bot_token
+from instrumentation import COUNT, start_metrics
+from reminderStore import get_store, update_marker_item
+from telegramClient import TelegramClient
+from telegramWebhookHandler import (
+    IST, UPDATE_DEDUP_TTL_SECONDS, WebhookReply, call_telegram, claim_update, process_update,
+)
+
+# --- Configuration ---
+# How long one getUpdates call waits for new updates (Telegram allows up to 50 seconds).
+POLL_TIMEOUT_SECONDS = int(os.environ.get("POLL_TIMEOUT_SECONDS", "25"))
+# Updates fetched per call; 100 is Telegram's maximum.
+POLL_BATCH_SIZE = int(os.environ.get("POLL_BATCH_SIZE", "100"))
+# Chats whose replies are sent concurrently (the replies of one chat stay in order).
+POLL_REPLY_WORKERS = int(os.environ.get("POLL_REPLY_WORKERS", "8"))
+# Wait after a failed getUpdates call, or a batch that could not be stored, before trying again.
+POLL_ERROR_BACKOFF_SECONDS = float(os.environ.get("POLL_ERROR_BACKOFF_SECONDS", "5"))
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Commands that write to the store while they run instead of through the batch's put_many.
+DIRECT_WRITE_COMMANDS = ('/delete',)
+
+def update_chat_id(update):
+    message = update.get('message') or (update.get('callback_query') or {}).get('message') or {}
+    return str(message.get('chat', {}).get('id'))
+
+
+class QueuedReply(WebhookReply):
+    """Queues the bot's answer to one update on the batch outbox instead of sending it."""
+
+    def __init__(self, chat_id, outbox):
+        super().__init__(chat_id, inline=False)
+        self.outbox = outbox
+
+    def call(self, method, payload):
+        self.outbox.append((self.chat_id, method, payload))
+
+
+class UpdateBatch:
+    """
+    One getUpdates batch. The reminders its /remind commands create are collected and stored
+    with put_many, and replies are held back until everything the batch wrote is stored.
+    All updates of the batch are parsed against the same clock.
+
+    Each update's done marker (holding its replies) is stored in the same put_many as the
+    reminders it created. A batch fetched again after a failure (`recovering`) looks the
+    markers up first, so the updates already stored only have their replies queued again.
+    """
+
+    def __init__(self, recovering=False):
+        self.now = datetime.now(IST)
+        self.recovering = recovering
+        self.items = []
+        self.pending_chats = set()
+        self.outbox = []
+
+    def save(self, items):
+        self.items.extend(items)
+        self.pending_chats.update(item['user_id'] for item in items)
+
+    def flush(self):
+        """Stores the collected reminders and done markers in batched writes; raises if the store fails."""
+        if self.items:
+            get_store().put_many(self.items)
+        self.items, self.pending_chats = [], set()
+
+    def already_done(self, update_id):
+        # Only one poller reads getUpdates, so a marker still in progress was left by our own failed batch.
+        marker = claim_update(update_id)
+        if not marker or not marker['done']:
+            return False
+        self.outbox.extend(tuple(reply) for reply in marker['response'] or [])
+        print(f"♻️ Update {update_id} was already processed; queuing its replies again.")
+        return True
+
+    def process(self, update):
+        update_id = update.get('update_id')
+        if self.recovering and update_id is not None and self.already_done(update_id):
+            return
+        text = ((update.get('message') or {}).get('text') or '').strip()
+        # Any other command of a chat must see the reminders it created earlier in the batch.
+        if update_chat_id(update) in self.pending_chats and not text.startswith('/remind'):
+            self.flush()
+        queued = len(self.outbox)
+        try:
+            process_update(update, partial(QueuedReply, outbox=self.outbox), self.save, self.now)
+        except Exception as e:
+            # Skipped instead of retried, so one bad update cannot hold back the whole queue.
+            print(f"❌ Error processing update {update_id}: {e}")
+        if update_id is None:
+            return
+        self.items.append(update_marker_item(update_id, self.outbox[queued:], UPDATE_DEDUP_TTL_SECONDS))
+        if text.startswith(DIRECT_WRITE_COMMANDS):
+            # It wrote to the store itself; record it as done right away so it never runs twice.
+            self.flush()
+
+    def send_replies(self, executor):
+        chats = {}
+        for chat_id, method, payload in self.outbox:
+            chats.setdefault(chat_id, []).append((method, payload))
+        for future in [executor.submit(_send_in_order, calls) for calls in chats.values()]:
+            future.result()
+        return len(self.outbox)
+
+def _send_in_order(calls):
+    for method, payload in calls:
+        call_telegram(method, payload)
+
+
+class UpdatePoller:
+    """
+    Ingests updates by long-polling getUpdates instead of through the webhook. A batch is only
+    confirmed (by passing the next offset to getUpdates) once its reminders are stored, so
+    updates of a batch that failed or was interrupted are fetched again; the update markers
+    keep the ones that were already stored from running twice.
+    """
+
+    def __init__(self, token=None):
+        # A client of its own, with a timeout that outlasts the long poll.
+        self.client = TelegramClient(token or bot_token.get(), pool_size=1, timeout=POLL_TIMEOUT_SECONDS + 10)
+        self.offset = None
+        # Whether the next batch may have been partly stored already (by a failed batch or a previous run).
+        self.recovering = True
+        self.replies = ThreadPoolExecutor(max_workers=POLL_REPLY_WORKERS, thread_name_prefix="reply")
+        self.stop_event = threading.Event()
+
+    def fetch(self):
+        payload = {"timeout": POLL_TIMEOUT_SECONDS, "limit": POLL_BATCH_SIZE, "allowed_updates": ALLOWED_UPDATES}
+        if self.offset is not None:
+            payload["offset"] = self.offset
+        resp = self.client.call("getUpdates", payload)
+        if not resp.get("ok"):
+            if resp.get("error_code") == 409:
+                print("⚠️ A webhook is set for this bot; start the poller with --delete-webhook.")
+            raise RuntimeError(resp.get("description"))
+        return resp["result"]
+
+    def process_batch(self, updates):
+        """Processes, stores and answers one batch. Raises if its reminders could not be stored."""
+        metrics = start_metrics("poller")
+        try:
+            with metrics.timer("Batch"):
+                batch = UpdateBatch(recovering=self.recovering)
+                for update in updates:
+                    batch.process(update)
+                batch.flush()
+                sent = batch.send_replies(self.replies)
+            metrics.record("BatchUpdates", len(updates), COUNT)
+        finally:
+            metrics.emit()
+        print(f"📥 Processed {len(updates)} updates and sent {sent} replies.")
+
+    def commit(self):
+        """Confirms the last processed batch now, instead of on the next long poll."""
+        if self.offset is not None:
+            self.client.call("getUpdates", {"offset": self.offset, "limit": 1, "timeout": 0})
+
+    def run(self):
+        print(f"📡 Update poller started (long poll {POLL_TIMEOUT_SECONDS}s, batches of up to {POLL_BATCH_SIZE}).")
+        while not self.stop_event.is_set():
+            try:
+                updates = self.fetch()
+            except Exception as e:
+                print(f"❌ getUpdates failed: {e}")
+                self.stop_event.wait(POLL_ERROR_BACKOFF_SECONDS)
+                continue
+            if not updates:
+                continue
+            try:
+                self.process_batch(updates)
+            except Exception as e:
+                # The offset stays where it was, so the same updates are fetched again.
+                print(f"❌ Could not store a batch of {len(updates)} updates: {e}")
+                self.recovering = True
+                self.stop_event.wait(POLL_ERROR_BACKOFF_SECONDS)
+                continue
+            self.offset = updates[-1]['update_id'] + 1
+            self.recovering = False
+        self.commit()
+        self.replies.shutdown(wait=True)
+        print("👋 Update poller stopped.")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Telegram updates by long polling instead of the webhook.")
+    parser.add_argument("--delete-webhook", action="store_true", help="Remove the bot's webhook first (getUpdates refuses to run while one is set).")
+    args = parser.parse_args()
+
+    poller = UpdatePoller()
+    if args.delete_webhook:
+        call_telegram("deleteWebhook", {"drop_pending_updates": False})
+    signal.signal(signal.SIGTERM, poller.stop)
+    signal.signal(signal.SIGINT, poller.stop)
+    poller.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,30 @@
 import os
 import json
-import re
 import random # Imported for varied responses
-import boto3
-import urllib.request
-from datetime import datetime, timezone, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from zoneinfo import ZoneInfo
-from boto3.dynamodb.conditions import Key
-
-# --- AWS Clients ---
-dynamo = boto3.resource('dynamodb')
-ssm = boto3.client('ssm')
+from awsResources import bot_token
+from instrumentation import get_metrics, start_metrics, timer
+from telegramClient import get_client
+from reminderStore import build_reminder_item, get_store, key_datetime
+from reminderParser import describe_recurrence, parse_reminder_command, parse_reminder_lines, split_bulk_command
 
 # --- Configuration ---
 TIMEZONE = "Asia/Kolkata"
-DYNAMODB_TABLE = os.environ.get("DYNAMODB_TABLE", "Reminders")
 IST = ZoneInfo(TIMEZONE)
+# Answer updates in the webhook HTTP response instead of a separate sendMessage call.
+INLINE_REPLIES = os.environ.get("WEBHOOK_INLINE_REPLIES", "true").lower() == "true"
+LIST_PAGE_SIZE = int(os.environ.get("LIST_PAGE_SIZE", "10"))
+LIST_CACHE_CHATS = int(os.environ.get("LIST_CACHE_CHATS", "1024"))
+# update_ids remembered in memory, and how long the shared record of a processed update lives.
+UPDATE_CACHE_SIZE = int(os.environ.get("UPDATE_CACHE_SIZE", "4096"))
+UPDATE_DEDUP_TTL_SECONDS = int(os.environ.get("UPDATE_DEDUP_TTL_SECONDS", "86400"))
+# How long an update stays claimed by the invocation handling it when the Lambda context is
+# unknown; otherwise the invocation's remaining time is used. Past it, a redelivery takes over.
+UPDATE_CLAIM_SECONDS = int(os.environ.get("UPDATE_CLAIM_SECONDS", "30"))
+# Fraction of webhook invocations that emit EMF metrics; the webhook runs once per message.
+METRICS_SAMPLE_RATE = float(os.environ.get("WEBHOOK_METRICS_SAMPLE_RATE", "0.1"))
 
 # --- UI/UX Enhancements ---
 FRIENDLY_CONFIRMATIONS = [
@@ -26,41 +35,65 @@ FRIENDLY_CONFIRMATIONS = [
     "👌 Reminder locked in!",
 ]
 
-# --- Load BOT_TOKEN ---
-BOT_TOKEN = os.environ.get("BOT_TOKEN")
-if not BOT_TOKEN:
-    try:
-        BOT_TOKEN = ssm.get_parameter(
-            Name="/telegram/bot_token",
-            WithDecryption=True
-        )["Parameter"]["Value"]
-    except Exception as e:
-        print("❌ Failed to fetch BOT_TOKEN from SSM:", e)
-        BOT_TOKEN = None
-
-# --- DynamoDB Table ---
-table = dynamo.Table(DYNAMODB_TABLE)
-
 # --- Telegram Helper ---
-def send_message(chat_id, text, parse_mode=None):
-    """Send a message to the Telegram user."""
-    if not BOT_TOKEN:
+def call_telegram(method, payload):
+    """Calls a Bot API method directly (the outbound path)."""
+    token = bot_token.get()
+    if not token:
         print("❌ BOT_TOKEN is not set — cannot send message")
         return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    data = {"chat_id": chat_id, "text": text}
-    if parse_mode:
-        data["parse_mode"] = parse_mode
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(data).encode(),
-        headers={"Content-Type": "application/json"}
-    )
     try:
-        with urllib.request.urlopen(req) as resp:
-            print("✅ Telegram API Response:", resp.read().decode())
+        resp = get_client(token).call(method, payload)
     except Exception as e:
         print("❌ Telegram API error:", e)
+        return
+    if resp.get("ok"):
+        print(f"✅ Telegram {method} ok.")
+    else:
+        print("❌ Telegram API error:", resp.get("description"))
+
+def send_message(chat_id, text, parse_mode=None):
+    """Send a message to the Telegram user."""
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    call_telegram("sendMessage", payload)
+
+class WebhookReply:
+    """
+    Collects the bot's answer to one update.
+    The first message rides back to Telegram in the webhook response body, which saves a
+    full round trip to the Bot API. Later messages (or every message when inline replies
+    are disabled) fall back to an outbound call.
+    """
+
+    def __init__(self, chat_id, inline=INLINE_REPLIES):
+        self.chat_id = chat_id
+        self.inline = inline
+        self.payload = None
+
+    def send(self, text, parse_mode=None, method="sendMessage", **extra):
+        payload = {"chat_id": self.chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        payload.update(extra)
+        self.call(method, payload)
+
+    def call(self, method, payload):
+        if self.inline and self.payload is None:
+            self.payload = dict(payload, method=method)
+        else:
+            call_telegram(method, payload)
+
+    def response(self):
+        """The API Gateway response for this update."""
+        if self.payload is None:
+            return {"statusCode": 200}
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(self.payload),
+        }
 
 # --- New Helper Function for Better UX ---
 def get_friendly_time_string(dt_object, now):
@@ -76,318 +109,363 @@ def get_friendly_time_string(dt_object, now):
         # e.g., "on Tuesday, Aug 12"
         return f"on {dt_object.strftime('%A, %b %d')} at {time_str}"
 
-# --- Reminder Parser ---
-def parse_reminder_command(command_text):
-    """
-    Parses reminder commands using specific, efficient regular expressions.
-    This final version fixes a bug in the return statement.
-    """
-    command_body = command_text[len("/remind"):].strip()
+# --- Paginated /list ---
+# The pages each chat has recently been shown, as {number: reminder_time}, so that
+# "/delete N" removes exactly the reminder the user saw as number N.
+_list_views = OrderedDict()
+
+def remember_list_page(chat_id, offset, reminders):
+    view = _list_views.pop(chat_id, {})
+    for i, r in enumerate(reminders, start=offset + 1):
+        view[i] = r['reminder_time']
+    _list_views[chat_id] = view
+    while len(_list_views) > LIST_CACHE_CHATS:
+        _list_views.popitem(last=False)
+
+def forget_list_number(chat_id, number):
+    """Marks a deleted number so the other numbers on the page the user saw stay valid."""
+    view = _list_views.get(chat_id)
+    if view is not None:
+        view[number] = None
+
+def resolve_list_number(chat_id, number):
+    """The reminder_time behind list number `number`, from the cached view or a bounded ordered query."""
+    view = _list_views.get(chat_id)
+    if view and number in view:
+        return view[number]
+    r = get_store().get_user_reminder_at(chat_id, number)
+    return r['reminder_time'] if r else None
+
+def render_list_page(offset, reminders, has_prev, has_next):
+    """Builds the text and the prev/next inline keyboard for one page of reminders."""
+    lines = ["🗓️ *Your Upcoming Reminders*\n"]
+    now = datetime.now(IST)
+    last_date_str = None
 
-    # Use the more flexible 'early' regex from the previous version
-    early_minutes = 0
-    p_early = r'\b(early(\s+reminder)?)\s+(?P<value>\d+)(\s+(min|mins|minute|minutes))?\b'
-    early_match = re.search(p_early, command_body, re.IGNORECASE)
-    if early_match:
-        early_minutes = int(early_match.group('value'))
-        command_body = command_body.replace(early_match.group(0), "").strip()
+    for i, r in enumerate(reminders, start=offset + 1):
+        local_time = key_datetime(r['reminder_time'], IST)
 
-    if not command_body:
-        raise ValueError("Cannot set a reminder with no text or time.")
+        # --- Grouping Logic ---
+        delta = (local_time.date() - now.date()).days
+        if delta == 0:
+            current_date_str = "Today"
+        elif delta == 1:
+            current_date_str = "Tomorrow"
+        else:
+            current_date_str = local_time.strftime('%A, %b %d')
+
+        # Add a day header if it's the first reminder for that day
+        if current_date_str != last_date_str:
+            lines.append(f"\n*— {current_date_str} —*")
+            last_date_str = current_date_str
+
+        # --- Improved Formatting for each reminder ---
+        time_str = local_time.strftime('%I:%M %p').lstrip('0')
+        repeats = f" 🔁 _{describe_recurrence(r['recurrence'])}_" if r.get('recurrence') else ""
+        lines.append(f"`{i}.` {r['reminder_text']} 🕒 _{time_str}_{repeats}")
+
+    # --- Add the helpful footer ---
+    lines.append("\n\n- - - - - - - - - - - - - - -")
+    lines.append("_To delete a reminder, use `/delete <number>`._")
+
+    # Cursors carry the first item number of the target page and the key to continue from.
+    buttons = []
+    if has_prev:
+        prev_offset = max(offset - LIST_PAGE_SIZE, 0)
+        buttons.append({"text": "⬅️ Prev", "callback_data": f"list:p:{prev_offset}:{reminders[0]['reminder_time']}"})
+    if has_next:
+        next_offset = offset + len(reminders)
+        buttons.append({"text": "Next ➡️", "callback_data": f"list:n:{next_offset}:{reminders[-1]['reminder_time']}"})
+    reply_markup = {"inline_keyboard": [buttons]} if buttons else None
+    return "\n".join(lines), reply_markup
+
+def load_list_page(chat_id, offset=0, after=None, before=None):
+    """Queries one page, remembers it for /delete and renders it. Returns (text, reply_markup)."""
+    reminders, has_more = get_store().list_user_page(chat_id, LIST_PAGE_SIZE, after=after, before=before)
+    if not reminders:
+        return None, None
+    if before:
+        # Walking backwards: the page is always followed by the one we came from.
+        has_prev, has_next = has_more, True
+        offset = 0 if not has_more else offset
+    else:
+        has_prev, has_next = offset > 0, has_more
+    remember_list_page(chat_id, offset, reminders)
+    with timer("Render"):
+        return render_list_page(offset, reminders, has_prev, has_next)
+
+def handle_list_callback(callback, reply_factory=WebhookReply):
+    """Handles the prev/next buttons under a /list message by editing it in place. Returns the reply."""
+    message = callback.get('message', {})
+    chat_id = str(message.get('chat', {}).get('id'))
+    reply = reply_factory(chat_id)
+    data = callback.get('data', '')
+    if data.startswith('list:'):
+        _, direction, offset, cursor = data.split(':', 3)
+        if direction == 'n':
+            text, reply_markup = load_list_page(chat_id, int(offset), after=cursor)
+        else:
+            text, reply_markup = load_list_page(chat_id, int(offset), before=cursor)
+        if text is None:
+            text, reply_markup = "📭 No more reminders here. Run /list to start over.", None
+        payload = {"chat_id": chat_id, "message_id": message.get('message_id'),
+                   "text": text, "parse_mode": "Markdown"}
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        reply.call("editMessageText", payload)
+    reply.call("answerCallbackQuery", {"callback_query_id": callback.get('id')})
+    return reply
+
+# --- Creating Reminders ---
+def save_items(items):
+    """Stores the reminders one update created: a single put, or one batched write for several."""
+    if len(items) == 1:
+        get_store().put(items[0])
+    else:
+        get_store().put_many(items)
 
-    now = datetime.now(IST)
-    task_text = command_body
-    target_dt = None
-    
-    # A single, robust regex for parsing time
-    time_regex_str = r'(?P<time>\d{1,2}:\d{2}\s*[ap]m|\d{1,2}:\d{2}|\d{1,2}\s*[ap]m)'
-
-    # --- Parsing Logic ---
-    # Pattern 1: "in X minutes/hours"
-    p_in_x = r'(?P<matched_text>in\s+(?P<value>\d+)\s+(?P<unit>minute|min|hour|hr)s?)\s*$'
-    match = re.search(p_in_x, command_body, re.IGNORECASE)
-    if match:
-        value = int(match.group('value'))
-        unit = match.group('unit').lower()
-        if unit.startswith("min"):
-            target_dt = now + timedelta(minutes=value)
-        else: # hour
-            target_dt = now + timedelta(hours=value)
-        task_text = command_body[:match.start()].strip()
-
-    # Pattern 2: Absolute Date with Month Name
-    if not target_dt:
-        months_regex = r'January|February|March|April|May|June|July|August|September|October|November|December|Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
-        p_month_date = (
-            r'(?P<matched_text>(on\s+)?(?P<day>\d{1,2})(st|nd|rd|th)?\s+(?P<month>' + months_regex + r')(\s+(?P<year>\d{4}))?'
-            r'(\s+at\s+' + time_regex_str + r')?)\s*$'
-        )
-        match = re.search(p_month_date, command_body, re.IGNORECASE)
-        if match:
-            task_text = command_body[:match.start()].strip()
-            day = int(match.group('day'))
-            month_str = match.group('month')[:3].capitalize()
-            year = int(match.group('year')) if match.group('year') else now.year
-            month_num = datetime.strptime(month_str, '%b').month
-            target_date = datetime(year, month_num, day).date()
-            hour, minute = 0, 0
-            time_str_match = match.group('time')
-            if time_str_match:
-                time_str = time_str_match.lower()
-                is_pm = "pm" in time_str; is_am = "am" in time_str
-                time_str = re.sub(r'\s*(am|pm)', '', time_str)
-                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
-                else: hour, minute = int(time_str), 0
-                if is_pm and hour < 12: hour += 12
-                if is_am and hour == 12: hour = 0
-            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
-
-    # Pattern 3: Absolute Numeric Date
-    if not target_dt:
-        p_abs_date = r'(?P<matched_text>(on\s+)?(?P<date>\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/]\d{4})(\s+at\s+' + time_regex_str + r')?)\s*$'
-        match = re.search(p_abs_date, command_body, re.IGNORECASE)
-        if match:
-            task_text = command_body[:match.start()].strip()
-            date_str = match.group('date').replace('/', '-')
-            try: target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError: target_date = datetime.strptime(date_str, '%d-%m-%Y').date()
-            hour, minute = 0, 0
-            time_str_match = match.group('time')
-            if time_str_match:
-                time_str = time_str_match.lower()
-                is_pm = "pm" in time_str; is_am = "am" in time_str
-                time_str = re.sub(r'\s*(am|pm)', '', time_str)
-                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
-                else: hour, minute = int(time_str), 0
-                if is_pm and hour < 12: hour += 12
-                if is_am and hour == 12: hour = 0
-            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
-
-    # Pattern 4: Relative Day and Time
-    if not target_dt:
-        p_day_time = (
-            r'(?P<matched_text>(on|next|at)\s+)?(?P<day>monday|tuesday|wednesday|thursday|friday|saturday|sunday|'
-            r'tomorrow|today|day\s+after\s+tomorrow)'
-            r'(\s+at\s+' + time_regex_str + r')?\s*$'
-        )
-        match = re.search(p_day_time, command_body, re.IGNORECASE)
-        if match:
-            task_text = command_body[:match.start()].strip()
-            day_str = match.group('day').lower()
-            target_date = now.date()
-            if day_str == "tomorrow": target_date += timedelta(days=1)
-            elif day_str == "day after tomorrow": target_date += timedelta(days=2)
-            elif day_str != "today":
-                days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-                day_offset = (days.index(day_str) - now.weekday() + 7) % 7
-                if day_offset == 0: # If the matched day is today
-                  # If the user said "next" or "on", they mean a week from now.
-                  # If they just said the day (e.g., "Monday"), they mean today.
-                  if 'next' in match.group(0).lower() or 'on' in match.group(0).lower():
-                      day_offset = 7
-                target_date += timedelta(days=day_offset)
-            hour, minute = 0, 0
-            time_str_match = match.group('time')
-            if time_str_match:
-                time_str = time_str_match.lower()
-                is_pm = "pm" in time_str; is_am = "am" in time_str
-                time_str = re.sub(r'\s*(am|pm)', '', time_str)
-                if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
-                else: hour, minute = int(time_str), 0
-                if is_pm and hour < 12: hour += 12
-                if is_am and hour == 12: hour = 0
-            target_dt = datetime.combine(target_date, datetime.min.time(), tzinfo=IST).replace(hour=hour, minute=minute)
-
-    # Pattern 5: Time only
-    if not target_dt:
-        p_time_only = r'(?P<matched_text>(at\s+)?' + time_regex_str + r')\s*$'
-        match = re.search(p_time_only, command_body, re.IGNORECASE)
-        if match:
-            task_text = command_body[:match.start()].strip()
-            time_str = match.group('time').lower()
-            is_pm = "pm" in time_str; is_am = "am" in time_str
-            time_str = re.sub(r'\s*(am|pm)', '', time_str)
-            if ":" in time_str: parts = time_str.split(":"); hour, minute = int(parts[0]), int(parts[1])
-            else: hour, minute = int(time_str), 0
-            if is_pm and hour < 12: hour += 12
-            if is_am and hour == 12: hour = 0
-            potential_dt = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            if potential_dt <= now:
-                potential_dt += timedelta(days=1)
-            target_dt = potential_dt
-
-    if not target_dt:
-        raise ValueError("I couldn't figure out the time. Try being more specific, like 'tomorrow at 5pm' or 'in 2 hours'.")
-
-    # --- FINAL PROCESSING ---
-    target_dt = target_dt.replace(second=0, microsecond=0)
-    if target_dt <= now.replace(second=0, microsecond=0):
-        raise ValueError("Oops! That time is in the past. Please set a reminder for the future.")
-
-    # **BUG FIX**: Added 'early_minutes' back to the return statement.
-    return task_text or "Reminder", target_dt, early_minutes
+def handle_bulk_remind(chat_id, lines, save=save_items, now=None):
+    """
+    Sets one reminder per line of a multi-line /remind, storing all of them in one batched
+    write. Lines that cannot be parsed are reported back without blocking the others.
+    """
+    now = now or datetime.now(IST)
+    items, created, failed = [], [], []
+    with timer("Parse"):
+        parsed_lines = parse_reminder_lines(lines, now)
+    for line, parsed in parsed_lines:
+        if isinstance(parsed, ValueError):
+            failed.append(f"• `{line}`: {parsed}")
+            continue
+        reminder_text, reminder_time_local, early_minutes, recurrence = parsed
+        items.append(build_reminder_item(chat_id, reminder_text, reminder_time_local, early_minutes, recurrence))
+        repeats = f" (🔁 {describe_recurrence(recurrence)})" if recurrence else ""
+        created.append(f"📝 *{reminder_text}* - {get_friendly_time_string(reminder_time_local, now)}{repeats}")
+    if items:
+        save(items)
+
+    sections = []
+    if created:
+        sections.append(f"{random.choice(FRIENDLY_CONFIRMATIONS)} ({len(created)} reminders)\n\n" + "\n".join(created))
+    if failed:
+        sections.append("😕 I couldn't set these:\n" + "\n".join(failed))
+    return "\n\n".join(sections)
+
+# --- Update Deduplication ---
+# Telegram redelivers an update when the webhook is slow to answer. An update is claimed with a
+# short in-progress marker before it is handled, and the marker is replaced by a done marker
+# holding the response once it has been. A redelivery of a handled update gets the same response
+# again (the first one may never have reached Telegram), a redelivery of one still being handled
+# is asked to come back later, and one whose handler crashed or timed out is handled afresh.
+# A warm container also remembers the responses it gave.
+_seen_updates = OrderedDict()
+
+def claim_seconds(context):
+    """The in-progress claim lasts until the invocation would have timed out, plus a little."""
+    if context is None:
+        return UPDATE_CLAIM_SECONDS
+    return int(context.get_remaining_time_in_millis() / 1000) + 5
+
+def claim_update(update_id, ttl_seconds=UPDATE_CLAIM_SECONDS):
+    """None if this invocation should handle `update_id`, else the marker of an earlier delivery."""
+    if update_id in _seen_updates:
+        _seen_updates.move_to_end(update_id)
+        return {'done': True, 'response': _seen_updates[update_id]}
+    try:
+        return get_store().claim_update(update_id, ttl_seconds)
+    except Exception as e:
+        # Fail open: a duplicate reminder is better than a lost one.
+        print(f"⚠️ Could not record update {update_id}: {e}")
+        return None
+
+def complete_update(update_id, response):
+    """Remembers the response given to `update_id`, for redeliveries."""
+    _seen_updates[update_id] = response
+    if len(_seen_updates) > UPDATE_CACHE_SIZE:
+        _seen_updates.popitem(last=False)
+    try:
+        get_store().complete_update(update_id, response, UPDATE_DEDUP_TTL_SECONDS)
+    except Exception as e:
+        # The in-progress marker expires, so a redelivery would be handled again.
+        print(f"⚠️ Could not record update {update_id} as done: {e}")
+
+def release_update(update_id):
+    """Lets a redelivery of an update whose processing failed run again."""
+    _seen_updates.pop(update_id, None)
+    try:
+        get_store().release_update(update_id)
+    except Exception as e:
+        print(f"⚠️ Could not release update {update_id}: {e}")
+
+def answer_redelivery(update_id, marker):
+    if not marker['done']:
+        # Another invocation is still on it; a non-2xx answer makes Telegram try again later.
+        get_metrics().count("UpdatesInProgress")
+        print(f"⏳ Update {update_id} is still being processed; asking Telegram to retry.")
+        return {"statusCode": 503, "body": json.dumps("Update is being processed")}
+    get_metrics().count("DuplicateUpdates")
+    print(f"♻️ Update {update_id} was already processed; repeating its response.")
+    return marker['response'] or {"statusCode": 200}
 
 # --- Main Lambda Handler ---
 def lambda_handler(event, context):
-    print("📩 Incoming Event:", json.dumps(event))
+    metrics = start_metrics("webhook", METRICS_SAMPLE_RATE)
     try:
-        body = json.loads(event['body'])
-        message = body.get('message', {})
-        chat_id = str(message.get('chat', {}).get('id'))
-        text = message.get('text', '').strip()
+        with metrics.timer("Webhook"):
+            return handle_update(event, context)
+    finally:
+        metrics.emit()
 
-        if not text:
-            send_message(chat_id, "⚠️ Empty message received.")
-            return {"statusCode": 200}
+def handle_update(event, context=None):
+    update_id = None
+    try:
+        body = json.loads(event['body'])
+        update_id = body.get('update_id')
+        if update_id is not None:
+            marker = claim_update(update_id, claim_seconds(context))
+            if marker is not None:
+                return answer_redelivery(update_id, marker)
+        response = process_update(body).response()
+        if update_id is not None:
+            complete_update(update_id, response)
+        return response
+    except Exception as e:
+        print("❌ Error in lambda_handler:", str(e))
+        if update_id is not None:
+            release_update(update_id)
+        return {"statusCode": 500, "body": json.dumps("Error processing request")}
 
-        if text.startswith('/remind'):
-            try:
-                # --- ADD THESE 3 LINES ---
-                if len(text.split()) < 2:
-                    raise ValueError("Cannot set an empty reminder.\n\nYou can set a reminder like this: \n `/remind Call mom tomorrow at 7pm`")
-                # --- END OF ADDED CODE ---
-                
-                reminder_text, reminder_time_local, early_minutes = parse_reminder_command(text)
-                
-                # --- **IMPROVED** UI/UX for confirmation message ---
-                friendly_intro = random.choice(FRIENDLY_CONFIRMATIONS)
-                
-                # Use the helper function for a human-readable time string
-                now = datetime.now(IST)
-                friendly_time = get_friendly_time_string(reminder_time_local, now)
-                
-                # The precise time for the confirmation body
-                ist_time_str = reminder_time_local.strftime('%Y-%m-%d %H:%M')
-                
-                confirm_msg = (f"{friendly_intro}\n\n"
-                               f"📝 *{reminder_text}*\n"
-                               f"⏰ {friendly_time} (`{ist_time_str} IST`)")
-                
-                if early_minutes:
-                    confirm_msg += f"\n⏳ You'll get a heads-up *{early_minutes} minutes* before."
-
-                # --- THIS IS THE UPDATED BLOCK ---
-
-                # Save to DB with UTC time
-                reminder_time_utc = reminder_time_local.astimezone(timezone.utc)
-                item = {
-                    'user_id': chat_id,
-                    'reminder_time': reminder_time_utc.isoformat(),
-                    'reminder_text': reminder_text,
-                    'status': 'PENDING'
-                }
-                if early_minutes:
-                    item['early_reminder_minutes'] = early_minutes
-                    # NEW: Calculate and store the early reminder time for the GSI
-                    early_time_utc = reminder_time_utc - timedelta(minutes=early_minutes)
-                    item['early_reminder_time'] = early_time_utc.isoformat()
-                    item['early_status'] = 'PENDING'
-                
-                table.put_item(Item=item)
-                send_message(chat_id, confirm_msg, parse_mode="Markdown")
-
-            except ValueError as e:
-                # The existing except block will now catch our new error message
-                send_message(chat_id, f"😕 Whoops! {str(e)}", parse_mode="Markdown")
-
-        elif text.startswith('/list'):
-            res = table.query(KeyConditionExpression=Key('user_id').eq(chat_id))
-            reminders = res.get('Items', [])
+def process_update(body, reply_factory=WebhookReply, save=save_items, now=None):
+    """
+    Handles one Telegram update and returns its reply. `reply_factory(chat_id)` decides how the
+    answer is delivered, `save(items)` how new reminders are stored, and `now` lets a batch of
+    updates share one clock; the defaults are the webhook's.
+    """
+    if 'callback_query' in body:
+        return handle_list_callback(body['callback_query'], reply_factory)
+    message = body.get('message', {})
+    chat_id = str(message.get('chat', {}).get('id'))
+    text = message.get('text', '').strip()
+    reply = reply_factory(chat_id)
+    get_metrics().set_property("command", text.split()[0][:32] if text.startswith('/') else "text")
+
+    if not text:
+        reply.send("⚠️ Empty message received.")
+        return reply
+
+    if text.startswith('/remind'):
+        bulk_lines = split_bulk_command(text)
+        if bulk_lines:
+            reply.send(handle_bulk_remind(chat_id, bulk_lines, save, now), parse_mode="Markdown")
+            return reply
+        try:
+            # --- ADD THESE 3 LINES ---
+            if len(text.split()) < 2:
+                raise ValueError("Cannot set an empty reminder.\n\nYou can set a reminder like this: \n `/remind Call mom tomorrow at 7pm`")
+            # --- END OF ADDED CODE ---
             
-            if not reminders:
-                send_message(chat_id, "📭 Your reminder list is empty! Use `/remind` to add one.")
-                return {"statusCode": 200}
-
-            reminders.sort(key=lambda x: x['reminder_time'])
+            with timer("Parse"):
+                reminder_text, reminder_time_local, early_minutes, recurrence = parse_reminder_command(text, now=now)
             
-            lines = ["🗓️ *Your Upcoming Reminders*\n"]
-            now = datetime.now(IST)
-            last_date_str = None
-
-            for i, r in enumerate(reminders, start=1):
-                local_time = datetime.fromisoformat(r['reminder_time']).astimezone(IST)
-                
-                # --- Grouping Logic ---
-                delta = (local_time.date() - now.date()).days
-                if delta == 0:
-                    current_date_str = "Today"
-                elif delta == 1:
-                    current_date_str = "Tomorrow"
-                else:
-                    current_date_str = local_time.strftime('%A, %b %d')
-
-                # Add a day header if it's the first reminder for that day
-                if current_date_str != last_date_str:
-                    lines.append(f"\n*— {current_date_str} —*")
-                    last_date_str = current_date_str
-                
-                # --- Improved Formatting for each reminder ---
-                time_str = local_time.strftime('%I:%M %p').lstrip('0')
-                lines.append(f"`{i}.` {r['reminder_text']} 🕒 _{time_str}_")
-
-            # --- Add the helpful footer ---
-            lines.append("\n\n- - - - - - - - - - - - - - -")
-            lines.append("_To delete a reminder, use `/delete <number>`._")
+            # --- **IMPROVED** UI/UX for confirmation message ---
+            friendly_intro = random.choice(FRIENDLY_CONFIRMATIONS)
             
-            send_message(chat_id, "\n".join(lines), parse_mode="Markdown")
-
-        elif text.startswith('/delete'):
-             parts = text.split()
-             if len(parts) != 2 or not parts[1].isdigit():
-                 send_message(chat_id, "⚠️ **Oops!** To delete, use the format: `/delete <number>`.\nRun `/list` to see the numbers.", parse_mode="Markdown")
-                 return {"statusCode": 200}
-             delete_index = int(parts[1])
-             res = table.query(KeyConditionExpression=Key('user_id').eq(chat_id))
-             reminders = res.get('Items', [])
-             if not reminders or delete_index < 1 or delete_index > len(reminders):
-                 send_message(chat_id, "❌ That's not a valid reminder number. Try `/list` first!")
-                 return {"statusCode": 200}
-             reminders.sort(key=lambda x: x['reminder_time'])
-             to_delete = reminders[delete_index - 1]
-             table.delete_item(Key={'user_id': to_delete['user_id'], 'reminder_time': to_delete['reminder_time']})
-             send_message(chat_id, f"🗑️ Got it. I've deleted the reminder for: *{to_delete['reminder_text']}*", parse_mode="Markdown")
-
-        elif text.startswith('/help'):
-            help_msg = (
-                "*Need help? Here's everything I can do!* ✨\n\n"
-                "--- *Basic Commands* ---\n"
-                "• /remind <task> <date, time> - Sets a new reminder.\n"
-                "• /list - Shows all your upcoming reminders.\n"
-                "• /delete <number> - Deletes a reminder from your list.\n\n"
-                "--- *Supported Time Formats* ---\n"
-                "I understand a variety of time formats. Here are some examples of what works perfectly:\n\n"
-                "🗓️ *Dates & Weekdays <date, time>*\n"
-                "`tomorrow at 5pm`\n"
-                "`on Tuesday at 10:30am`\n"
-                "`16 August at 2pm`\n"
-                "`15-08-2025 at 11:00`\n"
-                "`2026-01-20`\n\n"
-                "⏱️ *Relative Times*\n"
-                "_Note: Only `minutes` and `hours` are supported._\n"
-                "`in 30 minutes`\n"
-                "`in 5 hours`\n\n"
-                "⏳ *Early Reminders*\n"
-                "Want a heads-up? Just add `early` to your command.\n\n For example:\n"
-                "`/remind Project deadline at 5pm early 15`\n"
-                "`/remind Call mom tomorrow early 30 minutes`\n"
-                "`/remind Meeting on Friday at 10am early reminder 10`"
-            )
-            send_message(chat_id, help_msg, parse_mode="Markdown")
-
-        elif text.startswith('/start'):
-            welcome_msg = (
-                "👋 *Hi there! I'm your friendly Reminder Bot.* 🤖\n\n"
-                "I can help you remind anything, big or small. Just tell me what to remind you of and when.\n\n"
-                "• To set a reminder, use `/remind` <task> <date, time>.\n"
-                "• To see your list, use /list.\n\n"
-                "For a full guide with all the cool time formats I understand, just type /help!"
-            )
-            send_message(chat_id, welcome_msg, parse_mode="Markdown")
-             
-        else:
-            send_message(chat_id, "🤔 Hmm, I don't recognize that command. Try `/start` to see what I can do!")
+            # Use the helper function for a human-readable time string
+            now = now or datetime.now(IST)
+            friendly_time = get_friendly_time_string(reminder_time_local, now)
+            
+            # The precise time for the confirmation body
+            ist_time_str = reminder_time_local.strftime('%Y-%m-%d %H:%M')
+            
+            confirm_msg = (f"{friendly_intro}\n\n"
+                           f"📝 *{reminder_text}*\n"
+                           f"⏰ {friendly_time} (`{ist_time_str} IST`)")
+            
+            if early_minutes:
+                confirm_msg += f"\n⏳ You'll get a heads-up *{early_minutes} minutes* before."
+            if recurrence:
+                confirm_msg += f"\n🔁 Repeats *{describe_recurrence(recurrence)}*."
+
+            # --- THIS IS THE UPDATED BLOCK ---
+
+            # Save to DB with UTC time
+            item = build_reminder_item(chat_id, reminder_text, reminder_time_local, early_minutes, recurrence)
+            save([item])
+            reply.send(confirm_msg, parse_mode="Markdown")
+
+        except ValueError as e:
+            # The existing except block will now catch our new error message
+            reply.send(f"😕 Whoops! {str(e)}", parse_mode="Markdown")
+
+    elif text.startswith('/list'):
+        list_text, reply_markup = load_list_page(chat_id)
+        if list_text is None:
+            reply.send("📭 Your reminder list is empty! Use `/remind` to add one.")
+            return reply
+        extra = {"reply_markup": reply_markup} if reply_markup else {}
+        reply.send(list_text, parse_mode="Markdown", **extra)
+
+    elif text.startswith('/delete'):
+         parts = text.split()
+         if len(parts) != 2 or not parts[1].isdigit():
+             reply.send("⚠️ **Oops!** To delete, use the format: `/delete <number>`.\nRun `/list` to see the numbers.", parse_mode="Markdown")
+             return reply
+         delete_index = int(parts[1])
+         reminder_time = resolve_list_number(chat_id, delete_index) if delete_index >= 1 else None
+         deleted = None
+         if reminder_time:
+             deleted = get_store().delete(chat_id, reminder_time)
+         if not deleted:
+             reply.send("❌ That's not a valid reminder number. Try `/list` first!")
+             return reply
+         forget_list_number(chat_id, delete_index)
+         reply.send(f"🗑️ Got it. I've deleted the reminder for: *{deleted['reminder_text']}*", parse_mode="Markdown")
+
+    elif text.startswith('/help'):
+        help_msg = (
+            "*Need help? Here's everything I can do!* ✨\n\n"
+            "--- *Basic Commands* ---\n"
+            "• /remind <task> <date, time> - Sets a new reminder.\n"
+            "• /remind with one reminder per line - Sets several at once.\n"
+            "• /list - Shows all your upcoming reminders.\n"
+            "• /delete <number> - Deletes a reminder from your list.\n\n"
+            "--- *Supported Time Formats* ---\n"
+            "I understand a variety of time formats. Here are some examples of what works perfectly:\n\n"
+            "🗓️ *Dates & Weekdays <date, time>*\n"
+            "`tomorrow at 5pm`\n"
+            "`on Tuesday at 10:30am`\n"
+            "`16 August at 2pm`\n"
+            "`15-08-2025 at 11:00`\n"
+            "`2026-01-20`\n\n"
+            "⏱️ *Relative Times*\n"
+            "_Note: Only `minutes` and `hours` are supported._\n"
+            "`in 30 minutes`\n"
+            "`in 5 hours`\n\n"
+            "⏳ *Early Reminders*\n"
+            "Want a heads-up? Just add `early` to your command.\n\n For example:\n"
+            "`/remind Project deadline at 5pm early 15`\n"
+            "`/remind Call mom tomorrow early 30 minutes`\n"
+            "`/remind Meeting on Friday at 10am early reminder 10`\n\n"
+            "🔁 *Repeating Reminders*\n"
+            "Add `every day`, `every weekday` or `every N hours`:\n"
+            "`/remind Standup every weekday at 9:30am`\n"
+            "`/remind Drink water every 2 hours`\n"
+            "Deleting it from /list stops the whole series."
+        )
+        reply.send(help_msg, parse_mode="Markdown")
+
+    elif text.startswith('/start'):
+        welcome_msg = (
+            "👋 *Hi there! I'm your friendly Reminder Bot.* 🤖\n\n"
+            "I can help you remind anything, big or small. Just tell me what to remind you of and when.\n\n"
+            "• To set a reminder, use `/remind` <task> <date, time>.\n"
+            "• To see your list, use /list.\n\n"
+            "For a full guide with all the cool time formats I understand, just type /help!"
+        )
+        reply.send(welcome_msg, parse_mode="Markdown")
+         
+    else:
+        reply.send("🤔 Hmm, I don't recognize that command. Try `/start` to see what I can do!")
+
+    return reply
 
-        return {"statusCode": 200}
-    except Exception as e:
-        print("❌ Error in lambda_handler:", str(e))
-        return {"statusCode": 500, "body": json.dumps("Error processing request")}
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import reminderScheduler
+from reminderParser import IST
+from reminderScheduler import RESCAN_SECONDS, ReminderScheduler
+from reminderStore import EARLY, FINAL, LEASE_SECONDS, build_reminder_item, set_store
+from sqliteStore import SqliteReminderStore
+
+
+@pytest.fixture
+def store():
+    store = SqliteReminderStore(":memory:")
+    set_store(store)
+    return store
+
+
+@pytest.fixture
+def scheduler(store):
+    # SQLite has no change stream, so the scheduler finds new reminders by rescanning.
+    scheduler = ReminderScheduler()
+    yield scheduler
+    scheduler.dispatcher.close()
+    scheduler.acks.close()
+
+
+def put_due(store, due_epoch, early_minutes=0):
+    item = build_reminder_item("42", "stand up", datetime.fromtimestamp(due_epoch, IST), early_minutes)
+    store.put(item)
+    return item['user_id'], item['reminder_time']
+
+
+def scheduled(scheduler, kind, key):
+    return (kind, *key) in scheduler.heap.entries
+
+
+def test_rescan_reads_reminders_due_since_the_last_rescan(store, scheduler):
+    t0 = time.time()
+    scheduler.refresh(t0)
+    # Created after the refresh and due before the next rescan runs ("in 1 minute" at hh:mm:55).
+    key = put_due(store, t0 + 5)
+    scheduler.rescan(t0 + 8)
+    assert scheduled(scheduler, FINAL, key)
+
+
+def test_rescan_overlaps_the_previous_one(store, scheduler):
+    t0 = time.time()
+    scheduler.refresh(t0)
+    scheduler.rescan(t0 + RESCAN_SECONDS)
+    # Written late: due after the first rescan started, but stored only after it read.
+    key = put_due(store, t0 + RESCAN_SECONDS - 2)
+    scheduler.rescan(t0 + 2 * RESCAN_SECONDS)
+    assert scheduled(scheduler, FINAL, key)
+
+
+def test_rescan_leaves_far_reminders_to_later_rescans(store, scheduler):
+    t0 = time.time()
+    scheduler.refresh(t0)
+    key = put_due(store, t0 + 300, early_minutes=1)
+    scheduler.rescan(t0 + RESCAN_SECONDS)
+    assert not scheduled(scheduler, FINAL, key)
+    assert not scheduled(scheduler, EARLY, key)
+    for step in range(2, 300 // RESCAN_SECONDS):
+        scheduler.rescan(t0 + step * RESCAN_SECONDS)
+    assert scheduled(scheduler, EARLY, key)
+    assert scheduled(scheduler, FINAL, key)
+
+
+def test_rescans_read_each_reminder_a_few_times(store, scheduler):
+    t0 = time.time()
+    scheduler.refresh(t0)
+    for offset in range(20, 600, 20):
+        put_due(store, t0 + offset)
+    scheduler.items_read = 0
+    for step in range(1, 600 // RESCAN_SECONDS):
+        scheduler.rescan(t0 + step * RESCAN_SECONDS)
+    assert scheduler.items_read <= 4 * len(range(20, 600, 20))
+
+
+def test_reclaimed_reminder_is_read_again(store, scheduler, monkeypatch):
+    t0 = time.time()
+    key = put_due(store, t0 - 30)
+    assert store.claim(FINAL, *key, "dead-sender")
+    scheduler.refresh(t0)
+    assert not scheduled(scheduler, FINAL, key)
+    # The sender died; by the next refresh its lease has run out.
+    monkeypatch.setattr(
+        reminderScheduler, "reclaim_expired_leases", lambda: store.reclaim_expired(int(t0) + LEASE_SECONDS + 1)
+    )
+    scheduler.refresh(t0 + 60)
+    assert scheduled(scheduler, FINAL, key)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import reminderSender
+from reminderParser import IST
+from reminderStore import EARLY, FINAL, build_reminder_item, expand_item, set_store
+from sqliteStore import SqliteReminderStore
+from telegramClient import SendResult
+
+
+@pytest.fixture
+def store():
+    store = SqliteReminderStore(":memory:")
+    set_store(store)
+    return store
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Records every sendMessage and answers with the queued results (then with success)."""
+    calls, answers = [], []
+
+    def send(chat_id, text, parse_mode=None):
+        calls.append((chat_id, parse_mode))
+        return answers.pop(0) if answers else SendResult(True)
+
+    monkeypatch.setattr(reminderSender, "send_telegram_message", send)
+    return calls, answers
+
+
+def claimed_entries(store, count):
+    entries = []
+    for minutes in range(1, count + 1):
+        item = build_reminder_item("42", f"task {minutes}", datetime.now(IST) - timedelta(minutes=minutes), 0)
+        store.put(item)
+        assert store.claim(FINAL, item['user_id'], item['reminder_time'], "sender-a")
+        entries.append((FINAL, expand_item(dict(item))))
+    return entries
+
+
+def remaining(store):
+    items, _ = store.list_user_page("42", 10)
+    return len(items)
+
+
+def test_markdown_error_resends_the_message_once_as_plain_text(store, telegram):
+    calls, answers = telegram
+    answers.append(SendResult(False, error_code=400, description="Bad Request: can't parse entities: unclosed bold"))
+    assert reminderSender.send_chat_reminders("42", claimed_entries(store, 2), "sender-a")
+    assert calls == [("42", "Markdown"), ("42", None)]
+    assert remaining(store) == 0
+
+
+def test_other_bad_requests_are_not_resent(store, telegram):
+    calls, answers = telegram
+    answers.append(SendResult(False, error_code=400, description="Bad Request: chat not found"))
+    assert not reminderSender.send_chat_reminders("42", claimed_entries(store, 2), "sender-a")
+    assert calls == [("42", "Markdown")]
+    # A permanent error is given up on rather than retried.
+    assert remaining(store) == 0
+
+
+def test_heads_up_and_final_go_out_as_one_message(store, telegram):
+    calls, _ = telegram
+    item = build_reminder_item("42", "call mom", datetime.now(IST) - timedelta(minutes=1), 5)
+    store.put(item)
+    for kind in (EARLY, FINAL):
+        assert store.claim(kind, item['user_id'], item['reminder_time'], "sender-a")
+    entries = [(EARLY, expand_item(dict(item))), (FINAL, expand_item(dict(item)))]
+    assert reminderSender.send_chat_reminders("42", entries, "sender-a")
+    assert calls == [("42", "Markdown")]
+    assert remaining(store) == 0
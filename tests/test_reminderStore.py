@@ -0,0 +1,161 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dynamoStore import DynamoReminderStore
+from fakeDynamo import FakeTable
+from reminderParser import IST
+from reminderStore import EARLY, FINAL, INFLIGHT, RETRY, KIND_ATTRIBUTES, build_reminder_item, expand_item, is_pending
+from sqliteStore import SqliteReminderStore
+
+# The same scenarios run against both backends, so SQLite stays a faithful stand-in for DynamoDB.
+@pytest.fixture(params=["sqlite", "dynamodb"])
+def store(request):
+    if request.param == "sqlite":
+        return SqliteReminderStore(":memory:")
+    return DynamoReminderStore(table=FakeTable())
+
+
+def due_item(store, chat_id="42", early_minutes=5):
+    """Stores a reminder whose final time (and heads-up) are already due and returns its key."""
+    item = build_reminder_item(chat_id, "water the plants", datetime.now(IST) - timedelta(minutes=1), early_minutes)
+    store.put(item)
+    return item['user_id'], item['reminder_time']
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def due_keys(store, kind):
+    due = store.iter_due_final(now_iso()) if kind == FINAL else store.iter_due_early(now_iso())
+    return [(r['user_id'], r['reminder_time']) for r in due]
+
+
+def stored(store, user_id, reminder_time):
+    """The whole stored item (list pages only project what /list shows)."""
+    if isinstance(store, SqliteReminderStore):
+        item = store._get(user_id, reminder_time)
+    else:
+        item = store.table.get_item(Key={'user_id': user_id, 'reminder_time': reminder_time}).get('Item')
+    return expand_item(item) if item else None
+
+
+# --- Claims ---
+@pytest.mark.parametrize("kind", [FINAL, EARLY])
+def test_second_claim_is_lost(store, kind):
+    key = due_item(store)
+    assert store.claim(kind, *key, "sender-a")
+    assert not store.claim(kind, *key, "sender-b")
+    assert key not in due_keys(store, kind)
+    assert stored(store, *key)[KIND_ATTRIBUTES[kind].lease_owner] == "sender-a"
+
+
+def test_loser_cannot_acknowledge(store):
+    key = due_item(store)
+    assert store.claim(FINAL, *key, "sender-a")
+    assert store.claim(EARLY, *key, "sender-a")
+    assert store.delete(*key, owner="sender-b") is None
+    store.complete_early(*key, owner="sender-b")
+    item = stored(store, *key)
+    assert item['status'] == INFLIGHT
+    assert item['early_status'] == INFLIGHT
+
+
+def test_final_and_early_claims_are_independent(store):
+    key = due_item(store)
+    assert store.claim(EARLY, *key, "sender-a")
+    assert store.claim(FINAL, *key, "sender-b")
+
+
+# --- Leases ---
+def test_expired_lease_is_reclaimed(store):
+    key = due_item(store)
+    assert store.claim(FINAL, *key, "sender-a", lease_seconds=0)
+    assert not store.claim(FINAL, *key, "sender-b")
+    assert store.reclaim_expired(time.time() + 1) == 1
+    item = stored(store, *key)
+    assert is_pending(item['status'])
+    assert KIND_ATTRIBUTES[FINAL].lease_owner not in item
+    assert key in due_keys(store, FINAL)
+    assert store.claim(FINAL, *key, "sender-b")
+    # The sender whose lease ran out can no longer acknowledge it.
+    assert store.delete(*key, owner="sender-a") is None
+    assert store.delete(*key, owner="sender-b") is not None
+
+
+def test_live_lease_is_not_reclaimed(store):
+    key = due_item(store)
+    assert store.claim(FINAL, *key, "sender-a", lease_seconds=120)
+    assert store.reclaim_expired(time.time()) == 0
+    assert stored(store, *key)[KIND_ATTRIBUTES[FINAL].lease_owner] == "sender-a"
+
+
+# --- Retries ---
+@pytest.mark.parametrize("kind", [FINAL, EARLY])
+def test_retry_waits_until_retry_at(store, kind):
+    key = due_item(store)
+    attrs = KIND_ATTRIBUTES[kind]
+    now = time.time()
+    assert store.claim(kind, *key, "sender-a")
+    assert not store.schedule_retry(kind, *key, "sender-b", now + 60, 1, "429: Too Many Requests")
+    assert store.schedule_retry(kind, *key, "sender-a", now + 60, 1, "429: Too Many Requests")
+
+    item = stored(store, *key)
+    assert item[attrs.status] == RETRY
+    assert int(item[attrs.retry_count]) == 1
+    assert item[attrs.last_error] == "429: Too Many Requests"
+    assert attrs.lease_owner not in item
+    # Parked reminders stay out of the due index, and out of the retry queue until retry_at.
+    assert key not in due_keys(store, kind)
+    assert not list(store.iter_due_retries(kind, now))
+    assert [(r['user_id'], r['reminder_time']) for r in store.iter_due_retries(kind, now + 61)] == [key]
+    assert not store.claim(kind, *key, "sender-b")
+
+
+@pytest.mark.parametrize("kind", [FINAL, EARLY])
+def test_due_retry_is_claimed_once(store, kind):
+    key = due_item(store)
+    attrs = KIND_ATTRIBUTES[kind]
+    assert store.claim(kind, *key, "sender-a")
+    assert store.schedule_retry(kind, *key, "sender-a", time.time() - 1, 2, "502: Bad Gateway")
+
+    assert store.claim(kind, *key, "sender-b")
+    assert not store.claim(kind, *key, "sender-c")
+    item = stored(store, *key)
+    assert item[attrs.status] == INFLIGHT
+    assert item[attrs.lease_owner] == "sender-b"
+    # The attempt count survives the claim, so the next failure backs off further.
+    assert int(item[attrs.retry_count]) == 2
+    assert not list(store.iter_due_retries(kind, time.time()))
+
+
+# --- Acknowledgements ---
+def test_early_and_final_acks_together(store):
+    key = due_item(store)
+    assert store.claim(EARLY, *key, "sender-a")
+    assert store.claim(FINAL, *key, "sender-a")
+    store.acknowledge([(EARLY, *key), (FINAL, *key)], owner="sender-a")
+    assert stored(store, *key) is None
+    assert key not in due_keys(store, FINAL)
+    assert key not in due_keys(store, EARLY)
+
+
+def test_early_ack_keeps_the_final_reminder(store):
+    key = due_item(store)
+    assert store.claim(EARLY, *key, "sender-a")
+    store.acknowledge([(EARLY, *key)], owner="sender-a")
+    assert key not in due_keys(store, EARLY)
+    assert key in due_keys(store, FINAL)
+    assert store.claim(FINAL, *key, "sender-a")
+
+
+def test_acks_of_several_chats_in_one_batch(store):
+    keys = [due_item(store, chat_id=str(chat)) for chat in range(30)]
+    for key in keys:
+        assert store.claim(EARLY, *key, "sender-a")
+        assert store.claim(FINAL, *key, "sender-a")
+    store.acknowledge([(kind, *key) for key in keys for kind in (EARLY, FINAL)], owner="sender-a")
+    assert not due_keys(store, FINAL)
+    assert all(stored(store, *key) is None for key in keys)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytest
+
+import telegramWebhookHandler
+from reminderParser import IST
+from reminderStore import build_reminder_item, set_store
+from sqliteStore import SqliteReminderStore
+from telegramPoller import UpdateBatch
+
+
+class FlakyStore(SqliteReminderStore):
+    """Counts put_many calls and fails the ones listed in `fail_calls` (1-based)."""
+
+    def __init__(self):
+        super().__init__(":memory:")
+        self.put_many_calls = []
+        self.fail_calls = set()
+        self.claims = 0
+
+    def put_many(self, items):
+        self.put_many_calls.append(len(items))
+        if len(self.put_many_calls) in self.fail_calls:
+            raise RuntimeError("store unavailable")
+        super().put_many(items)
+
+    def claim_update(self, update_id, ttl_seconds):
+        self.claims += 1
+        return super().claim_update(update_id, ttl_seconds)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # /list numbers are cached per chat; start every test without them.
+    monkeypatch.setattr(telegramWebhookHandler, "_list_views", OrderedDict())
+    store = FlakyStore()
+    set_store(store)
+    return store
+
+
+def message(update_id, chat_id, text):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': text}}
+
+
+def run_batch(updates, recovering=False):
+    batch = UpdateBatch(recovering=recovering)
+    for update in updates:
+        batch.process(update)
+    batch.flush()
+    return batch
+
+
+def reminder_texts(store, chat_id):
+    items, _ = store.list_user_page(str(chat_id), 20)
+    return sorted(item['reminder_text'] for item in items)
+
+
+def test_batch_stores_reminders_and_markers_in_one_write(store):
+    run_batch([message(i, 100 + i, f"/remind task {i} in 10 minutes") for i in range(1, 6)])
+    # Five reminders and five done markers, and no per-update claims.
+    assert store.put_many_calls == [10]
+    assert store.claims == 0
+    marker = store.claim_update(3, 30)
+    assert marker['done']
+    assert [(chat_id, method) for chat_id, method, _ in marker['response']] == [("103", "sendMessage")]
+
+
+def test_refetched_batch_does_not_repeat_stored_updates(store):
+    updates = [
+        message(1, 5, "/remind water plants in 10 minutes"),
+        message(2, 5, "/list"),
+        message(3, 6, "/remind call mom in 10 minutes"),
+    ]
+    # The /list flushes chat 5's reminder early; the final flush then fails.
+    store.fail_calls = {2}
+    with pytest.raises(RuntimeError):
+        run_batch(updates)
+    assert reminder_texts(store, 5) == ["water plants"]
+    assert reminder_texts(store, 6) == []
+
+    batch = run_batch(updates, recovering=True)
+    assert reminder_texts(store, 5) == ["water plants"]
+    assert reminder_texts(store, 6) == ["call mom"]
+    # The stored update's confirmation is queued again, since the failed batch never sent it.
+    assert [chat_id for chat_id, _, _ in batch.outbox] == ["5", "5", "6"]
+
+
+def test_delete_is_recorded_before_the_batch_goes_on(store):
+    now = datetime.now(IST)
+    store.put_many([build_reminder_item("5", name, now + timedelta(hours=i + 1), 0) for i, name in enumerate("ABC")])
+    store.put_many_calls.clear()
+    updates = [message(1, 5, "/delete 1"), message(2, 6, "/remind call mom in 10 minutes")]
+    store.fail_calls = {2}
+    with pytest.raises(RuntimeError):
+        run_batch(updates)
+
+    run_batch(updates, recovering=True)
+    # Run twice, "/delete 1" would have removed B as well.
+    assert reminder_texts(store, 5) == ["B", "C"]
+    assert reminder_texts(store, 6) == ["call mom"]
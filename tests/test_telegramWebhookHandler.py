@@ -0,0 +1,60 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+import telegramWebhookHandler
+from reminderStore import set_store
+from sqliteStore import SqliteReminderStore
+from telegramWebhookHandler import handle_update
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # Each test starts as a cold container: nothing remembered in memory.
+    monkeypatch.setattr(telegramWebhookHandler, "_seen_updates", OrderedDict())
+    store = SqliteReminderStore(":memory:")
+    set_store(store)
+    return store
+
+
+def delivery(update_id, text="/remind water plants in 10 minutes", chat_id=5):
+    return {'body': json.dumps({'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': text}})}
+
+
+def reminder_count(store, chat_id=5):
+    items, _ = store.list_user_page(str(chat_id), 20)
+    return len(items)
+
+
+def test_redelivery_repeats_the_first_response(store, monkeypatch):
+    first = handle_update(delivery(1))
+    assert first['statusCode'] == 200
+    # A redelivery reaching another container only finds the stored marker.
+    monkeypatch.setattr(telegramWebhookHandler, "_seen_updates", OrderedDict())
+    assert handle_update(delivery(1)) == first
+    assert reminder_count(store) == 1
+
+
+def test_update_still_in_progress_is_retried_later(store):
+    assert store.claim_update(2, 30) is None
+    assert handle_update(delivery(2))['statusCode'] == 503
+    assert reminder_count(store) == 0
+
+
+def test_expired_claim_is_processed_again(store):
+    # The invocation that claimed it timed out before storing anything.
+    assert store.claim_update(3, -1) is None
+    assert handle_update(delivery(3))['statusCode'] == 200
+    assert reminder_count(store) == 1
+    assert store.claim_update(3, 30)['done']
+
+
+def test_failed_update_is_released(store, monkeypatch):
+    def unavailable(item):
+        raise RuntimeError("store unavailable")
+
+    monkeypatch.setattr(store, "put", unavailable)
+    assert handle_update(delivery(4))['statusCode'] == 500
+    # Telegram's redelivery is handled afresh instead of being told to wait.
+    assert store.claim_update(4, 30) is None